@@ -1,22 +1,51 @@
-from flask import Flask, request, jsonify, redirect, url_for, send_file
-from flask_cors import CORS
-from werkzeug.utils import secure_filename
-from pymongo import MongoClient
-from bson.objectid import ObjectId
-from authlib.integrations.flask_client import OAuth
+import startup_report
+
+with startup_report.phase('flask'):
+    from flask import Flask, Response, request, jsonify, redirect, url_for, g
+    from flask_cors import CORS
+    from werkzeug.utils import secure_filename, safe_join
+with startup_report.phase('pymongo'):
+    from pymongo import MongoClient
+    from bson.objectid import ObjectId
+with startup_report.phase('authlib'):
+    from authlib.integrations.flask_client import OAuth
 from datetime import datetime
 from dotenv import load_dotenv
 import logging
 import os
+import time
+import threading
 from bson import ObjectId
 
-from services.auth_service import AuthService
-from services.video_service import VideoService
-from services.support_service import SupportService
-
-# Load environment variables
+# Load environment variables before any module reads its configuration
 load_dotenv()
 
+# Heavy ML/media libraries are imported inside the processing methods, so
+# these imports must stay cheap; see benchmarks/bench_startup.py.
+with startup_report.phase('services.auth_service'):
+    from services.auth_service import AuthService
+    from services.password_hasher import PasswordHasherBusy
+with startup_report.phase('services.video_service'):
+    from services.video_service import VideoService
+with startup_report.phase('services.support_service'):
+    from services.support_service import SupportService
+with startup_report.phase('services.upload_service'):
+    from services.upload_service import UploadService, UploadOffsetMismatch, UploadBusy, InvalidContainer
+with startup_report.phase('services.job_service'):
+    from services.job_service import JobService
+with startup_report.phase('db_indexes'):
+    from db_indexes import ensure_indexes
+with startup_report.phase('json_provider'):
+    from json_provider import MongoJSONProvider
+with startup_report.phase('media_server'):
+    from media_server import send_media, stored_etag, hls_etag
+with startup_report.phase('metrics'):
+    import metrics
+with startup_report.phase('progress_bus'):
+    import progress_bus
+with startup_report.phase('model_registry'):
+    from model_registry import model_registry
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -25,7 +54,8 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
-CORS(app, supports_credentials=True)
+app.json = MongoJSONProvider(app)
+CORS(app, supports_credentials=True, expose_headers=['X-Next-Cursor'])
 
 # App secret
 app.config['SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
@@ -33,18 +63,39 @@ app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 500 * 102
 
 # MongoDB connection
 try:
-    client = MongoClient(os.getenv('MONGODB_URI'))
-    db = client.snipx
-    client.server_info()
+    with startup_report.phase('mongodb connect'):
+        client = MongoClient(os.getenv('MONGODB_URI'))
+        db = client.snipx
+        client.server_info()
     logger.info("✅ Connected to MongoDB")
+    with startup_report.phase('mongodb indexes'):
+        ensure_indexes(db)
 except Exception as e:
     logger.error(f"❌ MongoDB connection failed: {str(e)}")
     raise
 
 # Initialize services
-auth_service = AuthService(db)
-video_service = VideoService(db)
-support_service = SupportService(db)
+with startup_report.phase('service init'):
+    auth_service = AuthService(db)
+    video_service = VideoService(db)
+    support_service = SupportService(db)
+    job_service = JobService(db)
+    upload_service = UploadService(db, video_service)
+
+# Request metrics
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    # Labelled by route pattern, not path, so ids don't multiply the series
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method,
+                                        route=route, status=response.status_code)
+    return response
 
 # OAuth setup
 oauth = OAuth(app)
@@ -131,20 +182,56 @@ def require_auth(f):
         try:
             token = auth_header.split(' ')[1]
             user_id = auth_service.verify_token(token)
-            return f(user_id, *args, **kwargs)
         except Exception as e:
             return jsonify({'error': str(e)}), 401
 
+        g.user_id, g.auth_token = user_id, token
+        return f(user_id, *args, **kwargs)
+
+    decorated.__name__ = f.__name__
+    return decorated
+
+def require_media_auth(f):
+    """Like require_auth, but also accepts a media token (see
+    create_media_token) as ?token=, so <video>, <img> and <track> elements
+    and EventSource, which cannot send headers, can load a video's media."""
+    def decorated(*args, **kwargs):
+        auth_header = request.headers.get('Authorization')
+        token = auth_header.split(' ')[1] if auth_header else request.args.get('token')
+        if not token:
+            return jsonify({'error': 'No authorization header'}), 401
+
+        try:
+            if auth_header:
+                user_id = auth_service.verify_token(token)
+            else:
+                user_id = auth_service.verify_media_token(token, kwargs.get('video_id'))
+        except Exception as e:
+            return jsonify({'error': str(e)}), 401
+
+        g.user_id, g.auth_token = user_id, token
+        return f(user_id, *args, **kwargs)
+
     decorated.__name__ = f.__name__
     return decorated
 
+def current_user():
+    """The authenticated user, loaded from the database at most once per request"""
+    if 'current_user' not in g:
+        g.current_user = auth_service.get_user_by_id(g.user_id)
+    return g.current_user
+
+def _paginated(items, next_cursor):
+    """A page as a JSON list; the cursor for the next one goes in X-Next-Cursor"""
+    response = jsonify(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
 @app.route('/api/test-db', methods=['GET'])
 def test_db():
     try:
         test_result = db.users.find_one()
-        if test_result and '_id' in test_result:
-            test_result['_id'] = str(test_result['_id'])
-
         return jsonify({
             "status": "success",
             "message": "MongoDB is connected",
@@ -174,6 +261,8 @@ def register():
             last_name=data.get('lastName')
         )
         return jsonify({'message': 'User registered successfully', 'user_id': str(user_id)}), 201
+    except PasswordHasherBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -189,12 +278,41 @@ def login():
 
         token, user = auth_service.login_user(data['email'], data['password'])
         return jsonify({'token': token, 'user': user}), 200
+    except PasswordHasherBusy as e:
+        return jsonify({'message': str(e)}), 503, {'Retry-After': '1'}
     except ValueError as e:
         return jsonify({'message': str(e)}), 401
     except Exception as e:
         logger.exception("Login error")
         return jsonify({'message': str(e)}), 500
 
+@app.route('/api/auth/logout', methods=['POST'])
+@require_auth
+def logout(user_id):
+    try:
+        auth_service.revoke_token(g.auth_token)
+        return jsonify({'message': 'Logged out'}), 200
+    except Exception as e:
+        logger.error(f"Logout error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/auth/me', methods=['GET'])
+@require_auth
+def get_current_user(user_id):
+    try:
+        user = current_user()
+        return jsonify({
+            'id': str(user_id),
+            'email': user.email,
+            'firstName': user.first_name,
+            'lastName': user.last_name
+        }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        logger.error(f"Current user error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/api/auth/demo', methods=['POST'])
 def demo_login():
     try:
@@ -253,9 +371,16 @@ def create_support_ticket(user_id):
 @require_auth
 def get_support_tickets(user_id):
     try:
-        # Get tickets for the authenticated user
-        tickets = support_service.get_user_tickets(user_id)
-        return jsonify(tickets), 200
+        # Get tickets for the authenticated user, a page at a time
+        tickets, next_cursor = support_service.get_user_tickets(
+            user_id,
+            limit=request.args.get('limit', type=int),
+            cursor=request.args.get('cursor'),
+            fields=request.args.get('fields')
+        )
+        return _paginated(tickets, next_cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.exception("Get support tickets error")
         return jsonify({'error': 'Internal server error'}), 500
@@ -295,17 +420,120 @@ def upload_video(user_id):
         logger.error(f"Upload error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/uploads', methods=['POST'])
+@require_auth
+def create_upload(user_id):
+    try:
+        data = request.get_json() or {}
+        upload = upload_service.create_upload(user_id, data.get('filename'), data.get('size', 0))
+        return jsonify({
+            'upload_id': upload['_id'],
+            'offset': upload['offset'],
+            'size': upload['size']
+        }), 201
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Create upload error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+@require_auth
+def get_upload(user_id, upload_id):
+    try:
+        upload = upload_service.get_upload(upload_id)
+        if not upload:
+            return jsonify({'error': 'Upload not found'}), 404
+
+        # Check if user owns the upload
+        if upload['user_id'] != str(user_id):
+            return jsonify({'error': 'Unauthorized'}), 403
+
+        return jsonify(upload), 200
+    except Exception as e:
+        logger.error(f"Get upload error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/uploads/<upload_id>', methods=['PATCH'])
+@require_auth
+def append_upload(user_id, upload_id):
+    """Append the raw request body at the offset given in ?offset="""
+    try:
+        offset = upload_service.append(upload_id, user_id, request.args.get('offset', 0, type=int), request.stream)
+        return jsonify({'offset': offset}), 200
+    except UploadBusy as e:
+        return jsonify({'error': str(e), 'offset': e.offset}), 409, {'Retry-After': '1'}
+    except UploadOffsetMismatch as e:
+        return jsonify({'error': str(e), 'offset': e.offset}), 409
+    except InvalidContainer as e:
+        return jsonify({'error': str(e)}), 415
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Append upload error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+@require_auth
+def complete_upload(user_id, upload_id):
+    try:
+        data = request.get_json(silent=True) or {}
+        video_id, sha256 = upload_service.complete(upload_id, user_id, data.get('sha256'))
+        return jsonify({
+            'message': 'Video uploaded successfully',
+            'video_id': video_id,
+            'sha256': sha256
+        }), 200
+    except UploadBusy as e:
+        return jsonify({'error': str(e), 'offset': e.offset}), 409, {'Retry-After': '1'}
+    except UploadOffsetMismatch as e:
+        return jsonify({'error': 'Upload is incomplete', 'offset': e.offset}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Complete upload error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/api/videos/<video_id>/process', methods=['POST'])
 @require_auth
 def process_video(user_id, video_id):
     try:
+        video = video_service.get_video(video_id)
+        if not video:
+            return jsonify({'error': 'Video not found'}), 404
+
+        # Check if user owns the video
+        if str(video.user_id) != str(user_id):
+            return jsonify({'error': 'Unauthorized'}), 403
+
         options = request.json.get('options', {})
-        video_service.process_video(video_id, options)
-        return jsonify({'message': 'Processing completed successfully'}), 200
+        job_id = job_service.enqueue_processing(video_id, user_id, options)
+        return jsonify({
+            'message': 'Processing queued',
+            'job_id': job_id,
+            'status': 'queued'
+        }), 202
     except Exception as e:
         logger.error(f"Process error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@require_auth
+def get_job_status(user_id, job_id):
+    try:
+        job = job_service.get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+
+        # Check if user owns the job
+        if job.get('user_id') != str(user_id):
+            return jsonify({'error': 'Unauthorized'}), 403
+
+        return jsonify(job), 200
+    except Exception as e:
+        logger.error(f"Fetch job error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/api/videos/<video_id>', methods=['GET'])
 @require_auth
 def get_video_status(user_id, video_id):
@@ -314,32 +542,141 @@ def get_video_status(user_id, video_id):
         if not video:
             return jsonify({'error': 'Video not found'}), 404
 
-        # Convert custom Video object to dict
-        if hasattr(video, 'to_dict'):
-            video_dict = video.to_dict()
-        elif hasattr(video, '__dict__'):
-            video_dict = video.__dict__
-        else:
-            raise ValueError("Cannot serialize Video object")
+        # ObjectId and datetime fields are handled by the JSON provider
+        return jsonify(video.to_dict()), 200
 
-        # Clean up any non-serializable fields (e.g., ObjectId)
-        if '_id' in video_dict:
-            video_dict['_id'] = str(video_dict['_id'])
-        if 'user_id' in video_dict:
-            video_dict['user_id'] = str(video_dict['user_id'])
+    except Exception as e:
+        logger.error(f"Fetch video error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
 
-        return jsonify(video_dict), 200
+@app.route('/api/videos/<video_id>/media-token', methods=['POST'])
+@require_auth
+def create_media_token(user_id, video_id):
+    """A short-lived token for ?token= on this video's media and event URLs;
+    the session token itself is not accepted there"""
+    try:
+        video = video_service.get_video_status(video_id)
+        if not video:
+            return jsonify({'error': 'Video not found'}), 404
+
+        if str(video.get('user_id')) != str(user_id):
+            return jsonify({'error': 'Unauthorized'}), 403
 
+        token = auth_service.generate_media_token(user_id, video_id, g.auth_token)
+        return jsonify({'token': token, 'expires_in': auth_service.media_token_seconds}), 200
     except Exception as e:
-        logger.error(f"Fetch video error: {str(e)}")
+        logger.error(f"Media token error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Each open progress stream holds a worker thread; past this many, requests
+# get a 503 and clients poll instead, so streams cannot starve the API
+SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', int(os.getenv('GUNICORN_THREADS', 32)) // 2))
+# A stream is closed after this long; EventSource reconnects by itself
+SSE_MAX_SECONDS = float(os.getenv('SSE_MAX_SECONDS', 600))
+_sse_slots = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+
+@app.route('/api/videos/<video_id>/events', methods=['GET'])
+@require_media_auth
+def video_events(user_id, video_id):
+    """Processing progress as server-sent events, until the video completes or fails.
+
+    Takes a media token as ?token= because EventSource cannot send
+    headers. Needs a threaded gunicorn worker (see gunicorn.conf.py): each
+    open stream holds a thread, so at most SSE_MAX_STREAMS are open per
+    worker and each lasts at most SSE_MAX_SECONDS. Over the limit the
+    answer is 503 with Retry-After, and the client polls GET
+    /api/videos/<id> instead.
+
+    Events come from the progress bus of this process, which only hears
+    about jobs this process queued. For a job queued by another web
+    worker, the stream sees status changes only, by re-reading the stored
+    status when no event arrives for SSE_HEARTBEAT seconds, and no percent
+    or ETA. The bus's last event is used only while it agrees with the
+    stored status, so one left over from an earlier run cannot end the
+    stream at once.
+    """
+    try:
+        video = video_service.get_video_status(video_id)
+        if not video:
+            return jsonify({'error': 'Video not found'}), 404
+
+        if str(video.get('user_id')) != str(user_id):
+            return jsonify({'error': 'Unauthorized'}), 403
+    except Exception as e:
+        logger.error(f"Video events error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+    if not _sse_slots.acquire(blocking=False):
+        response = jsonify({'error': 'Too many progress streams, poll the video status instead'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+
+    heartbeat = float(os.getenv('SSE_HEARTBEAT', 15))
+    deadline = time.monotonic() + SSE_MAX_SECONDS
+
+    def stored_event(video):
+        return {'video_id': video_id, 'status': video.get('status'), 'stage': None,
+                'percent': 100.0 if video.get('status') == 'completed' else None,
+                'eta_seconds': None, 'error': video.get('error')}
+
+    def stream():
+        with progress_bus.bus.subscribe(video_id) as subscription:
+            yield f"retry: {int(heartbeat * 1000)}\n\n"
+            event = progress_bus.bus.last(video_id)
+            if event is None or event.get('status') != video.get('status'):
+                event = stored_event(video)
+            status = None
+            while True:
+                if event is not None:
+                    status = event.get('status')
+                    yield f"data: {app.json.dumps(event)}\n\n"
+                    if status in progress_bus.TERMINAL_STATUSES:
+                        return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                event = subscription.get(timeout=min(heartbeat, remaining))
+                if event is None:
+                    stored = video_service.get_video_status(video_id)
+                    if not stored:
+                        return
+                    if stored.get('status') != status:
+                        event = stored_event(stored)
+                    else:
+                        yield ": keep-alive\n\n"
+
+    response = Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Called when the server is done with the response, even if it never iterated it
+    response.call_on_close(_sse_slots.release)
+    return response
+
+@app.route('/api/models/stats', methods=['GET'])
+@require_auth
+def get_model_stats(user_id):
+    try:
+        # Models used by background jobs live in the pool processes; this
+        # reports the registry of the web process serving the request.
+        return jsonify(model_registry.stats()), 200
+    except Exception as e:
+        logger.error(f"Model stats error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/videos', methods=['GET'])
 @require_auth
 def get_user_videos(user_id):
     try:
-        videos = video_service.get_user_videos(user_id)
-        return jsonify(videos), 200
+        videos, next_cursor = video_service.get_user_videos(
+            user_id,
+            limit=request.args.get('limit', type=int),
+            cursor=request.args.get('cursor'),
+            fields=request.args.get('fields')
+        )
+        return _paginated(videos, next_cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"List videos error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -354,9 +691,9 @@ def delete_video(user_id, video_id):
         logger.error(f"Delete video error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
-# Add download endpoint for processed videos
+# Add download endpoint for processed videos; ?inline=1 plays it in place
 @app.route('/api/videos/<video_id>/download', methods=['GET'])
-@require_auth
+@require_media_auth
 def download_video(user_id, video_id):
     try:
         video = video_service.get_video(video_id)
@@ -368,20 +705,141 @@ def download_video(user_id, video_id):
             return jsonify({'error': 'Unauthorized'}), 403
         
         # Get the processed video path
-        processed_path = video.outputs.get('processed_video', video.filepath)
+        processed_path = video.outputs.get('processed_video') or video.filepath
         
         if not os.path.exists(processed_path):
             return jsonify({'error': 'Processed video not found'}), 404
         
-        return send_file(
+        return send_media(
             processed_path,
-            as_attachment=True,
-            download_name=f"enhanced_{video.filename}"
+            as_attachment=not request.args.get('inline'),
+            download_name=f"enhanced_{video.filename}",
+            etag=(video.metadata.get('sha256') if processed_path == video.filepath
+                  else stored_etag(video.outputs, 'processed_video'))
         )
     except Exception as e:
         logger.error(f"Download error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/videos/<video_id>/original', methods=['GET'])
+@require_media_auth
+def get_original_video(user_id, video_id):
+    try:
+        video = video_service.get_video(video_id)
+        if not video:
+            return jsonify({'error': 'Video not found'}), 404
+        
+        # Check if user owns the video
+        if str(video.user_id) != str(user_id):
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        if not os.path.exists(video.filepath):
+            return jsonify({'error': 'Video file not found'}), 404
+        
+        return send_media(
+            video.filepath,
+            as_attachment=bool(request.args.get('download')),
+            download_name=video.filename,
+            etag=video.metadata.get('sha256')
+        )
+    except Exception as e:
+        logger.error(f"Original video error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/videos/<video_id>/thumbnail', methods=['GET'])
+@require_media_auth
+def get_video_thumbnail(user_id, video_id):
+    try:
+        video = video_service.get_video(video_id)
+        if not video:
+            return jsonify({'error': 'Video not found'}), 404
+        
+        # Check if user owns the video
+        if str(video.user_id) != str(user_id):
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        thumbnail_path = video.outputs.get('thumbnail')
+        if not thumbnail_path or not os.path.exists(thumbnail_path):
+            return jsonify({'error': 'Thumbnail not found'}), 404
+        
+        return send_media(thumbnail_path, etag=stored_etag(video.outputs, 'thumbnail'))
+    except Exception as e:
+        logger.error(f"Thumbnail error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/videos/<video_id>/storyboard.<ext>', methods=['GET'])
+@require_media_auth
+def get_video_storyboard(user_id, video_id, ext):
+    """Timeline hover previews: the WebVTT index (.vtt) and its sprite (.jpg)"""
+    try:
+        video = video_service.get_video(video_id)
+        if not video:
+            return jsonify({'error': 'Video not found'}), 404
+        
+        # Check if user owns the video
+        if str(video.user_id) != str(user_id):
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        storyboard = video.outputs.get('storyboard') or {}
+        path = storyboard.get({'vtt': 'vtt', 'jpg': 'sprite'}.get(ext, ''))
+        if not path or not os.path.exists(path):
+            return jsonify({'error': 'Storyboard not found'}), 404
+        
+        if ext == 'jpg':
+            return send_media(path, etag=stored_etag(video.outputs, 'storyboard', 'sprite'))
+        
+        # Point the cues at the sprite route, keeping the media token for <track> loads
+        with open(path, 'r', encoding='utf-8') as f:
+            index = f.read()
+        sprite_url = 'storyboard.jpg'
+        if request.args.get('token'):
+            sprite_url += f"?token={request.args['token']}"
+        index = index.replace(f"{os.path.basename(storyboard['sprite'])}#", f"{sprite_url}#")
+        response = app.response_class(index, mimetype='text/vtt')
+        response.cache_control.no_cache = True
+        return response
+    except Exception as e:
+        logger.error(f"Storyboard error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/videos/<video_id>/hls/<path:filename>', methods=['GET'])
+@require_media_auth
+def get_video_hls(user_id, video_id, filename):
+    """Master/rendition playlists and segments of the HLS output"""
+    try:
+        video = video_service.get_video(video_id)
+        if not video:
+            return jsonify({'error': 'Video not found'}), 404
+        
+        # Check if user owns the video
+        if str(video.user_id) != str(user_id):
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        master_path = video.outputs.get('hls')
+        path = safe_join(os.path.dirname(master_path), filename) if master_path else None
+        if not path or not os.path.isfile(path):
+            return jsonify({'error': 'HLS output not found'}), 404
+        
+        if not path.endswith('.m3u8'):
+            return send_media(path, mimetype='video/mp2t',
+                              etag=hls_etag(os.path.dirname(master_path), filename))
+        
+        with open(path, 'r', encoding='utf-8') as f:
+            playlist = f.read()
+        # Relative URIs do not inherit ?token=, so carry the media token to every entry
+        token = request.args.get('token')
+        if token:
+            playlist = '\n'.join(
+                line if not line or line.startswith('#') else f"{line}?token={token}"
+                for line in playlist.splitlines()
+            ) + '\n'
+        response = app.response_class(playlist, mimetype='application/vnd.apple.mpegurl')
+        response.cache_control.no_cache = True
+        return response
+    except Exception as e:
+        logger.error(f"HLS error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/api/videos/<video_id>/subtitles', methods=['GET'])
 @require_auth
 def get_video_subtitles(user_id, video_id):
@@ -413,7 +871,7 @@ def get_video_subtitles(user_id, video_id):
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/videos/<video_id>/subtitles/<language>/download', methods=['GET'])
-@require_auth
+@require_media_auth
 def download_subtitles(user_id, video_id, language):
     try:
         video = video_service.get_video(video_id)
@@ -440,10 +898,13 @@ def download_subtitles(user_id, video_id, language):
             return jsonify({'error': 'Subtitle file not found'}), 404
         
         filename = f"{video.filename}_{language}.{format_type}"
-        return send_file(
+        return send_media(
             subtitle_path,
             as_attachment=True,
-            download_name=filename
+            download_name=filename,
+            mimetype='application/x-subrip' if format_type == 'srt' else 'application/json',
+            etag=(stored_etag(video.outputs, 'subtitles', 'srt' if format_type == 'srt' else 'json')
+                  if isinstance(subtitles_info, dict) else None)
         )
         
     except Exception as e:
@@ -475,11 +936,8 @@ def generate_subtitles(user_id, video_id):
         
         video_service._generate_subtitles(video, options)
         
-        # Update video in database
-        video_service.videos.update_one(
-            {"_id": ObjectId(video_id)},
-            {"$set": video.to_dict()}
-        )
+        # Save just the new subtitle outputs
+        video_service.update_video(video)
         
         return jsonify({
             'message': 'Subtitles generated successfully',
@@ -491,9 +949,29 @@ def generate_subtitles(user_id, video_id):
         logger.error(f"Generate subtitles error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint; set METRICS_TOKEN to require it as a bearer token.
+
+    The metrics are those of the gunicorn worker that answers: with several
+    workers behind one port, successive scrapes see different counters.
+    Run one worker per port (the default in gunicorn.conf.py) and scrape
+    each port as its own target.
+    """
+    token = os.getenv('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Unauthorized'}), 401
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/health/startup', methods=['GET'])
+def get_startup_report():
+    return jsonify(startup_report.report()), 200
+
 @app.errorhandler(413)
 def too_large(e):
     return jsonify({'error': 'File too large. Maximum size is 500MB'}), 413
 
+startup_report.log_report(logger)
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Per-request authentication overhead, with and without the token cache.
+
+Times AuthService.verify_token with the cache disabled (a full HS256
+decode on every request, as before) and enabled, then through a Flask
+route protected by require_auth. Converts the difference into CPU time
+per second at the frontend's polling rate: every open editor tab
+requests GET /api/videos/<id> every 2 s. Uses mongomock, so no database
+is needed.
+
+Run from the backend directory:
+
+    python benchmarks/bench_auth.py [--requests 20000 --tabs 500]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mongomock  # noqa: E402
+from flask import Flask, jsonify, request  # noqa: E402
+
+from services.auth_service import AuthService, TokenCache  # noqa: E402
+
+POLL_INTERVAL_SECONDS = 2.0
+
+
+def measure(name, requests, run):
+    start = time.perf_counter()
+    for _ in range(requests):
+        run()
+    per_request = (time.perf_counter() - start) / requests * 1e6
+    print(f"  {name:<36} {per_request:8.2f} us/request")
+    return per_request
+
+
+def protected_app(auth_service):
+    """A minimal app with the same decorator shape as app.require_auth"""
+    app = Flask(__name__)
+
+    def require_auth(f):
+        def decorated(*args, **kwargs):
+            token = request.headers.get('Authorization').split(' ')[1]
+            return f(auth_service.verify_token(token), *args, **kwargs)
+        decorated.__name__ = f.__name__
+        return decorated
+
+    @app.route('/status')
+    @require_auth
+    def status(user_id):
+        return jsonify({'user_id': user_id})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--tabs", type=int, default=500)
+    args = parser.parse_args()
+
+    os.environ.setdefault('JWT_SECRET_KEY', 'x' * 32)
+    auth_service = AuthService(mongomock.MongoClient().db)
+    token = auth_service.generate_token('64b7f0c2a1b2c3d4e5f60718')
+    cache = auth_service.token_cache
+
+    print(f"{args.requests} requests with one token")
+    auth_service.token_cache = TokenCache(0, 0)
+    before = measure("verify_token, no cache", args.requests, lambda: auth_service.verify_token(token))
+    auth_service.token_cache = cache
+    after = measure("verify_token, cached", args.requests, lambda: auth_service.verify_token(token))
+
+    client = protected_app(auth_service).test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    route_requests = max(1, args.requests // 10)
+    auth_service.token_cache = TokenCache(0, 0)
+    route_before = measure("require_auth route, no cache", route_requests,
+                           lambda: client.get('/status', headers=headers))
+    auth_service.token_cache = cache
+    route_after = measure("require_auth route, cached", route_requests,
+                          lambda: client.get('/status', headers=headers))
+
+    rate = args.tabs / POLL_INTERVAL_SECONDS
+    print(f"Auth CPU at {args.tabs} tabs polling every {POLL_INTERVAL_SECONDS:g}s ({rate:g} req/s): "
+          f"{before * rate / 1000:.1f} ms/s -> {after * rate / 1000:.1f} ms/s")
+    print(f"Route time saved per request: {route_before - route_after:.1f} us "
+          f"({(route_before - route_after) / route_before:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Brightness/contrast frame filter throughput, before and after the LUT.
+
+Compares the float32 per-frame pipeline _apply_video_enhancements used to
+run through moviepy's fl_image with the uint8 LUT, single-threaded and on
+the ordered thread pool. Frames are synthetic, so no video file is needed.
+
+Run from the backend directory:
+
+    python benchmarks/bench_frame_filter.py [--width 1920 --height 1080 --frames 240]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_filters import brightness_contrast_lut, apply_lut, map_frames_ordered  # noqa: E402
+
+BRIGHTNESS = 1.2
+CONTRAST = 1.1
+
+
+def legacy_filter(image):
+    """The float pipeline previously used in VideoService._apply_video_enhancements"""
+    img = image.astype(np.float32)
+    img = img * BRIGHTNESS
+    img = (img - 128) * CONTRAST + 128
+    img = np.clip(img, 0, 255)
+    return img.astype(np.uint8)
+
+
+def make_frames(width, height, count, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    # Distinct frames without paying for `count` random generations
+    return [np.roll(base, i, axis=1) for i in range(count)]
+
+
+def measure(name, frames, run):
+    work = [frame.copy() for frame in frames]
+    start = time.perf_counter()
+    for _ in run(work):
+        pass
+    elapsed = time.perf_counter() - start
+    fps = len(frames) / elapsed
+    print(f"  {name:<34} {fps:9.1f} frames/s")
+    return fps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=240)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    frames = make_frames(args.width, args.height, args.frames)
+    lut = brightness_contrast_lut(BRIGHTNESS, CONTRAST)
+
+    # The LUT must reproduce the old pipeline exactly
+    sample = frames[0]
+    assert np.array_equal(legacy_filter(sample), apply_lut(sample.copy(), lut))
+
+    print(f"{args.frames} frames at {args.width}x{args.height}, {args.workers} workers")
+    before = measure("float32 pipeline, 1 thread", frames,
+                     lambda work: (legacy_filter(f) for f in work))
+    measure("uint8 LUT, 1 thread", frames,
+            lambda work: (apply_lut(f, lut) for f in work))
+    after = measure(f"uint8 LUT, ordered pool x{args.workers}", frames,
+                    lambda work: map_frames_ordered(iter(work), lambda f: apply_lut(f, lut),
+                                                    workers=args.workers))
+    print(f"Speedup: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Login throughput and latency with bcrypt inline and on the hasher pool.
+
+Before: bcrypt ran on the request thread, so every concurrent login
+competed for the CPU and a burst slowed all of them down together.
+After: PasswordHasher runs at most PASSWORD_HASH_WORKERS hashes at once
+and refuses logins beyond PASSWORD_HASH_QUEUE (the route answers 503
+with Retry-After). Client threads call AuthService.login_user against
+mongomock users; the report gives logins/s, p50/p95 latency of the
+accepted logins and the number refused. Finally logs in users stored at
+--legacy-rounds and checks their hashes were moved to --rounds.
+
+Run from the backend directory:
+
+    python benchmarks/bench_login.py [--clients 32 --logins 128 --rounds 10]
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt  # noqa: E402
+import mongomock  # noqa: E402
+
+from services.auth_service import AuthService  # noqa: E402
+from services.password_hasher import PasswordHasher, PasswordHasherBusy, hash_cost  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+
+
+class InlineHasher(PasswordHasher):
+    """The old behaviour: bcrypt on the calling thread, nothing bounded"""
+
+    def _run(self, operation):
+        return operation()
+
+
+def seed_users(auth_service, count, rounds, prefix):
+    password_hash = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds))
+    emails = [f"{prefix}{index}@example.com" for index in range(count)]
+    auth_service.users.insert_many(
+        [{"email": email, "password_hash": password_hash} for email in emails])
+    return emails
+
+
+def run(name, auth_service, emails, clients, logins):
+    latencies = []
+    rejected = [0]
+    lock = threading.Lock()
+    counter = iter(range(logins))
+
+    def client():
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            start = time.perf_counter()
+            try:
+                auth_service.login_user(emails[index % len(emails)], PASSWORD)
+            except PasswordHasherBusy:
+                with lock:
+                    rejected[0] += 1
+                time.sleep(0.01)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+    print(f"  {name:<28} {len(latencies) / elapsed:7.1f} logins/s  p50 {p50:7.1f} ms  "
+          f"p95 {p95:7.1f} ms  refused {rejected[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--logins", type=int, default=128)
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--legacy-rounds", type=int, default=8)
+    args = parser.parse_args()
+
+    os.environ.setdefault("JWT_SECRET_KEY", "x" * 32)
+    auth_service = AuthService(mongomock.MongoClient().db)
+    emails = seed_users(auth_service, args.users, args.rounds, "user")
+    pool = PasswordHasher(rounds=args.rounds)
+
+    print(f"{args.logins} logins from {args.clients} client threads, bcrypt cost {args.rounds}, "
+          f"{pool.workers} hash workers, {pool.max_pending} pending at most")
+    auth_service.password_hasher = InlineHasher(rounds=args.rounds)
+    run("bcrypt on request thread", auth_service, emails, args.clients, args.logins)
+    auth_service.password_hasher = pool
+    run("PasswordHasher pool", auth_service, emails, args.clients, args.logins)
+
+    legacy = seed_users(auth_service, args.users, args.legacy_rounds, "legacy")
+    for email in legacy:
+        auth_service.login_user(email, PASSWORD)
+    costs = {hash_cost(doc["password_hash"]) for doc in auth_service.users.find({"email": {"$in": legacy}})}
+    print(f"Rehash on login: cost {args.legacy_rounds} -> {sorted(costs)}")
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
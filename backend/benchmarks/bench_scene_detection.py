@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Scene detection throughput on a synthetic clip with known hard cuts.
+
+Builds a 1080p H.264 clip by concatenating shots from different ffmpeg
+test sources, then times scene_detection.detect_scenes on it and checks
+the detected boundaries against the real ones. Reports frames/s and the
+speed relative to real time, next to a bare ffmpeg decode of the same
+file, which bounds what any single-pass detector can reach.
+
+Run from the backend directory:
+
+    python benchmarks/bench_scene_detection.py [--width 1920 --height 1080 --shot-seconds 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ffmpeg_tools import run_ffmpeg, probe  # noqa: E402
+from scene_detection import detect_scenes  # noqa: E402
+
+# Visually distinct lavfi sources, one per shot; moving ones exercise the
+# adaptive threshold with in-shot motion
+SHOT_SOURCES = [
+    "testsrc2=size={size}:rate={fps}",
+    "smptehdbars=size={size}:rate={fps}",
+    "color=c=0x204080:size={size}:rate={fps},noise=alls=30:allf=t",
+    "rgbtestsrc=size={size}:rate={fps}",
+    "testsrc=size={size}:rate={fps}",
+    "color=c=0xd0a030:size={size}:rate={fps},noise=alls=20:allf=t",
+]
+
+
+def make_clip(path, width, height, fps, shot_seconds):
+    size = f"{width}x{height}"
+    args = []
+    for source in SHOT_SOURCES:
+        args += ["-f", "lavfi", "-t", str(shot_seconds), "-i", source.format(size=size, fps=fps)]
+    inputs = "".join(f"[{index}:v]format=yuv420p[v{index}];" for index in range(len(SHOT_SOURCES)))
+    labels = "".join(f"[v{index}]" for index in range(len(SHOT_SOURCES)))
+    args += [
+        "-filter_complex", f"{inputs}{labels}concat=n={len(SHOT_SOURCES)}:v=1:a=0[out]",
+        "-map", "[out]", "-c:v", "libx264", "-preset", "ultrafast", "-g", str(fps * 2), path
+    ]
+    run_ffmpeg(args)
+    return [shot_seconds * index for index in range(1, len(SHOT_SOURCES))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--shot-seconds", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "shots.mp4")
+        expected = make_clip(path, args.width, args.height, args.fps, args.shot_seconds)
+        info = probe(path)
+        frames = round(info["duration"] * info["fps"])
+
+        start = time.perf_counter()
+        run_ffmpeg(["-i", path, "-f", "null", "-"])
+        decode = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scenes = detect_scenes(path, info)
+        elapsed = time.perf_counter() - start
+
+    found = [scene["start"] for scene in scenes[1:]]
+    tolerance = 1.5 / args.fps
+    matched = sum(any(abs(cut - real) <= tolerance for cut in found) for real in expected)
+    print(f"{frames} frames at {args.width}x{args.height}, {info['duration']:.1f}s")
+    print(f"  ffmpeg decode only       {frames / decode:9.1f} frames/s")
+    print(f"  detect_scenes            {frames / elapsed:9.1f} frames/s "
+          f"({info['duration'] / elapsed:.1f}x real time)")
+    print(f"  cuts found {len(found)}, expected {len(expected)}, matched {matched}")
+    print(f"  boundaries {found}")
+
+
+if __name__ == "__main__":
+    main()
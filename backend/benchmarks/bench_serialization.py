@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Video listing serialization cost per document, before and after.
+
+Before: every document was rebuilt through a dict-backed Video
+(from_dict/to_dict) and encoded by Flask's stdlib provider. After: the
+documents are encoded as read by MongoJSONProvider (orjson when it is
+installed), with and without the listing projection. Also compares the
+memory of dict-backed and slotted model instances. Documents are
+synthetic, so no database is needed.
+
+Run from the backend directory:
+
+    python benchmarks/bench_serialization.py [--documents 5000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId  # noqa: E402
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+import json_provider  # noqa: E402
+from json_provider import MongoJSONProvider  # noqa: E402
+from models.video import Video  # noqa: E402
+from services.video_service import VIDEO_LIST_FIELDS  # noqa: E402
+
+REPEATS = 5
+
+
+def legacy_class(cls):
+    """The same model without __slots__, i.e. with a per-instance __dict__"""
+    skip = set(cls.__slots__) | {"__slots__", "__dict__", "__weakref__"}
+    namespace = {name: value for name, value in vars(cls).items() if name not in skip}
+    return type(f"Legacy{cls.__name__}", (), namespace)
+
+
+LegacyVideo = legacy_class(Video)
+
+
+def load(cls, document):
+    """Video.from_dict without the saved-state snapshot, for either class"""
+    video = cls(ObjectId(document["user_id"]), document["filename"], document["filepath"], document["size"])
+    for field in ("status", "processing_options", "upload_date", "process_start_time",
+                  "process_end_time", "error", "metadata", "outputs"):
+        setattr(video, field, document.get(field))
+    return video
+
+
+def make_documents(count):
+    user_id = ObjectId()
+    start = datetime(2026, 1, 1)
+    documents = []
+    for index in range(count):
+        base = f"/srv/uploads/blobs/{index:064x}"
+        documents.append({
+            "_id": ObjectId(),
+            "user_id": str(user_id),
+            "filename": f"recording-{index}.mp4",
+            "filepath": f"{base}.mp4",
+            "size": 50_000_000 + index,
+            "status": "completed",
+            "processing_options": {"cut_silence": True, "generate_thumbnail": True},
+            "upload_date": start + timedelta(minutes=index),
+            "process_start_time": start + timedelta(minutes=index, seconds=5),
+            "process_end_time": start + timedelta(minutes=index, seconds=95),
+            "error": None,
+            "metadata": {
+                "duration": 600.0, "format": "mp4", "resolution": "1920x1080", "fps": 30.0,
+                "sha256": f"{index:064x}",
+                "probe": {"duration": 600.0, "video_codec": "h264", "width": 1920, "height": 1080,
+                          "fps": 30.0, "audio_codec": "aac", "sample_rate": 48000, "channels": 2},
+            },
+            "outputs": {
+                "processed_video": f"{base}_enhanced.mp4", "thumbnail": f"{base}_thumb.jpg",
+                "subtitles": None, "summary": None,
+                "storyboard": {"sprite": f"{base}_storyboard.jpg", "vtt": f"{base}_storyboard.vtt"},
+            },
+            "version": 4,
+        })
+    return documents
+
+
+def project(document, fields):
+    projected = {"_id": document["_id"]}
+    for field in fields:
+        top, _, key = field.partition(".")
+        if key:
+            projected.setdefault(top, {})[key] = document[top].get(key)
+        else:
+            projected[top] = document[top]
+    return projected
+
+
+def measure(name, documents, run):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        body = run(documents)
+        best = min(best, time.perf_counter() - start)
+    per_document = best / len(documents) * 1e6
+    print(f"  {name:<44} {per_document:8.2f} us/doc  {len(body) / len(documents):7.0f} bytes/doc")
+    return per_document
+
+
+def instance_bytes(cls, documents):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    instances = [load(cls, document) for document in documents]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del instances
+    return allocated / len(documents)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=5000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    stdlib = DefaultJSONProvider(app)
+    provider = MongoJSONProvider(app)
+    documents = make_documents(args.documents)
+    projected = [project(document, VIDEO_LIST_FIELDS) for document in documents]
+
+    def legacy(docs):
+        return stdlib.dumps([load(LegacyVideo, doc).to_dict() for doc in docs])
+
+    print(f"{args.documents} video documents, orjson {'installed' if json_provider.orjson else 'missing'}")
+    before = measure("dict model round trip + stdlib jsonify", documents, legacy)
+    measure("MongoJSONProvider, full documents", documents, provider.dumps)
+    after = measure("MongoJSONProvider, listing projection", projected, provider.dumps)
+    if json_provider.orjson:
+        orjson, json_provider.orjson = json_provider.orjson, None
+        measure("MongoJSONProvider without orjson, projected", projected, provider.dumps)
+        json_provider.orjson = orjson
+    print(f"Speedup: {before / after:.1f}x per document")
+
+    legacy_size = instance_bytes(LegacyVideo, documents)
+    slotted_size = instance_bytes(Video, documents)
+    print(f"Model instance: {legacy_size:.0f} bytes with __dict__, {slotted_size:.0f} bytes with __slots__")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""Throughput and peak memory of each processing stage on synthetic media.
+
+Generates deterministic videos (see synthetic_media.py) for each --media
+entry, then runs every VideoService stage, the whole process_video
+pipeline and the VideoProcessor operations on them against a mongomock
+database. Each operation runs in a fresh spawned process, so its peak RSS
+(and that of the ffmpeg processes it starts) is its own, and caches from
+an earlier operation do not flatter it. Stages run standalone, each
+paying for its own decode, where process_video shares one between them.
+
+Writes throughput (seconds of media per wall second) and peak RSS as
+JSON. With --baseline, compares against an earlier file and exits with
+status 1 when an operation got slower or bigger than --tolerance allows.
+
+Run from the backend directory:
+
+    python benchmarks/bench_stages.py [--media 10s@640x360 30s@1280x720] [--output stages.json]
+        [--baseline previous.json --tolerance 0.2]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import queue
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import importlib.util
+import multiprocessing
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_media import cached_video  # noqa: E402
+
+USER_ID = "64b7f0c2a1b2c3d4e5f60718"
+
+# operation -> (VideoService method or None for process_video, options,
+# check that the stage produced something, modules it needs)
+SERVICE_STAGES = {
+    "extract_metadata": ("_extract_metadata", {}, lambda video: video.metadata.get("duration"), ()),
+    "cut_silence": ("_cut_silence", {"cut_silence": True},
+                    lambda video: video.outputs.get("processed_video"), ()),
+    "enhance_audio": ("_enhance_audio", {"enhance_audio": True},
+                      lambda video: video.outputs.get("processed_video"), ("pydub",)),
+    "detect_scenes": ("_detect_scenes", {"detect_scenes": True},
+                      lambda video: video.metadata.get("scenes"), ("cv2",)),
+    "generate_thumbnail": ("_generate_thumbnail", {"generate_thumbnail": True},
+                           lambda video: video.outputs.get("thumbnail"), ("cv2",)),
+    "video_enhancements": ("_apply_video_enhancements", {"brightness": 115, "contrast": 110},
+                           lambda video: video.outputs.get("processed_video"), ()),
+    "package_hls": ("_package_hls", {"hls": True}, lambda video: video.outputs.get("hls"), ()),
+    "generate_subtitles": ("_generate_subtitles", {"generate_subtitles": True, "subtitle_language": "en"},
+                           lambda video: video.outputs.get("subtitles"), ("whisper",)),
+    "summarize": ("_summarize_video", {"summarize": True},
+                  lambda video: video.outputs.get("summary"), ("whisper", "transformers")),
+    "process_video": (None, {"cut_silence": True, "detect_scenes": True, "generate_thumbnail": True,
+                             "brightness": 115, "contrast": 110, "hls": True},
+                      lambda video: video.status == "completed", ()),
+}
+
+PROCESSOR_OPERATIONS = {
+    "cut_silence": lambda processor: processor.cut_silence(),
+    "generate_thumbnail": lambda processor: processor.generate_thumbnail(),
+    "enhance_audio": lambda processor: processor.enhance_audio(),
+}
+
+
+def peak_rss_mb(who):
+    peak = resource.getrusage(who).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_service_stage(name, source, workdir):
+    import mongomock
+    from services.video_service import VideoService
+    from media_context import MediaContext
+
+    os.environ["UPLOAD_FOLDER"] = workdir
+    method, options, check, _ = SERVICE_STAGES[name]
+    service = VideoService(mongomock.MongoClient().db)
+    filepath = os.path.join(workdir, os.path.basename(source))
+    os.symlink(source, filepath)
+
+    if name == "extract_metadata":
+        from models.video import Video
+        video = Video(user_id=USER_ID, filename=os.path.basename(source), filepath=filepath,
+                      size=os.path.getsize(source))
+        start = time.perf_counter()
+        service._extract_metadata(video)
+        return time.perf_counter() - start, bool(check(video))
+
+    video_id = service.create_video(filepath, os.path.basename(source), USER_ID)
+    if method is None:
+        start = time.perf_counter()
+        service.process_video(video_id, options)
+        elapsed = time.perf_counter() - start
+        return elapsed, bool(check(service.get_video(video_id)))
+
+    video = service.get_video(video_id)
+    speech = bool(options.get("generate_subtitles") or options.get("summarize"))
+    start = time.perf_counter()
+    with MediaContext(video.filepath, video.metadata, speech_audio=speech) as media:
+        if name == "detect_scenes":
+            getattr(service, method)(video, media)
+        else:
+            getattr(service, method)(video, options, media)
+    return time.perf_counter() - start, bool(check(video))
+
+
+def run_processor_operation(name, source, workdir):
+    from video_processor import VideoProcessor
+
+    start = time.perf_counter()
+    processor = VideoProcessor(source)
+    try:
+        result = PROCESSOR_OPERATIONS[name](processor)
+    finally:
+        # not cleanup(): that deletes the source file
+        processor.video.close()
+    return time.perf_counter() - start, result is not None
+
+
+def child(kind, name, source, results):
+    """One operation in its own process; reports seconds, outcome and peak RSS"""
+    run = run_service_stage if kind == "VideoService" else run_processor_operation
+    workdir = tempfile.mkdtemp(prefix="bench_stages_")
+    outcome = {"rss_before_mb": peak_rss_mb(resource.RUSAGE_SELF)}
+    try:
+        seconds, ok = run(name, source, workdir)
+        outcome.update(seconds=seconds, ok=ok)
+    except Exception as e:
+        outcome.update(ok=False, error=f"{type(e).__name__}: {e}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    outcome["peak_rss_mb"] = peak_rss_mb(resource.RUSAGE_SELF)
+    outcome["ffmpeg_peak_rss_mb"] = peak_rss_mb(resource.RUSAGE_CHILDREN)
+    results.put(outcome)
+
+
+def measure(kind, name, source, duration):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=child, args=(kind, name, source, results))
+    process.start()
+    while True:
+        try:
+            outcome = results.get(timeout=1)
+            break
+        except queue.Empty:
+            if not process.is_alive():
+                # killed outright, e.g. by the OOM killer
+                outcome = {"ok": False, "error": f"exit code {process.exitcode}",
+                           "peak_rss_mb": None, "ffmpeg_peak_rss_mb": None}
+                break
+    process.join()
+    if outcome.get("seconds"):
+        outcome["throughput"] = round(duration / outcome["seconds"], 3)
+        outcome["seconds"] = round(outcome["seconds"], 3)
+    return outcome
+
+
+def missing_modules(modules):
+    return [module for module in modules if importlib.util.find_spec(module) is None]
+
+
+def parse_media(spec):
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)s@(\d+)x(\d+)", spec)
+    if not match:
+        raise argparse.ArgumentTypeError(f"expected e.g. 10s@640x360, got {spec!r}")
+    return float(match.group(1)), int(match.group(2)), int(match.group(3))
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing operations that regressed against ``baseline``"""
+    previous = {(r["media"], r["operation"]): r for r in baseline.get("results", []) if r.get("ok")}
+    regressions = []
+    for result in results:
+        before = previous.get((result["media"], result["operation"]))
+        if not before or not result.get("ok"):
+            continue
+        if result["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{result['media']} {result['operation']}: throughput "
+                               f"{before['throughput']:.2f}x -> {result['throughput']:.2f}x")
+        if result["peak_rss_mb"] > before["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{result['media']} {result['operation']}: peak RSS "
+                               f"{before['peak_rss_mb']:.0f} MB -> {result['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--media", nargs="+", type=parse_media, default=[(10, 640, 360), (30, 1280, 720)],
+                        metavar="SECONDSs@WIDTHxHEIGHT")
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--only", nargs="+", help="operation names to run, e.g. cut_silence process_video")
+    parser.add_argument("--media-dir", default=os.path.join(tempfile.gettempdir(), "snipx_bench_media"))
+    parser.add_argument("--output", default="stage_benchmark.json")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    operations = [("VideoService", name, SERVICE_STAGES[name][3]) for name in SERVICE_STAGES]
+    operations += [("VideoProcessor", name, ("moviepy", "pydub")) for name in PROCESSOR_OPERATIONS]
+    if args.only:
+        operations = [operation for operation in operations if operation[1] in args.only]
+
+    results = []
+    for seconds, width, height in args.media:
+        label = f"{seconds:g}s@{width}x{height}"
+        source = cached_video(args.media_dir, seconds, width, height, args.fps)
+        print(f"{label} ({os.path.getsize(source) / 1e6:.1f} MB)")
+        for kind, name, modules in operations:
+            result = {"media": label, "duration": seconds, "width": width, "height": height,
+                      "fps": args.fps, "operation": f"{kind}.{name}"}
+            missing = missing_modules(modules)
+            if missing:
+                result.update(ok=False, skipped=f"not installed: {', '.join(missing)}")
+                print(f"  {result['operation']:<36} skipped ({result['skipped']})")
+            else:
+                result.update(measure(kind, name, source, seconds))
+                status = "" if result["ok"] else f"  FAILED {result.get('error', 'no output')}"
+                print(f"  {result['operation']:<36} {result.get('seconds', 0):8.2f} s "
+                      f"{result.get('throughput', 0):7.2f}x  peak {result['peak_rss_mb'] or 0:6.0f} MB "
+                      f"(ffmpeg {result['ffmpeg_peak_rss_mb'] or 0:.0f} MB){status}")
+            results.append(result)
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
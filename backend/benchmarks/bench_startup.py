@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Cold-start benchmark for the backend.
+
+Measures per-module import cost with ``python -X importtime`` and boots
+``app.py`` against an in-memory MongoDB stand-in (mongomock) to check that
+the auth and support endpoints work without loading any ML/media library.
+
+Run from the backend directory:
+
+    python benchmarks/bench_startup.py [--top 15]
+
+Exits non-zero if a heavy module is imported during startup.
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVICE_IMPORTS = (
+    "import services.auth_service, services.support_service, "
+    "services.video_service, services.job_service, model_registry"
+)
+
+# Executed in a fresh interpreter so nothing is imported up front
+BOOT_SCRIPT = r"""
+import sys, json, time
+start = time.perf_counter()
+import mongomock, pymongo
+pymongo.MongoClient = mongomock.MongoClient
+import app
+boot_seconds = time.perf_counter() - start
+
+import startup_report
+client = app.app.test_client()
+results = {}
+
+resp = client.post('/api/auth/register', json={
+    'email': 'bench@example.com', 'password': 'benchmark-password',
+    'firstName': 'Bench', 'lastName': 'User'})
+results['register'] = resp.status_code
+resp = client.post('/api/auth/login', json={
+    'email': 'bench@example.com', 'password': 'benchmark-password'})
+results['login'] = resp.status_code
+headers = {'Authorization': 'Bearer ' + resp.get_json()['token']}
+resp = client.post('/api/support/tickets', headers=headers, json={
+    'name': 'Bench', 'email': 'bench@example.com', 'subject': 'Startup',
+    'description': 'Startup benchmark ticket', 'priority': 'low', 'type': 'question'})
+results['create_ticket'] = resp.status_code
+resp = client.get('/api/support/tickets', headers=headers)
+results['list_tickets'] = resp.status_code
+
+print(json.dumps({
+    'boot_seconds': boot_seconds,
+    'responses': results,
+    'report': startup_report.report()
+}))
+"""
+
+
+def import_time_breakdown(top):
+    """Return the most expensive packages as (self_us, package) pairs"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SERVICE_IMPORTS],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    totals = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _cumulative_us, name = line[len("import time:"):].split("|")
+        # Charge each module's own time to its top-level package
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(self_us)
+    return sorted(((us, name) for name, us in totals.items()), reverse=True)[:top]
+
+
+def boot_app():
+    env = dict(os.environ, JWT_SECRET_KEY=os.getenv("JWT_SECRET_KEY", "benchmark-secret"))
+    proc = subprocess.run(
+        [sys.executable, "-c", BOOT_SCRIPT],
+        cwd=BACKEND_DIR, capture_output=True, text=True, env=env
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip())
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=15, help="number of modules to list")
+    args = parser.parse_args()
+
+    print("Import time of service modules by top-level package:")
+    for self_us, name in import_time_breakdown(args.top):
+        print(f"  {name:<24} {self_us / 1000:8.1f} ms")
+
+    result = boot_app()
+    print(f"\napp.py boot (mongomock): {result['boot_seconds'] * 1000:.0f} ms")
+    for phase in sorted(result["report"]["phases"], key=lambda p: p["seconds"], reverse=True):
+        print(f"  {phase['phase']:<24} {phase['seconds'] * 1000:8.1f} ms")
+    print(f"Endpoint status codes: {result['responses']}")
+
+    heavy = result["report"]["heavy_modules_loaded"]
+    expected = {"register": 201, "login": 200, "create_ticket": 201, "list_tickets": 200}
+    if heavy:
+        print(f"FAIL: heavy modules loaded at startup: {', '.join(heavy)}")
+        return 1
+    if result["responses"] != expected:
+        print("FAIL: auth/support endpoints did not respond as expected")
+        return 1
+    print("OK: auth/support endpoints served without loading ML/media libraries")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
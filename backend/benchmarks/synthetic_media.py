@@ -0,0 +1,94 @@
+"""Deterministic synthetic videos for the benchmarks.
+
+Frames are NumPy-drawn shots (a gradient in a seeded palette with a moving
+block) that change every SHOT_SECONDS, so scene detection and thumbnails
+have real cuts to find. The audio alternates amplitude-modulated tones
+with stretches of silence, so silence cutting has something to remove.
+The same arguments always give the same media.
+"""
+
+import os
+import sys
+import wave
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ffmpeg_tools import VideoWriter  # noqa: E402
+
+SHOT_SECONDS = 3.0
+TONE_SECONDS = 1.2
+SILENCE_SECONDS = 0.6
+
+
+def make_frames(seconds, width, height, fps, seed=0):
+    """Yield ``seconds * fps`` RGB frames"""
+    rng = np.random.default_rng(seed)
+    ramp_x = np.linspace(0.0, 1.0, width, dtype=np.float32)[None, :, None]
+    ramp_y = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None, None]
+    block = max(8, min(width, height) // 6)
+    total = int(round(seconds * fps))
+    shot_frames = max(1, int(SHOT_SECONDS * fps))
+    background = None
+
+    for index in range(total):
+        if index % shot_frames == 0:
+            low, high = rng.integers(0, 256, size=(2, 3)).astype(np.float32)
+            background = (low + (high - low) * (0.6 * ramp_x + 0.4 * ramp_y)).astype(np.uint8)
+            colour = rng.integers(0, 256, size=3, dtype=np.uint8)
+        frame = background.copy()
+        x = (index * 7) % max(1, width - block)
+        y = (index * 3) % max(1, height - block)
+        frame[y:y + block, x:x + block] = colour
+        yield frame
+
+
+def make_audio(seconds, sample_rate=48000, channels=2, seed=0):
+    """int16 PCM, shape (samples, channels): tones at -12 dBFS, then silence"""
+    rng = np.random.default_rng(seed)
+    samples = int(round(seconds * sample_rate))
+    pcm = np.zeros(samples, dtype=np.float32)
+    period = TONE_SECONDS + SILENCE_SECONDS
+    start = 0.0
+    while start < seconds:
+        begin = int(start * sample_rate)
+        end = min(samples, int((start + TONE_SECONDS) * sample_rate))
+        t = np.arange(end - begin, dtype=np.float32) / sample_rate
+        frequency = rng.uniform(180.0, 900.0)
+        envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4.0 * t)  # syllable-rate wobble
+        pcm[begin:end] = 0.25 * envelope * np.sin(2 * np.pi * frequency * t)
+        start += period
+    pcm = (pcm * 32767).astype(np.int16)
+    return np.repeat(pcm[:, None], channels, axis=1)
+
+
+def write_wav(path, pcm, sample_rate):
+    with wave.open(path, 'wb') as out:
+        out.setnchannels(pcm.shape[1])
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        out.writeframes(np.ascontiguousarray(pcm).tobytes())
+
+
+def make_video(path, seconds, width, height, fps=25, sample_rate=48000, seed=0):
+    """Encode a synthetic H.264/AAC MP4 at ``path`` and return the path"""
+    with tempfile.TemporaryDirectory() as scratch:
+        audio_path = os.path.join(scratch, 'audio.wav')
+        write_wav(audio_path, make_audio(seconds, sample_rate, seed=seed), sample_rate)
+        with VideoWriter(path, width, height, fps, audio_source=audio_path, preset='veryfast', crf=23) as writer:
+            for frame in make_frames(seconds, width, height, fps, seed=seed):
+                writer.write(frame)
+    return path
+
+
+def cached_video(directory, seconds, width, height, fps=25, seed=0):
+    """``make_video`` into ``directory``, reusing a file made earlier with the same arguments"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"synthetic_{seconds:g}s_{width}x{height}_{fps}fps_{seed}.mp4")
+    if not os.path.exists(path):
+        partial = f"{path}.partial.mp4"
+        make_video(partial, seconds, width, height, fps, seed=seed)
+        os.replace(partial, path)
+    return path
@@ -0,0 +1,143 @@
+import os
+import bisect
+import shutil
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from ffmpeg_tools import run_ffmpeg, keyframe_times
+
+logger = logging.getLogger(__name__)
+
+# Copy spans shorter than this are not worth a separate stream-copied piece
+MIN_COPY_SECONDS = 0.5
+# Segment split points sit just before the keyframe so rounding in the
+# printed time can never push the split onto the following keyframe
+SPLIT_EPSILON = 0.001
+
+
+def build_cut_plan(keep_intervals, keyframes, min_copy=MIN_COPY_SECONDS):
+    """Turn the intervals to keep into stream-copy and re-encode pieces.
+
+    Inside each kept interval, the span between the first and the last
+    keyframe can be copied packet for packet. Only the partial GOPs at
+    either end, where the cut does not fall on a keyframe, are re-encoded.
+
+    Returns a list of ``{"start", "end", "mode"}`` dicts in output order,
+    ``mode`` being ``"copy"`` or ``"encode"``.
+    """
+    plan = []
+    for start, end in keep_intervals:
+        if end <= start:
+            continue
+        first = bisect.bisect_left(keyframes, start)
+        last = bisect.bisect_right(keyframes, end) - 1
+        if first < len(keyframes) and last >= first and keyframes[last] - keyframes[first] >= min_copy:
+            copy_start, copy_end = keyframes[first], keyframes[last]
+            if copy_start > start:
+                plan.append({"start": start, "end": copy_start, "mode": "encode"})
+            plan.append({"start": copy_start, "end": copy_end, "mode": "copy"})
+            if end > copy_end:
+                plan.append({"start": copy_end, "end": end, "mode": "encode"})
+        else:
+            plan.append({"start": start, "end": end, "mode": "encode"})
+    return plan
+
+
+def cut_intervals(source, output_path, keep_intervals, info, workers=None):
+    """Write ``output_path`` containing only ``keep_intervals`` of ``source``.
+
+    ``info`` is the probe dict of the source (see ffmpeg_tools.probe). H.264
+    sources are cut with a smart-cut plan; other codecs, or a failed smart
+    cut, fall back to a single re-encode through ffmpeg's select filters.
+    """
+    if not keep_intervals:
+        raise ValueError("Nothing left to keep after cutting silence")
+
+    if info.get("video_codec") == "h264":
+        try:
+            plan = build_cut_plan(keep_intervals, keyframe_times(source))
+            _execute_plan(source, output_path, plan, info, workers)
+            return plan
+        except Exception as e:
+            logger.warning(f"Smart cut failed, re-encoding instead: {e}")
+
+    _reencode_intervals(source, output_path, keep_intervals, info)
+    return [{"start": s, "end": e, "mode": "encode"} for s, e in keep_intervals]
+
+
+def _execute_plan(source, output_path, plan, info, workers):
+    copies = [piece for piece in plan if piece["mode"] == "copy"]
+    encodes = [piece for piece in plan if piece["mode"] == "encode"]
+    workdir = tempfile.mkdtemp(prefix="cut_", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        # 1. One stream-copy pass splits the source at every copy boundary
+        if copies:
+            boundaries = sorted({p["start"] for p in copies} | {p["end"] for p in copies})
+            audio_args = ["-c:a", "copy"] if info.get("audio_codec") == "aac" else _audio_encode_args(info)
+            run_ffmpeg([
+                "-i", source, "-map", "0:v:0", "-map", "0:a:0?",
+                "-c:v", "copy", *audio_args,
+                "-f", "segment", "-segment_format", "mpegts", "-reset_timestamps", "1",
+                "-segment_times", ",".join(f"{max(t - SPLIT_EPSILON, 0):.6f}" for t in boundaries),
+                os.path.join(workdir, "split_%05d.ts")
+            ])
+            for piece in copies:
+                # Segment 0 is everything before the first boundary
+                piece["path"] = os.path.join(workdir, f"split_{boundaries.index(piece['start']) + 1:05d}.ts")
+
+        # 2. The boundary GOPs are short, so encode them in parallel
+        for index, piece in enumerate(encodes):
+            piece["path"] = os.path.join(workdir, f"encode_{index:05d}.ts")
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 2) as pool:
+            list(pool.map(lambda piece: _encode_piece(source, piece, info), encodes))
+
+        # 3. Join the pieces in timeline order without touching the packets
+        list_path = os.path.join(workdir, "pieces.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for piece in plan:
+                f.write(f"file '{os.path.abspath(piece['path'])}'\n")
+        run_ffmpeg([
+            "-f", "concat", "-safe", "0", "-i", list_path,
+            "-map", "0", "-c", "copy", "-bsf:a", "aac_adtstoasc",
+            "-movflags", "+faststart", output_path
+        ])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _encode_piece(source, piece, info):
+    video_args = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-pix_fmt", "yuv420p"]
+    if info.get("fps"):
+        video_args += ["-r", f"{info['fps']:g}"]
+    run_ffmpeg([
+        "-ss", f"{piece['start']:.6f}", "-i", source,
+        "-t", f"{piece['end'] - piece['start']:.6f}",
+        "-map", "0:v:0", "-map", "0:a:0?",
+        *video_args, *_audio_encode_args(info),
+        "-f", "mpegts", piece["path"]
+    ])
+
+
+def _audio_encode_args(info):
+    args = ["-c:a", "aac", "-b:a", "192k"]
+    if info.get("sample_rate"):
+        args += ["-ar", str(info["sample_rate"])]
+    if info.get("channels"):
+        args += ["-ac", str(info["channels"])]
+    return args
+
+
+def _reencode_intervals(source, output_path, keep_intervals, info):
+    if not info.get("video_codec") and not info.get("audio_codec"):
+        raise ValueError(f"{source} has no video or audio stream to cut")
+    expr = "+".join(f"between(t,{s:.6f},{e:.6f})" for s, e in keep_intervals)
+    filters = []
+    maps = []
+    if info.get("video_codec"):
+        filters.append(f"[0:v:0]select='{expr}',setpts=N/FRAME_RATE/TB[v]")
+        maps += ["-map", "[v]", "-c:v", "libx264", "-preset", "veryfast", "-crf", "20"]
+    if info.get("audio_codec"):
+        filters.append(f"[0:a:0]aselect='{expr}',asetpts=N/SR/TB[a]")
+        maps += ["-map", "[a]", *_audio_encode_args(info)]
+    run_ffmpeg(["-i", source, "-filter_complex", ";".join(filters), *maps, output_path])
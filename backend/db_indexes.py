@@ -0,0 +1,46 @@
+import logging
+
+from pymongo import ASCENDING, DESCENDING
+
+logger = logging.getLogger(__name__)
+
+# collection -> index key lists, or (keys, options); the listing indexes end
+# with the keyset sort (time, _id) so a page is a bounded index range scan
+INDEXES = {
+    "videos": [
+        [("user_id", ASCENDING), ("upload_date", DESCENDING), ("_id", DESCENDING)],
+    ],
+    "support_tickets": [
+        [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+        [("status", ASCENDING), ("priority", ASCENDING), ("created_at", DESCENDING)],
+    ],
+    "users": [
+        [("email", ASCENDING)],
+    ],
+    "jobs": [
+        [("video_id", ASCENDING), ("status", ASCENDING)],
+        # at most one queued or running job per video; see JobService
+        ([("video_id", ASCENDING)], {"unique": True, "partialFilterExpression": {"active": True},
+                                     "name": "video_id_active_unique"}),
+    ],
+    "revoked_tokens": [
+        # Mongo drops a revocation once the token would have expired anyway
+        ([("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+        [("revoked_at", ASCENDING)],
+    ],
+}
+
+
+def ensure_indexes(db):
+    """Create the indexes the queries rely on; a no-op for the ones that exist.
+
+    A failure is logged rather than raised: the app still works without an
+    index, only slower.
+    """
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            keys, options = index if isinstance(index, tuple) else (index, {})
+            try:
+                db[collection].create_index(keys, background=True, **options)
+            except Exception as e:
+                logger.error(f"Creating index {keys} on {collection} failed: {str(e)}")
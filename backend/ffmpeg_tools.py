@@ -0,0 +1,264 @@
+import os
+import re
+import shutil
+import queue
+import threading
+import subprocess
+
+import numpy as np
+
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_VIDEO_RE = re.compile(r"Stream #\S+.*?: Video: (\w+).*?, (\d{2,5})x(\d{2,5})")
+_FPS_RE = re.compile(r"(\d+(?:\.\d+)?) (?:fps|tbr)")
+_AUDIO_RE = re.compile(r"Stream #\S+.*?: Audio: (\w+).*?, (\d+) Hz, ([^,]+)")
+
+_ROTATION_RE = re.compile(r"(?:rotation of|rotate\s*:)\s*(-?\d+(?:\.\d+)?)")
+_SHOWINFO_PTS_RE = re.compile(r"pts_time:\s*(-?\d+(?:\.\d+)?)")
+
+_PIX_FMT_CHANNELS = {"rgb24": 3, "bgr24": 3, "gray": 1}
+
+_CHANNEL_LAYOUTS = {"mono": 1, "stereo": 2, "2.1": 3, "quad": 4, "5.0": 5, "5.1": 6, "7.1": 8}
+
+
+def ffmpeg_binary():
+    """Locate ffmpeg: FFMPEG_BINARY, then the imageio-ffmpeg copy moviepy uses, then PATH"""
+    binary = os.getenv('FFMPEG_BINARY')
+    if binary:
+        return binary
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return shutil.which('ffmpeg') or 'ffmpeg'
+
+
+def ffprobe_binary():
+    """Locate ffprobe next to ffmpeg or on PATH, None if it is not installed"""
+    binary = os.getenv('FFPROBE_BINARY')
+    if binary:
+        return binary
+    sibling = os.path.join(os.path.dirname(ffmpeg_binary()), 'ffprobe')
+    for candidate in (sibling, sibling + '.exe'):
+        if os.path.isfile(candidate):
+            return candidate
+    return shutil.which('ffprobe')
+
+
+def keyframe_times(filepath):
+    """Sorted presentation times (seconds) of the video keyframes.
+
+    Uses ffprobe's packet flags, which only demuxes the file. Without
+    ffprobe, ffmpeg decodes just the keyframes (``-skip_frame nokey``).
+    """
+    ffprobe = ffprobe_binary()
+    times = []
+    if ffprobe:
+        proc = subprocess.run(
+            [ffprobe, "-v", "error", "-select_streams", "v:0",
+             "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", filepath],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        for line in proc.stdout.decode('ascii', errors='ignore').splitlines():
+            pts_time, _, flags = line.partition(',')
+            if flags.startswith('K') and pts_time not in ('', 'N/A'):
+                times.append(float(pts_time))
+    else:
+        proc = subprocess.run(
+            [ffmpeg_binary(), "-hide_banner", "-nostdin", "-skip_frame", "nokey",
+             "-i", filepath, "-map", "0:v:0", "-vf", "showinfo", "-f", "null", "-"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        for match in _SHOWINFO_PTS_RE.finditer(proc.stderr.decode('utf-8', errors='replace')):
+            times.append(float(match.group(1)))
+    return sorted(set(times))
+
+
+def probe(filepath):
+    """Read container info from the header ffmpeg prints for ``-i``.
+
+    Returns duration, video codec/size/fps and audio codec/rate/channels;
+    fields ffmpeg does not report are None.
+    """
+    proc = subprocess.run(
+        [ffmpeg_binary(), "-hide_banner", "-i", filepath],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    info = proc.stderr.decode('utf-8', errors='replace')
+    result = {
+        "duration": None,
+        "video_codec": None, "width": None, "height": None, "fps": None,
+        "audio_codec": None, "sample_rate": None, "channels": None
+    }
+
+    match = _DURATION_RE.search(info)
+    if match:
+        hours, minutes, seconds = match.groups()
+        result["duration"] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    for line in info.splitlines():
+        video = _VIDEO_RE.search(line)
+        if video and result["video_codec"] is None:
+            result["video_codec"] = video.group(1)
+            result["width"] = int(video.group(2))
+            result["height"] = int(video.group(3))
+            fps = _FPS_RE.search(line)
+            if fps:
+                result["fps"] = float(fps.group(1))
+        audio = _AUDIO_RE.search(line)
+        if audio and result["audio_codec"] is None:
+            result["audio_codec"] = audio.group(1)
+            result["sample_rate"] = int(audio.group(2))
+            layout = audio.group(3).strip().split('(')[0]
+            result["channels"] = _CHANNEL_LAYOUTS.get(layout, 2)
+
+    # ffmpeg autorotates decoded frames, so report the displayed size
+    rotation = _ROTATION_RE.search(info)
+    if rotation and result["width"] and round(abs(float(rotation.group(1)))) % 180 == 90:
+        result["width"], result["height"] = result["height"], result["width"]
+
+    if result["duration"] is None and result["video_codec"] is None and result["audio_codec"] is None:
+        raise ValueError(f"ffmpeg could not read {filepath}")
+    return result
+
+
+def run_ffmpeg(args):
+    """Run ffmpeg with the given arguments, raising with its stderr on failure"""
+    proc = subprocess.run(
+        [ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y"] + list(args),
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {proc.stderr.decode('utf-8', errors='replace').strip()}")
+
+
+def iter_frames(filepath, width, height, pix_fmt="rgb24", video_filter=None, input_args=None,
+                max_frames=None):
+    """Decode a video through an ffmpeg pipe, yielding writable uint8 frames.
+
+    ``width``/``height`` are the size of the frames ffmpeg outputs, so pass
+    a matching ``scale`` in ``video_filter`` to read downscaled frames.
+    ``input_args`` go before ``-i`` (e.g. ``["-ss", "12.5"]`` to seek).
+    """
+    cmd = _frame_pipe_cmd(filepath, pix_fmt, video_filter, input_args, max_frames, "error")
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            bufsize=_frame_bytes(width, height, pix_fmt))
+    try:
+        yield from _read_frames(proc.stdout, width, height, pix_fmt)
+    finally:
+        proc.stdout.close()
+        proc.kill()
+        proc.wait()
+
+
+def iter_timed_frames(filepath, width, height, pix_fmt="rgb24", video_filter=None, input_args=None):
+    """Like iter_frames, yielding ``(pts_seconds, frame)``.
+
+    Timestamps come from a ``showinfo`` filter appended to ``video_filter``
+    and read from stderr in the same pass, so filters that drop frames
+    (``-skip_frame nokey`` in ``input_args``, ``fps=...``) still report
+    where each output frame sits in the source.
+    """
+    video_filter = f"{video_filter},showinfo" if video_filter else "showinfo"
+    # One output frame per filtered frame: no duplicates to fill a constant rate
+    cmd = _frame_pipe_cmd(filepath, pix_fmt, video_filter, input_args, None, "info",
+                          output_args=["-vsync", "passthrough", "-nostats"])
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            bufsize=_frame_bytes(width, height, pix_fmt))
+    times = queue.Queue()
+
+    def read_times():
+        for line in proc.stderr:
+            if b"Parsed_showinfo" in line:
+                match = _SHOWINFO_PTS_RE.search(line.decode("utf-8", errors="replace"))
+                if match:
+                    times.put(float(match.group(1)))
+        times.put(None)
+
+    reader = threading.Thread(target=read_times, daemon=True)
+    reader.start()
+    try:
+        for frame in _read_frames(proc.stdout, width, height, pix_fmt):
+            # showinfo logs a frame before it reaches the output pipe
+            pts = times.get(timeout=30)
+            if pts is None:
+                break
+            yield pts, frame
+    finally:
+        proc.stdout.close()
+        proc.kill()
+        proc.wait()
+        reader.join(timeout=5)
+
+
+def _frame_pipe_cmd(filepath, pix_fmt, video_filter, input_args, max_frames, loglevel, output_args=None):
+    cmd = [ffmpeg_binary(), "-hide_banner", "-loglevel", loglevel, "-nostdin"]
+    cmd += list(input_args or []) + ["-i", filepath, "-map", "0:v:0"]
+    if video_filter:
+        cmd += ["-vf", video_filter]
+    if max_frames:
+        cmd += ["-frames:v", str(max_frames)]
+    return cmd + list(output_args or []) + ["-f", "rawvideo", "-pix_fmt", pix_fmt, "pipe:1"]
+
+
+def _frame_bytes(width, height, pix_fmt):
+    return width * height * _PIX_FMT_CHANNELS[pix_fmt]
+
+
+def _read_frames(stdout, width, height, pix_fmt):
+    channels = _PIX_FMT_CHANNELS[pix_fmt]
+    frame_bytes = width * height * channels
+    shape = (height, width, channels) if channels > 1 else (height, width)
+    while True:
+        buffer = bytearray(frame_bytes)
+        view = memoryview(buffer)
+        filled = 0
+        while filled < frame_bytes:
+            count = stdout.readinto(view[filled:])
+            if not count:
+                break
+            filled += count
+        if filled < frame_bytes:
+            return
+        yield np.frombuffer(buffer, dtype=np.uint8).reshape(shape)
+
+
+class VideoWriter:
+    """Encode raw frames to H.264, muxing the audio track of ``audio_source``"""
+
+    def __init__(self, output_path, width, height, fps, audio_source=None, pix_fmt="rgb24",
+                 preset=None, crf=None):
+        cmd = [
+            ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "rawvideo", "-pix_fmt", pix_fmt, "-s", f"{width}x{height}",
+            "-r", f"{fps:g}", "-i", "pipe:0"
+        ]
+        if audio_source:
+            cmd += ["-i", audio_source, "-map", "0:v:0", "-map", "1:a:0?", "-c:a", "aac"]
+        cmd += [
+            "-c:v", "libx264",
+            "-preset", preset or os.getenv('VIDEO_ENCODE_PRESET', 'medium'),
+            "-crf", str(crf or os.getenv('VIDEO_ENCODE_CRF', 20)),
+            "-pix_fmt", "yuv420p", "-movflags", "+faststart", "-shortest",
+            output_path
+        ]
+        self.output_path = output_path
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._proc.kill()
+            self._proc.wait()
+
+    def write(self, frame):
+        self._proc.stdin.write(np.ascontiguousarray(frame).data)
+
+    def close(self):
+        self._proc.stdin.close()
+        err = self._proc.stderr.read()
+        if self._proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg encode failed: {err.decode('utf-8', errors='replace').strip()}")
@@ -0,0 +1,55 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def brightness_contrast_lut(brightness, contrast):
+    """256-entry uint8 table for the brightness/contrast pixel map.
+
+    ``brightness`` and ``contrast`` are multipliers (1.0 = unchanged); the
+    table matches the old float pipeline: scale, stretch around 128, clip,
+    truncate.
+    """
+    values = np.arange(256, dtype=np.float32)
+    if brightness != 1.0:
+        values = values * brightness
+    if contrast != 1.0:
+        values = (values - 128) * contrast + 128
+    return np.clip(values, 0, 255).astype(np.uint8)
+
+
+def apply_lut(frame, lut):
+    """Map every pixel of a uint8 frame through ``lut`` in place"""
+    if not frame.flags.writeable:
+        frame = frame.copy()
+    try:
+        import cv2
+        cv2.LUT(frame, lut, dst=frame)
+    except ImportError:
+        np.take(lut, frame, out=frame)
+    return frame
+
+
+def map_frames_ordered(frames, func, workers=None, max_pending=None):
+    """Apply ``func`` to each frame on a thread pool, yielding results in input order.
+
+    cv2 and NumPy release the GIL, so per-frame filters scale across cores.
+    At most ``max_pending`` frames are in flight, which bounds memory use.
+    """
+    workers = workers or int(os.getenv('FRAME_FILTER_WORKERS', 0)) or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+    if workers == 1:
+        for frame in frames:
+            yield func(frame)
+        return
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for frame in frames:
+            pending.append(pool.submit(func, frame))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,31 @@
+"""gunicorn settings for the API; gunicorn reads this file when started from
+the backend directory:
+
+    gunicorn app:app
+
+Workers are threaded (gthread): /api/videos/<id>/events holds a connection
+open for the whole processing run, which would take a sync worker out of
+service and be killed at its request timeout. With gthread a stream only
+holds one of the worker's threads, and ``timeout`` is the worker's own
+liveness check, not a limit on how long a response may take. Streams are
+capped at SSE_MAX_STREAMS per worker, half the threads by default, so the
+rest stay free for ordinary requests; past that the client polls.
+
+Each worker has its own job pool, progress bus and metrics registry, so
+one worker serves a port by default: it scales through its threads, and
+processing runs in its job pool. With WEB_CONCURRENCY above 1, /metrics
+answers for whichever worker takes the scrape, and progress streams only
+report percent and ETA for jobs their own worker queued. To use more
+cores, run more instances on separate ports instead.
+"""
+
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+worker_class = 'gthread'
+# Open progress streams count against these, up to SSE_MAX_STREAMS (see app.py)
+threads = int(os.getenv('GUNICORN_THREADS', 32))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
@@ -0,0 +1,109 @@
+import os
+import shutil
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from ffmpeg_tools import run_ffmpeg
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SECONDS = 4
+MASTER_PLAYLIST = "master.m3u8"
+
+# name, height, video bitrate (kbit/s), audio bitrate (kbit/s), H.264 level
+RENDITIONS = [
+    ("1080p", 1080, 5000, 160, "4.0"),
+    ("720p", 720, 2800, 128, "3.1"),
+    ("480p", 480, 1400, 128, "3.0"),
+    ("360p", 360, 800, 96, "3.0"),
+]
+
+_LEVEL_CODECS = {"3.0": "avc1.4d401e", "3.1": "avc1.4d401f", "4.0": "avc1.4d4028"}
+
+
+def select_renditions(source_height):
+    """Renditions no taller than the source; small sources get one at their own size"""
+    ladder = [r for r in RENDITIONS if source_height and r[1] <= source_height]
+    if not ladder:
+        name, height, video_kbps, audio_kbps, level = RENDITIONS[-1]
+        height = source_height // 2 * 2 if source_height else height
+        ladder = [(f"{height}p", height, video_kbps, audio_kbps, level)]
+    return ladder
+
+
+def package_hls(source, output_dir, info, segment_seconds=SEGMENT_SECONDS, workers=None, audio_source=None):
+    """Encode ``source`` into an HLS ladder under ``output_dir``.
+
+    Each rendition is a separate ffmpeg run, so they encode in parallel
+    (HLS_WORKERS, default one per rendition). Keyframes are forced on
+    every segment boundary so all renditions split at the same times
+    and players can switch between them cleanly. With ``audio_source``
+    the sound comes from that file instead of ``source``. Returns the
+    path of the master playlist.
+    """
+    renditions = select_renditions(info.get("height"))
+    has_audio = audio_source is not None or info.get("audio_codec") is not None
+    workers = workers or int(os.getenv('HLS_WORKERS', 0)) or len(renditions)
+
+    # Build into a temporary directory so a half-written ladder is never served
+    build_dir = f"{output_dir.rstrip(os.sep)}.tmp"
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.makedirs(build_dir)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(
+                lambda rendition: _encode_rendition(source, build_dir, rendition, has_audio, segment_seconds,
+                                                    audio_source),
+                renditions
+            ))
+        _write_master_playlist(build_dir, renditions, info, has_audio)
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.replace(build_dir, output_dir)
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+    logger.info(f"Packaged {source} as HLS with {len(renditions)} renditions")
+    return os.path.join(output_dir, MASTER_PLAYLIST)
+
+
+def _encode_rendition(source, build_dir, rendition, has_audio, segment_seconds, audio_source=None):
+    name, height, video_kbps, audio_kbps, level = rendition
+    rendition_dir = os.path.join(build_dir, name)
+    os.makedirs(rendition_dir)
+
+    args = ["-i", source]
+    if audio_source:
+        args += ["-i", audio_source]
+    args += [
+        "-map", "0:v:0",
+        "-vf", f"scale=-2:{height}",
+        "-c:v", "libx264", "-preset", os.getenv('HLS_PRESET', 'veryfast'),
+        "-profile:v", "main", "-level", level, "-pix_fmt", "yuv420p",
+        "-b:v", f"{video_kbps}k", "-maxrate", f"{int(video_kbps * 1.07)}k",
+        "-bufsize", f"{int(video_kbps * 1.5)}k",
+        "-force_key_frames", f"expr:gte(t,n_forced*{segment_seconds})", "-sc_threshold", "0",
+    ]
+    if has_audio:
+        args += ["-map", "1:a:0" if audio_source else "0:a:0",
+                 "-c:a", "aac", "-b:a", f"{audio_kbps}k", "-ac", "2"]
+    args += [
+        "-f", "hls", "-hls_time", str(segment_seconds), "-hls_playlist_type", "vod",
+        "-hls_segment_filename", os.path.join(rendition_dir, "seg_%05d.ts"),
+        os.path.join(rendition_dir, "index.m3u8")
+    ]
+    run_ffmpeg(args)
+
+
+def _write_master_playlist(build_dir, renditions, info, has_audio):
+    source_width, source_height = info.get("width"), info.get("height")
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-INDEPENDENT-SEGMENTS"]
+    for name, height, video_kbps, audio_kbps, level in renditions:
+        width = height * source_width // source_height // 2 * 2 if source_width and source_height else None
+        bandwidth = int((video_kbps * 1.07 + (audio_kbps if has_audio else 0)) * 1000)
+        codecs = _LEVEL_CODECS[level] + (",mp4a.40.2" if has_audio else "")
+        attributes = f"BANDWIDTH={bandwidth},CODECS=\"{codecs}\""
+        if width:
+            attributes += f",RESOLUTION={width}x{height}"
+        lines += [f"#EXT-X-STREAM-INF:{attributes}", f"{name}/index.m3u8"]
+    with open(os.path.join(build_dir, MASTER_PLAYLIST), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
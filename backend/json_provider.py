@@ -0,0 +1,62 @@
+import json
+from datetime import date, datetime
+
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder produces equivalent JSON
+    orjson = None
+
+
+def encode_default(value):
+    """ObjectId as its hex string, datetimes as ISO 8601 (naive ones are UTC)"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return value.isoformat() + "Z"
+        return value.isoformat().replace("+00:00", "Z")
+    if isinstance(value, date):
+        return value.isoformat()
+    # Decimal, UUID, dataclasses as Flask handles them
+    return DefaultJSONProvider.default(value)
+
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """JSON for Mongo documents in one pass, so routes can return them as read.
+
+    With orjson installed, documents are encoded in C, datetimes natively;
+    otherwise by the stdlib encoder with the same values. Either way
+    ObjectId and datetime need no fixing up beforehand.
+    """
+
+    _ORJSON_OPTIONS = (
+        orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+        if orjson else 0
+    )
+
+    def dumps(self, obj, **kwargs):
+        if orjson and not kwargs:
+            return self._dumps_bytes(obj).decode("utf-8")
+        kwargs.setdefault("default", encode_default)
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        if not orjson or pretty:
+            return super().response(*args, **kwargs)
+        # Straight to bytes, skipping the str round trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps_bytes(obj), mimetype=self.mimetype)
+
+    def _dumps_bytes(self, obj):
+        try:
+            return orjson.dumps(obj, default=encode_default, option=self._ORJSON_OPTIONS)
+        except TypeError:
+            # e.g. integers beyond 64 bits, which orjson refuses
+            return json.dumps(obj, default=encode_default, ensure_ascii=self.ensure_ascii,
+                              sort_keys=self.sort_keys).encode("utf-8")
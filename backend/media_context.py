@@ -0,0 +1,149 @@
+import os
+import logging
+import subprocess
+import tempfile
+
+import numpy as np
+
+from ffmpeg_tools import ffmpeg_binary, iter_frames
+from media_probe import probe_media
+
+logger = logging.getLogger(__name__)
+
+SPEECH_SAMPLE_RATE = 16000
+
+
+class MediaContext:
+    """Decoded media shared by the processing stages of one job.
+
+    The audio track is demuxed and decoded once, on first use, into a 16-bit
+    PCM buffer at its native rate and channel count. When ``speech_audio`` is
+    set, the same ffmpeg pass also writes the 16 kHz mono float32 signal
+    Whisper and the HF pipelines expect. Stages read from these buffers
+    instead of opening the file again; video frames are streamed with the
+    probed size instead of through a second moviepy reader.
+    """
+
+    def __init__(self, filepath, metadata=None, speech_audio=False):
+        self.filepath = filepath
+        self.metadata = dict(metadata or {})
+        self.speech_audio_requested = speech_audio
+        self._info = None
+        self._pcm = None
+        self._speech = None
+        self._segment = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def info(self):
+        """Container probe, reused from ``metadata['probe']`` when present"""
+        if self._info is None:
+            self._info = self.metadata.get("probe") or probe_media(self.filepath, self.metadata.get("sha256"))
+            self.metadata["probe"] = self._info
+        return self._info
+
+    @property
+    def duration(self):
+        return self.metadata.get("duration") or self.info["duration"] or 0.0
+
+    @property
+    def has_audio(self):
+        return self.info["audio_codec"] is not None
+
+    @property
+    def sample_rate(self):
+        return self.info["sample_rate"]
+
+    @property
+    def channels(self):
+        return self.info["channels"]
+
+    def pcm(self):
+        """Interleaved int16 samples, shape ``(frames, channels)``"""
+        if self._pcm is None:
+            self._decode()
+        return self._pcm
+
+    def speech_audio(self):
+        """16 kHz mono float32 samples in [-1, 1] for speech models"""
+        if self._speech is None:
+            if self._pcm is None and self.speech_audio_requested:
+                self._decode()
+            else:
+                self._speech = self._downmix_resample(self.pcm(), self.sample_rate, SPEECH_SAMPLE_RATE)
+        return self._speech
+
+    def audio_segment(self):
+        """pydub view of the decoded audio, built without decoding again"""
+        if self._segment is None:
+            from pydub import AudioSegment
+            self._segment = AudioSegment(
+                data=self.pcm().tobytes(),
+                sample_width=2,
+                frame_rate=self.sample_rate,
+                channels=self.channels
+            )
+        return self._segment
+
+    def iter_frames(self, pix_fmt="rgb24"):
+        """Stream the video frames at their native size, reusing the probe"""
+        return iter_frames(self.filepath, self.info["width"], self.info["height"], pix_fmt)
+
+    def close(self):
+        self._pcm = None
+        self._speech = None
+        self._segment = None
+
+    def _decode(self):
+        if not self.has_audio:
+            self._pcm = np.zeros((0, 1), dtype=np.int16)
+            self._speech = np.zeros(0, dtype=np.float32)
+            return
+
+        channels = self.channels
+        cmd = [
+            ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-nostdin",
+            "-i", self.filepath,
+            "-map", "0:a:0", "-f", "s16le", "-acodec", "pcm_s16le",
+            "-ar", str(self.sample_rate), "-ac", str(channels), "pipe:1"
+        ]
+        speech_path = None
+        if self.speech_audio_requested and self._speech is None:
+            # Second output of the same decode: resampled speech track
+            fd, speech_path = tempfile.mkstemp(suffix=".f32")
+            os.close(fd)
+            cmd += ["-map", "0:a:0", "-f", "f32le", "-acodec", "pcm_f32le",
+                    "-ar", str(SPEECH_SAMPLE_RATE), "-ac", "1", "-y", speech_path]
+
+        try:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            raw, err = proc.communicate()
+            if proc.returncode != 0:
+                raise RuntimeError(f"Audio decode failed: {err.decode('utf-8', errors='replace').strip()}")
+            self._pcm = np.frombuffer(raw, dtype=np.int16).reshape(-1, channels)
+            if speech_path:
+                self._speech = np.fromfile(speech_path, dtype=np.float32)
+        finally:
+            if speech_path and os.path.exists(speech_path):
+                os.remove(speech_path)
+
+        logger.info(f"Decoded {len(self._pcm) / self.sample_rate:.1f}s of audio from {self.filepath}")
+
+    @staticmethod
+    def _downmix_resample(pcm, source_rate, target_rate):
+        mono = pcm.astype(np.float32).mean(axis=1) / 32768.0
+        if source_rate == target_rate or len(mono) == 0:
+            return mono
+        # Box-filter before linear interpolation to limit aliasing when downsampling
+        factor = source_rate / target_rate
+        width = int(factor)
+        if width > 1:
+            kernel = np.ones(width, dtype=np.float32) / width
+            mono = np.convolve(mono, kernel, mode='same')
+        positions = np.arange(0, len(mono), factor)
+        return np.interp(positions, np.arange(len(mono)), mono).astype(np.float32)
@@ -0,0 +1,404 @@
+import io
+import os
+import math
+import struct
+import logging
+import threading
+from collections import OrderedDict
+
+from ffmpeg_tools import probe
+
+logger = logging.getLogger(__name__)
+
+# The whole moov box is read into memory; long recordings have a few MB
+MAX_MOOV_BYTES = 64 * 1024 * 1024
+# Matroska Info/Tracks/SeekHead elements are small
+MAX_MKV_ELEMENT_BYTES = 4 * 1024 * 1024
+
+_MP4_CODECS = {
+    b"avc1": "h264", b"avc3": "h264", b"hvc1": "hevc", b"hev1": "hevc", b"mp4v": "mpeg4",
+    b"av01": "av1", b"vp08": "vp8", b"vp09": "vp9", b"jpeg": "mjpeg", b"mjpa": "mjpeg",
+    b"apch": "prores", b"apcn": "prores", b"apcs": "prores", b"apco": "prores", b"ap4h": "prores",
+    b"mp4a": "aac", b"ac-3": "ac3", b"ec-3": "eac3", b"Opus": "opus", b"fLaC": "flac",
+    b".mp3": "mp3", b"alac": "alac", b"sowt": "pcm_s16le", b"twos": "pcm_s16be", b"lpcm": "pcm",
+}
+
+_MKV_CODECS = {
+    "V_MPEG4/ISO/AVC": "h264", "V_MPEGH/ISO/HEVC": "hevc", "V_MPEG4/ISO/ASP": "mpeg4",
+    "V_VP8": "vp8", "V_VP9": "vp9", "V_AV1": "av1", "V_MJPEG": "mjpeg", "V_MPEG2": "mpeg2video",
+    "A_AAC": "aac", "A_OPUS": "opus", "A_VORBIS": "vorbis", "A_MPEG/L3": "mp3", "A_AC3": "ac3",
+    "A_EAC3": "eac3", "A_FLAC": "flac", "A_PCM/INT/LIT": "pcm_s16le",
+}
+
+# Matroska element IDs (with their length marker bits, as stored)
+_EBML = 0x1A45DFA3
+_SEGMENT = 0x18538067
+_SEEK_HEAD, _SEEK, _SEEK_ID, _SEEK_POSITION = 0x114D9B74, 0x4DBB, 0x53AB, 0x53AC
+_INFO, _TIMESTAMP_SCALE, _DURATION = 0x1549A966, 0x2AD7B1, 0x4489
+_TRACKS, _TRACK_ENTRY, _TRACK_TYPE, _CODEC_ID = 0x1654AE6B, 0xAE, 0x83, 0x86
+_DEFAULT_DURATION = 0x23E383
+_VIDEO, _PIXEL_WIDTH, _PIXEL_HEIGHT = 0xE0, 0xB0, 0xBA
+_AUDIO, _SAMPLING_FREQUENCY, _CHANNELS = 0xE1, 0xB5, 0x9F
+_CLUSTER = 0x1F43B675
+
+_CACHE_SIZE = 1024
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def probe_media(filepath, sha256=None):
+    """Container info in the shape of ``ffmpeg_tools.probe``, without running ffmpeg.
+
+    MP4/MOV files are read from their ``moov`` box and Matroska/WebM from
+    the EBML Info and Tracks elements, seeking past media data so only
+    headers are read. Other containers, fragmented or incomplete files,
+    and anything the parsers cannot fully describe fall back to
+    ``ffmpeg_tools.probe``. Results are cached by ``sha256`` when given,
+    otherwise by path, mtime and size.
+    """
+    if sha256:
+        key = sha256
+    else:
+        stat = os.stat(filepath)
+        key = (os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        info = _cache.get(key)
+        if info is not None:
+            _cache.move_to_end(key)
+            return dict(info)
+
+    info = None
+    try:
+        with open(filepath, 'rb') as f:
+            head = f.read(12)
+            if head[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"wide", b"skip"):
+                info = _probe_mp4(f)
+            elif head[:4] == _EBML.to_bytes(4, "big"):
+                info = _probe_matroska(f)
+    except (OSError, EOFError, ValueError, struct.error) as e:
+        logger.warning(f"Container parse of {filepath} failed, using ffmpeg: {e}")
+        info = None
+    if not _is_complete(info):
+        info = probe(filepath)
+
+    with _cache_lock:
+        _cache[key] = info
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return dict(info)
+
+
+def _empty_info():
+    return {
+        "duration": None,
+        "video_codec": None, "width": None, "height": None, "fps": None,
+        "audio_codec": None, "sample_rate": None, "channels": None
+    }
+
+
+def _is_complete(info):
+    """Enough to process the file without asking ffmpeg"""
+    if not info or not info["duration"]:
+        return False
+    if info["video_codec"] and not (info["width"] and info["height"] and info["fps"]):
+        return False
+    if info["audio_codec"] and not (info["sample_rate"] and info["channels"]):
+        return False
+    return bool(info["video_codec"] or info["audio_codec"])
+
+
+# --- MP4 / QuickTime ---
+
+def _iter_boxes(data, start=0, end=None):
+    """(type, payload_start, payload_end) of the boxes in ``data[start:end]``"""
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, offset)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            raise ValueError(f"Truncated {box_type!r} box")
+        yield box_type, offset + header, offset + size
+        offset += size
+
+
+def _find_box(data, path, start=0, end=None):
+    for box_type, payload_start, payload_end in _iter_boxes(data, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return payload_start, payload_end
+            return _find_box(data, path[1:], payload_start, payload_end)
+    return None
+
+
+def _read_moov(f):
+    """Walk the top-level box headers to ``moov``, wherever it sits, and read it"""
+    f.seek(0, os.SEEK_END)
+    file_size = f.tell()
+    offset = 0
+    while offset + 8 <= file_size:
+        f.seek(offset)
+        header = f.read(16)
+        size, box_type = struct.unpack_from(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", header, 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - offset
+        if size < header_size:
+            raise ValueError(f"Invalid {box_type!r} box size")
+        if box_type == b"moov":
+            if size > MAX_MOOV_BYTES:
+                raise ValueError(f"moov box of {size} bytes is too large")
+            f.seek(offset + header_size)
+            data = f.read(size - header_size)
+            if len(data) != size - header_size:
+                raise ValueError("Truncated moov box")
+            return data
+        offset += size
+    return None
+
+
+def _probe_mp4(f):
+    moov = _read_moov(f)
+    if moov is None:
+        return None
+    if _find_box(moov, [b"mvex"]):
+        # Fragmented: sample tables live in the moof boxes
+        return None
+
+    info = _empty_info()
+    mvhd = _find_box(moov, [b"mvhd"])
+    if mvhd:
+        version = moov[mvhd[0]]
+        if version == 1:
+            timescale, duration = struct.unpack_from(">IQ", moov, mvhd[0] + 20)
+        else:
+            timescale, duration = struct.unpack_from(">II", moov, mvhd[0] + 12)
+        if timescale:
+            info["duration"] = duration / timescale
+
+    for box_type, start, end in _iter_boxes(moov):
+        if box_type != b"trak":
+            continue
+        track = _mp4_track(moov, start, end)
+        if not track:
+            continue
+        if track["kind"] == "vide" and info["video_codec"] is None:
+            info.update(video_codec=track["codec"], width=track["width"], height=track["height"],
+                        fps=track["fps"])
+        elif track["kind"] == "soun" and info["audio_codec"] is None:
+            info.update(audio_codec=track["codec"], sample_rate=track["sample_rate"],
+                        channels=track["channels"])
+        if not info["duration"] and track["duration"]:
+            info["duration"] = track["duration"]
+    return info
+
+
+def _mp4_track(data, start, end):
+    hdlr = _find_box(data, [b"mdia", b"hdlr"], start, end)
+    mdhd = _find_box(data, [b"mdia", b"mdhd"], start, end)
+    stbl = _find_box(data, [b"mdia", b"minf", b"stbl"], start, end)
+    if not (hdlr and mdhd and stbl):
+        return None
+    kind = data[hdlr[0] + 8:hdlr[0] + 12].decode("latin-1")
+    if kind not in ("vide", "soun"):
+        return None
+
+    if data[mdhd[0]] == 1:
+        timescale, duration = struct.unpack_from(">IQ", data, mdhd[0] + 20)
+    else:
+        timescale, duration = struct.unpack_from(">II", data, mdhd[0] + 12)
+
+    stsd = _find_box(data, [b"stsd"], *stbl)
+    if not stsd or struct.unpack_from(">I", data, stsd[0] + 4)[0] == 0:
+        return None
+    entry = stsd[0] + 8
+    fourcc = data[entry + 4:entry + 8]
+    sample_entry = entry + 8
+    track = {
+        "kind": kind,
+        "codec": _MP4_CODECS.get(fourcc, fourcc.decode("latin-1").strip().lower()),
+        "duration": duration / timescale if timescale else None,
+    }
+
+    if kind == "vide":
+        width, height = struct.unpack_from(">HH", data, sample_entry + 24)
+        tkhd = _find_box(data, [b"tkhd"], start, end)
+        if tkhd:
+            # Transformation matrix starts 36 (v0) or 48 (v1) bytes in;
+            # report the displayed size like ffmpeg's autorotation does
+            matrix = tkhd[0] + (52 if data[tkhd[0]] == 1 else 40)
+            a, b = struct.unpack_from(">ii", data, matrix)
+            if round(abs(math.degrees(math.atan2(b, a)))) % 180 == 90:
+                width, height = height, width
+        stts = _find_box(data, [b"stts"], *stbl)
+        frames = ticks = 0
+        if stts:
+            count = struct.unpack_from(">I", data, stts[0] + 4)[0]
+            for index in range(count):
+                sample_count, delta = struct.unpack_from(">II", data, stts[0] + 8 + index * 8)
+                frames += sample_count
+                ticks += sample_count * delta
+        track.update(width=width, height=height,
+                     fps=round(frames * timescale / ticks, 3) if ticks and timescale else None)
+    else:
+        version = struct.unpack_from(">H", data, sample_entry + 8)[0]
+        if version == 2:
+            # QuickTime v2 sound description: float64 rate and uint32 channels
+            sample_rate, channels = struct.unpack_from(">dI", data, sample_entry + 32)
+            sample_rate = int(sample_rate)
+        else:
+            channels = struct.unpack_from(">H", data, sample_entry + 16)[0]
+            sample_rate = struct.unpack_from(">I", data, sample_entry + 24)[0] >> 16
+        track.update(channels=channels or None, sample_rate=sample_rate or timescale or None)
+    return track
+
+
+# --- Matroska / WebM ---
+
+def _read_vint(f, keep_marker=False):
+    """EBML variable-length integer; element IDs keep their marker bits"""
+    first = f.read(1)
+    if not first:
+        raise EOFError
+    first = first[0]
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8:
+        raise ValueError("Invalid EBML variable-length integer")
+    value = first if keep_marker else first & (0xFF >> length)
+    rest = f.read(length - 1)
+    if len(rest) != length - 1:
+        raise EOFError
+    for byte in rest:
+        value = (value << 8) | byte
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+
+def _read_element_header(f):
+    element_id, _, _ = _read_vint(f, keep_marker=True)
+    size, _, unknown = _read_vint(f)
+    return element_id, (None if unknown else size)
+
+
+def _iter_elements(data):
+    """(id, payload) of the child elements in an in-memory master element"""
+    stream = io.BytesIO(data)
+    while stream.tell() < len(data):
+        try:
+            element_id, size = _read_element_header(stream)
+        except EOFError:
+            return
+        if size is None:
+            size = len(data) - stream.tell()
+        yield element_id, stream.read(size)
+
+
+def _uint(payload):
+    return int.from_bytes(payload, "big") if payload else 0
+
+
+def _float(payload):
+    if len(payload) == 4:
+        return struct.unpack(">f", payload)[0]
+    if len(payload) == 8:
+        return struct.unpack(">d", payload)[0]
+    return 0.0
+
+
+def _probe_matroska(f):
+    f.seek(0)
+    element_id, size = _read_element_header(f)
+    if element_id != _EBML or size is None:
+        return None
+    f.seek(size, os.SEEK_CUR)
+    element_id, segment_size = _read_element_header(f)
+    if element_id != _SEGMENT:
+        return None
+    segment_start = f.tell()
+
+    elements = {}
+    positions = {}
+    while _INFO not in elements or _TRACKS not in elements:
+        try:
+            element_id, size = _read_element_header(f)
+        except EOFError:
+            break
+        if element_id in (_INFO, _TRACKS, _SEEK_HEAD):
+            if size is None or size > MAX_MKV_ELEMENT_BYTES:
+                return None
+            payload = f.read(size)
+            if element_id == _SEEK_HEAD:
+                positions.update(_seek_positions(payload))
+            else:
+                elements[element_id] = payload
+        elif element_id == _CLUSTER or size is None:
+            # Media data: jump to whatever the SeekHead still points at
+            missing = [e for e in (_INFO, _TRACKS) if e not in elements and e in positions]
+            if not missing:
+                break
+            f.seek(segment_start + positions.pop(missing[0]))
+        else:
+            f.seek(size, os.SEEK_CUR)
+    if _INFO not in elements or _TRACKS not in elements:
+        return None
+
+    info = _empty_info()
+    timestamp_scale = 1000000
+    duration = 0.0
+    for element_id, payload in _iter_elements(elements[_INFO]):
+        if element_id == _TIMESTAMP_SCALE:
+            timestamp_scale = _uint(payload)
+        elif element_id == _DURATION:
+            duration = _float(payload)
+    info["duration"] = duration * timestamp_scale / 1e9 or None
+
+    for element_id, payload in _iter_elements(elements[_TRACKS]):
+        if element_id == _TRACK_ENTRY:
+            _mkv_track(payload, info)
+    return info
+
+
+def _seek_positions(seek_head):
+    positions = {}
+    for element_id, payload in _iter_elements(seek_head):
+        if element_id != _SEEK:
+            continue
+        fields = dict(_iter_elements(payload))
+        if _SEEK_ID in fields and _SEEK_POSITION in fields:
+            positions[_uint(fields[_SEEK_ID])] = _uint(fields[_SEEK_POSITION])
+    return positions
+
+
+def _mkv_track(entry, info):
+    fields = dict(_iter_elements(entry))
+    track_type = _uint(fields.get(_TRACK_TYPE))
+    codec_id = fields.get(_CODEC_ID, b"").decode("ascii", errors="ignore").rstrip("\x00")
+    codec = _MKV_CODECS.get(codec_id) or _MKV_CODECS.get(codec_id.split("/")[0]) \
+        or codec_id.split("_", 1)[-1].lower() or None
+
+    if track_type == 1 and info["video_codec"] is None:
+        video = dict(_iter_elements(fields.get(_VIDEO, b"")))
+        default_duration = _uint(fields.get(_DEFAULT_DURATION))
+        info.update(
+            video_codec=codec,
+            width=_uint(video.get(_PIXEL_WIDTH)) or None,
+            height=_uint(video.get(_PIXEL_HEIGHT)) or None,
+            fps=round(1e9 / default_duration, 3) if default_duration else None
+        )
+    elif track_type == 2 and info["audio_codec"] is None:
+        audio = dict(_iter_elements(fields.get(_AUDIO, b"")))
+        info.update(
+            audio_codec=codec,
+            sample_rate=int(_float(audio.get(_SAMPLING_FREQUENCY, b""))) or 8000,
+            channels=_uint(audio.get(_CHANNELS)) or 1
+        )
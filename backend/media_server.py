@@ -0,0 +1,168 @@
+import os
+import json
+import hashlib
+import functools
+import mimetypes
+import threading
+from collections import OrderedDict
+
+from flask import request, send_file, current_app
+
+# Hashing a large render once per process is cheap compared to resending it;
+# entries are keyed by (path, mtime, size) so a rewritten file gets a new tag
+_ETAG_CACHE_SIZE = 2048
+_etag_cache = OrderedDict()
+_etag_lock = threading.Lock()
+
+# Per HLS package: relative path -> ETag of every file in it
+ETAG_INDEX = 'etags.json'
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_etag(path, block_size=1024 * 1024):
+    """SHA-256 of the file, cached while its mtime and size are unchanged.
+
+    The fallback for files without a stored tag (see output_etags), which
+    hashes on the request thread.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _etag_lock:
+        etag = _etag_cache.get(key)
+        if etag is not None:
+            _etag_cache.move_to_end(key)
+            return etag
+
+    etag = file_sha256(path, block_size)
+
+    with _etag_lock:
+        _etag_cache[key] = etag
+        while len(_etag_cache) > _ETAG_CACHE_SIZE:
+            _etag_cache.popitem(last=False)
+    return etag
+
+
+def output_etags(outputs):
+    """Content ETags of a video's file outputs, to store with them.
+
+    Called by the job that wrote the outputs, so requests do not hash
+    them. Keyed by output name, or ``name_key`` for outputs that are a
+    dict of files (storyboard, subtitles); look one up with
+    ``stored_etag``. The segments of an HLS output get an ETAG_INDEX file
+    in its directory instead, read by ``hls_etag``.
+    """
+    etags = {}
+    for name, value in outputs.items():
+        if name == 'etags':
+            continue
+        if name == 'hls':
+            if value and os.path.isfile(value):
+                _write_etag_index(os.path.dirname(value))
+            continue
+        files = value.items() if isinstance(value, dict) else [(None, value)]
+        for key, path in files:
+            if isinstance(path, str) and os.path.isfile(path):
+                etags[f"{name}_{key}" if key else name] = file_sha256(path)
+    return etags
+
+
+def stored_etag(outputs, name, key=None):
+    """The ETag output_etags stored for an output, if any"""
+    return (outputs.get('etags') or {}).get(f"{name}_{key}" if key else name)
+
+
+def hls_etag(directory, filename):
+    """The ETag of an HLS file from its package's ETAG_INDEX, if any"""
+    path = os.path.join(directory, ETAG_INDEX)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    return _read_etag_index(path, mtime).get(filename.replace(os.sep, '/'))
+
+
+def _write_etag_index(directory):
+    etags = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name != ETAG_INDEX:
+                path = os.path.join(root, name)
+                etags[os.path.relpath(path, directory).replace(os.sep, '/')] = file_sha256(path)
+    partial = os.path.join(directory, f"{ETAG_INDEX}.tmp")
+    with open(partial, 'w', encoding='utf-8') as f:
+        json.dump(etags, f)
+    os.replace(partial, os.path.join(directory, ETAG_INDEX))
+
+
+@functools.lru_cache(maxsize=64)
+def _read_etag_index(path, mtime):
+    # mtime is part of the cache key, so a rewritten index is read again
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def send_media(path, download_name=None, as_attachment=False, mimetype=None, etag=None):
+    """Serve a media file with Range/206, a strong content ETag and If-None-Match/304.
+
+    ``etag`` may be passed when the content hash is already known (blobs,
+    and outputs with a stored tag).
+    By default werkzeug streams the file through ``wsgi.file_wrapper``,
+    which servers such as gunicorn turn into ``sendfile(2)``. With
+    MEDIA_ACCEL_REDIRECT set to an nginx internal location, the body is
+    left to nginx via ``X-Accel-Redirect`` instead; MEDIA_ROOT is the
+    directory that location maps to (default UPLOAD_FOLDER).
+    """
+    etag = etag or content_etag(path)
+    mimetype = mimetype or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    accel_prefix = os.getenv('MEDIA_ACCEL_REDIRECT')
+    if accel_prefix:
+        return _accel_redirect(path, accel_prefix, download_name, as_attachment, mimetype, etag)
+
+    response = send_file(
+        path,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=True,
+        etag=etag,
+        max_age=0
+    )
+    _set_cache_headers(response)
+    return response
+
+
+def _accel_redirect(path, prefix, download_name, as_attachment, mimetype, etag):
+    root = os.path.abspath(os.getenv('MEDIA_ROOT', os.getenv('UPLOAD_FOLDER', 'uploads')))
+    relative = os.path.relpath(os.path.abspath(path), root)
+    if relative.startswith(os.pardir):
+        raise ValueError(f"{path} is outside MEDIA_ROOT")
+
+    response = current_app.response_class(mimetype=mimetype)
+    response.set_etag(etag)
+    _set_cache_headers(response)
+    if request.if_none_match.contains(etag):
+        response.status_code = 304
+        return response
+
+    # nginx answers Range requests itself from the internal location
+    response.headers['X-Accel-Redirect'] = f"{prefix.rstrip('/')}/{relative.replace(os.sep, '/')}"
+    response.headers['Accept-Ranges'] = 'bytes'
+    if download_name:
+        disposition = 'attachment' if as_attachment else 'inline'
+        response.headers.set('Content-Disposition', disposition, filename=download_name)
+    return response
+
+
+def _set_cache_headers(response):
+    # Private media: browsers may keep it but must revalidate, which is a 304
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
@@ -0,0 +1,191 @@
+import time
+import threading
+import functools
+from bisect import bisect_left
+
+# Seconds; processing stages and model loads run from well under a second
+# to tens of minutes, requests from milliseconds to a few seconds
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STAGE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self.registry._record(self.name, 'inc', amount, labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=REQUEST_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+        self.registry._record(self.name, 'observe', value, labels)
+
+    def time(self, **labels):
+        """Context manager (or decorator) observing the seconds its body takes"""
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    labels = _labels(self.labelnames, key, [('le', _number(bound))])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_number(total)}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.failed = False
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        labels = dict(self.labels)
+        if 'status' in self.histogram.labelnames and 'status' not in labels:
+            labels['status'] = 'error' if exc_type or self.failed else 'ok'
+        self.histogram.observe(time.perf_counter() - self.start, **labels)
+
+    def __call__(self, f):
+        # The processing stages catch their own errors and return False
+        # instead, so that counts as a failure too
+        @functools.wraps(f)
+        def wrapped(*args, **kwargs):
+            with _Timer(self.histogram, self.labels) as timer:
+                result = f(*args, **kwargs)
+                timer.failed = result is False
+                return result
+        return wrapped
+
+
+class Registry:
+    """Metrics of this process in the Prometheus text format.
+
+    Counters and histograms are a dict update under a lock per metric, so
+    they are cheap enough for every request. Job pool processes cannot be
+    scraped: a worker journals what it records during a job and hands the
+    journal back with the job result, and the web process replays it. Web
+    processes are not aggregated: each one is its own scrape target.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._journal = None
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=REQUEST_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def start_journal(self):
+        self._journal = []
+
+    def take_journal(self):
+        journal, self._journal = self._journal or [], None
+        return journal
+
+    def replay(self, journal):
+        for name, method, value, labels in journal or ():
+            metric = self._metrics.get(name)
+            if metric is not None:
+                getattr(metric, method)(value, **labels)
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def _record(self, name, method, value, labels):
+        journal = self._journal
+        if journal is not None:
+            journal.append((name, method, value, labels))
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    'snipx_http_request_duration_seconds',
+    'Time to handle an API request, until the response body starts.',
+    ('method', 'route', 'status'))
+STAGE_SECONDS = registry.histogram(
+    'snipx_processing_stage_duration_seconds',
+    'Time spent in one video processing stage.',
+    ('stage', 'status'), STAGE_BUCKETS)
+JOBS = registry.counter(
+    'snipx_jobs_total',
+    'Processing jobs finished, by outcome.',
+    ('status',))
+MODEL_LOAD_SECONDS = registry.histogram(
+    'snipx_model_load_duration_seconds',
+    'Time to load an ML model into the model registry.',
+    ('model',), STAGE_BUCKETS)
+
+
+def timed_stage(stage):
+    """Decorator recording a processing stage in STAGE_SECONDS"""
+    return STAGE_SECONDS.time(stage=stage)
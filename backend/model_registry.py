@@ -0,0 +1,202 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from metrics import MODEL_LOAD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    def __init__(self, model, size_bytes, load_seconds):
+        self.model = model
+        self.size_bytes = size_bytes
+        self.load_seconds = load_seconds
+        self.hits = 0
+        self.last_used = time.time()
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded ML models.
+
+    Models are keyed by ``(name, size, device)`` and loaded on first use.
+    When the estimated footprint of the cached models exceeds the memory
+    budget, the least recently used models are dropped. Models this process
+    keeps loaded elsewhere, such as in a pool of its own worker processes,
+    count against the budget through ``reserve``.
+    """
+
+    def __init__(self, memory_budget_bytes):
+        self.memory_budget_bytes = memory_budget_bytes
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._load_seconds = {}
+        self._reserved = {}
+
+    def get(self, name, size, device, loader, size_hint=None):
+        """Return the cached model for the key, calling ``loader()`` on a miss"""
+        key = (name, size, device)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry.model
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so other models stay available;
+        # the per-key lock keeps concurrent callers from loading twice.
+        with key_lock:
+            with self._lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    return entry.model
+                self._misses += 1
+
+            start = time.perf_counter()
+            model = loader()
+            load_seconds = time.perf_counter() - start
+            MODEL_LOAD_SECONDS.observe(load_seconds, model=f"{name}/{size}")
+            size_bytes = estimate_model_bytes(model) or size_hint or 0
+            logger.info(f"Loaded model {name}/{size} on {device} in {load_seconds:.2f}s "
+                        f"(~{size_bytes / (1024 * 1024):.0f} MB)")
+
+            with self._lock:
+                self._models[key] = _Entry(model, size_bytes, load_seconds)
+                self._load_seconds.setdefault(key, []).append(load_seconds)
+                self._evict_over_budget(keep=key)
+            return model
+
+    def evict(self, name, size=None, device=None):
+        """Drop every cached model matching the given key parts"""
+        with self._lock:
+            for key in list(self._models):
+                if key[0] == name and size in (None, key[1]) and device in (None, key[2]):
+                    del self._models[key]
+                    self._evictions += 1
+
+    def reserve(self, name, size, device, size_bytes):
+        """Count ``size_bytes`` of models held outside this registry against
+        the budget, evicting cached models to make room, until ``unreserve``"""
+        with self._lock:
+            self._reserved[(name, size, device)] = size_bytes
+            self._evict_over_budget(keep=None)
+
+    def unreserve(self, name, size, device):
+        with self._lock:
+            self._reserved.pop((name, size, device), None)
+
+    def available_bytes(self):
+        """What is left of the budget after the cached and reserved models"""
+        with self._lock:
+            return self.memory_budget_bytes - self._used_bytes()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "memory_used_bytes": self._used_bytes(),
+                "reserved": [
+                    {"name": key[0], "size": key[1], "device": key[2], "size_bytes": size_bytes}
+                    for key, size_bytes in self._reserved.items()
+                ],
+                "loaded": [
+                    {
+                        "name": key[0],
+                        "size": key[1],
+                        "device": key[2],
+                        "size_bytes": entry.size_bytes,
+                        "load_seconds": entry.load_seconds,
+                        "hits": entry.hits
+                    }
+                    for key, entry in self._models.items()
+                ],
+                "load_seconds": {
+                    "/".join(str(part) for part in key): times
+                    for key, times in self._load_seconds.items()
+                }
+            }
+
+    def _lookup(self, key):
+        entry = self._models.get(key)
+        if entry is None:
+            return None
+        self._models.move_to_end(key)
+        entry.hits += 1
+        entry.last_used = time.time()
+        self._hits += 1
+        return entry
+
+    def _used_bytes(self):
+        return sum(e.size_bytes for e in self._models.values()) + sum(self._reserved.values())
+
+    def _evict_over_budget(self, keep):
+        used = self._used_bytes()
+        for key in list(self._models):
+            if used <= self.memory_budget_bytes:
+                break
+            if key == keep:
+                continue
+            used -= self._models.pop(key).size_bytes
+            self._evictions += 1
+            logger.info(f"Evicted model {key[0]}/{key[1]} on {key[2]} (memory budget)")
+
+
+def estimate_model_bytes(model):
+    """Best-effort size of a torch module or HF pipeline, 0 if unknown"""
+    # HF pipelines wrap the torch module in ``.model``
+    module = getattr(model, 'model', None) if not hasattr(model, 'parameters') else model
+    if module is None or not hasattr(module, 'parameters'):
+        return 0
+    try:
+        total = sum(p.numel() * p.element_size() for p in module.parameters())
+        total += sum(b.numel() * b.element_size() for b in module.buffers())
+        return total
+    except Exception:
+        return 0
+
+
+def default_device():
+    device = os.getenv('MODEL_DEVICE')
+    if device:
+        return device
+    try:
+        import torch
+        return 'cuda' if torch.cuda.is_available() else 'cpu'
+    except ImportError:
+        return 'cpu'
+
+
+model_registry = ModelRegistry(
+    memory_budget_bytes=int(os.getenv('MODEL_MEMORY_BUDGET_MB', 4096)) * 1024 * 1024
+)
+
+
+def get_whisper_model(size='base', device=None):
+    device = device or default_device()
+
+    def load():
+        import whisper
+        return whisper.load_model(size, device=device)
+
+    return model_registry.get('whisper', size, device, load)
+
+
+def get_hf_pipeline(task, model_name=None, device=None):
+    device = device or default_device()
+
+    def load():
+        from transformers import pipeline
+        kwargs = {"device": device}
+        if model_name:
+            kwargs["model"] = model_name
+        return pipeline(task, **kwargs)
+
+    return model_registry.get(task, model_name or 'default', device, load)
@@ -2,6 +2,11 @@ from datetime import datetime
 from bson.objectid import ObjectId
 
 class SupportTicket:
+    __slots__ = (
+        "_id", "user_id", "name", "email", "subject", "description", "priority", "type",
+        "status", "created_at", "updated_at", "responses"
+    )
+
     def __init__(self, user_id=None, name=None, email=None, subject=None, 
                  description=None, priority='medium', ticket_type='bug', 
                  status='open', created_at=None, updated_at=None, _id=None):
@@ -2,6 +2,11 @@ from datetime import datetime
 from bson import ObjectId
 
 class User:
+    __slots__ = (
+        "email", "password_hash", "first_name", "last_name", "created_at", "updated_at",
+        "videos", "settings"
+    )
+
     def __init__(self, email, password_hash, first_name=None, last_name=None):
         self.email = email
         self.password_hash = password_hash
@@ -1,8 +1,31 @@
+import copy
 from datetime import datetime
 from bson import ObjectId
 
+# Sub-documents diffed key by key, so writers touching different keys merge
+NESTED_FIELDS = ("metadata", "outputs")
+_MISSING = object()
+
+
+class VideoConflict(ValueError):
+    """Another writer changed the same fields since the video was read"""
+
+    def __init__(self, paths):
+        super().__init__(f"Video was modified concurrently: {', '.join(sorted(paths))}")
+        self.paths = paths
+
+
 class Video:
+    __slots__ = (
+        "_id", "version", "_saved", "user_id", "filename", "filepath", "size", "status",
+        "processing_options", "upload_date", "process_start_time", "process_end_time",
+        "error", "metadata", "outputs"
+    )
+
     def __init__(self, user_id, filename, filepath, size):
+        self._id = None
+        self.version = 0
+        self._saved = None
         self.user_id = user_id
         self.filename = filename
         self.filepath = filepath
@@ -39,9 +62,63 @@ class Video:
             "process_end_time": self.process_end_time,
             "error": self.error,
             "metadata": self.metadata,
-            "outputs": self.outputs
+            "outputs": self.outputs,
+            "version": self.version
         }
 
+    def mark_saved(self):
+        """Take the current state as what the database holds"""
+        self._saved = _flatten(copy.deepcopy(self.to_dict()))
+
+    def changes(self):
+        """Minimal ``($set, $unset)`` field paths since the last load or save"""
+        current = _flatten(self.to_dict())
+        saved = self._saved or {}
+        to_set = {path: value for path, value in current.items()
+                  if path != "version" and saved.get(path, _MISSING) != value}
+        for field in NESTED_FIELDS:
+            if field in saved and field not in current:
+                # A sub-document replacing a plain value (null) is set whole
+                to_set = {path: value for path, value in to_set.items() if not path.startswith(f"{field}.")}
+                to_set[field] = getattr(self, field)
+        to_unset = [path for path in saved
+                    if path not in current and path.partition(".")[0] not in to_set]
+        return to_set, to_unset
+
+    def rebase(self, fresh):
+        """Carry this copy's changes over onto ``fresh``, a newer read of the document.
+
+        Fields only the other writer changed are taken from ``fresh``; a
+        field both changed raises VideoConflict.
+        """
+        base = self._saved or {}
+        mine = _flatten(self.to_dict())
+        theirs = _flatten(fresh.to_dict())
+        changed = {path for path in set(mine) | set(base)
+                   if path != "version" and mine.get(path, _MISSING) != base.get(path, _MISSING)}
+        conflicts = {path for path in changed
+                     if theirs.get(path, _MISSING) not in (base.get(path, _MISSING), mine.get(path, _MISSING))}
+        if conflicts:
+            raise VideoConflict(conflicts)
+
+        for path in set(theirs) | set(base):
+            if path in changed or path in ("version", "user_id"):
+                continue
+            value = theirs.get(path, _MISSING)
+            if value != base.get(path, _MISSING):
+                self._set_path(path, copy.deepcopy(value))
+        self.version = fresh.version
+        self._saved = _flatten(copy.deepcopy(fresh.to_dict()))
+
+    def _set_path(self, path, value):
+        field, _, key = path.partition(".")
+        if not key:
+            setattr(self, field, None if value is _MISSING else value)
+        elif value is _MISSING:
+            getattr(self, field).pop(key, None)
+        else:
+            getattr(self, field)[key] = value
+
     @staticmethod
     def from_dict(data):
         video = Video(
@@ -50,6 +127,8 @@ class Video:
             filepath=data["filepath"],
             size=data["size"]
         )
+        video._id = data.get("_id")
+        video.version = data.get("version", 0)
         video.status = data.get("status", "uploaded")
         video.processing_options = data.get("processing_options", {})
         video.upload_date = data.get("upload_date", datetime.utcnow())
@@ -58,4 +137,17 @@ class Video:
         video.error = data.get("error")
         video.metadata = data.get("metadata", {})
         video.outputs = data.get("outputs", {})
-        return video
\ No newline at end of file
+        video.mark_saved()
+        return video
+
+
+def _flatten(document):
+    """Document as {path: value}, with NESTED_FIELDS split into ``field.key`` paths"""
+    flat = {}
+    for field, value in document.items():
+        if field in NESTED_FIELDS and isinstance(value, dict):
+            for key, item in value.items():
+                flat[f"{field}.{key}"] = item
+        else:
+            flat[field] = value
+    return flat
@@ -0,0 +1,83 @@
+import json
+import base64
+import binascii
+from datetime import datetime
+
+from bson import ObjectId
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def clamp_limit(limit):
+    if limit is None:
+        return DEFAULT_LIMIT
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_LIMIT)
+
+
+def encode_cursor(document, field):
+    """Opaque cursor pointing just after ``document`` in a (field desc, _id desc) order"""
+    value = document.get(field)
+    payload = {
+        "v": value.isoformat() if isinstance(value, datetime) else value,
+        "id": str(document["_id"])
+    }
+    encoded = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(encoded).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value = payload["v"]
+        return (None if value is None else datetime.fromisoformat(value)), ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_page(collection, query, field, limit=None, cursor=None, projection=None):
+    """One page of ``collection`` newest first, by keyset rather than skip.
+
+    Documents are ordered by ``field`` then ``_id`` (the tie-breaker), both
+    descending, which an index ending in those keys serves directly. The
+    page continues after ``cursor``; returns ``(documents, next_cursor)``,
+    with ``next_cursor`` None on the last page. Documents without ``field``
+    sort last (Mongo orders null below every date), ordered by ``_id``.
+    """
+    limit = clamp_limit(limit)
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        after = [{field: value, "_id": {"$lt": last_id}}]
+        if value is not None:
+            # $lt does not match across types, so the null tail is added back
+            after += [{field: {"$lt": value}}, {field: None}]
+        query = {"$and": [query, {"$or": after}]}
+    if projection is not None:
+        projection = dict(projection, **{field: 1})
+
+    # One extra document tells whether another page exists
+    documents = list(
+        collection.find(query, projection)
+        .sort([(field, -1), ("_id", -1)])
+        .limit(limit + 1)
+    )
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1], field)
+    return documents, next_cursor
+
+
+def projection_for(fields, allowed, default):
+    """Mongo projection for a comma separated ``fields`` request parameter"""
+    if not fields:
+        names = default
+    else:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return {name: 1 for name in names}
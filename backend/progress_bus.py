@@ -0,0 +1,204 @@
+import os
+import time
+import queue
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('completed', 'failed')
+
+# Rough relative cost of each processing stage, so percent-complete moves
+# in proportion to time rather than by stage count
+STAGE_WEIGHTS = {
+    'reuse_artifacts': 1,
+    'cut_silence': 3,
+    'enhance_audio': 3,
+    'detect_scenes': 2,
+    'generate_thumbnail': 1,
+    'generate_subtitles': 8,
+    'summarize': 4,
+    'video_enhancements': 8,
+    'package_hls': 4,
+}
+
+
+class Subscription:
+    """Events for one video, for one listener.
+
+    The queue is small and drops its oldest event when full: progress is
+    a snapshot, so a slow listener only needs the latest ones.
+    """
+
+    def __init__(self, bus, video_id, backlog):
+        self.bus = bus
+        self.video_id = video_id
+        self._queue = queue.Queue(maxsize=backlog)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def get(self, timeout=None):
+        """The next event, or None if none arrived within ``timeout`` seconds"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def put(self, event):
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def close(self):
+        self.bus._unsubscribe(self)
+
+
+class ProgressBus:
+    """In-process pub/sub of processing progress, keyed by video id.
+
+    The job pool processes put their events on a multiprocessing queue that
+    ``relay`` drains into the bus of the web process that queued the job.
+    The last event of each video is kept so a new listener starts from the
+    current state instead of waiting for the next change.
+    """
+
+    def __init__(self, backlog=16, remembered=1024):
+        self.backlog = backlog
+        self.remembered = remembered
+        self._subscribers = {}
+        self._last = OrderedDict()
+        self._lock = threading.Lock()
+
+    def publish(self, video_id, event):
+        video_id = str(video_id)
+        with self._lock:
+            self._last[video_id] = event
+            self._last.move_to_end(video_id)
+            while len(self._last) > self.remembered:
+                self._last.popitem(last=False)
+            subscribers = list(self._subscribers.get(video_id, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def subscribe(self, video_id):
+        subscription = Subscription(self, str(video_id), self.backlog)
+        with self._lock:
+            self._subscribers.setdefault(subscription.video_id, set()).add(subscription)
+        return subscription
+
+    def last(self, video_id):
+        with self._lock:
+            return self._last.get(str(video_id))
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    def relay(self, source):
+        """Publish ``(video_id, event)`` pairs read from ``source`` on a daemon
+        thread, until it yields None"""
+        def run():
+            while True:
+                try:
+                    item = source.get()
+                except (EOFError, OSError):
+                    return
+                if item is None:
+                    return
+                try:
+                    self.publish(*item)
+                except Exception as e:
+                    logger.error(f"Dropping progress event: {str(e)}")
+
+        thread = threading.Thread(target=run, name='progress-relay', daemon=True)
+        thread.start()
+        return thread
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.video_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[subscription.video_id]
+
+
+class StageProgress:
+    """Percent-complete and ETA of one processing run.
+
+    ``stages`` are the stages the run will go through; each counts by its
+    STAGE_WEIGHTS share, and a stage that can tell how far along it is
+    reports that through ``fraction``. Events go to ``publish`` at most
+    every PROGRESS_MIN_INTERVAL seconds, except stage and status changes.
+    """
+
+    def __init__(self, video_id, stages, publish, min_interval=None):
+        self.video_id = str(video_id)
+        self.publish = publish
+        self.min_interval = (min_interval if min_interval is not None
+                             else float(os.getenv('PROGRESS_MIN_INTERVAL', 0.5)))
+        self.weights = {stage: STAGE_WEIGHTS.get(stage, 1) for stage in stages}
+        self.total = sum(self.weights.values()) or 1
+        self.stage = None
+        self.done = 0
+        self.stage_weight = 0
+        self.started = time.monotonic()
+        self._published = 0
+
+    def start(self, stage):
+        self.done += self.stage_weight
+        self.stage = stage
+        self.stage_weight = self.weights.get(stage, 1)
+        self._emit('processing', 0.0, force=True)
+
+    def fraction(self, fraction):
+        self._emit('processing', min(max(fraction, 0.0), 1.0))
+
+    def finish(self, status, error=None):
+        self.stage = None
+        self._emit(status, 0.0, force=True, error=error)
+
+    def _emit(self, status, fraction, force=False, error=None):
+        now = time.monotonic()
+        if not force and now - self._published < self.min_interval:
+            return
+        self._published = now
+
+        if status == 'completed':
+            percent = 100.0
+        else:
+            percent = min(99.0, 100.0 * (self.done + self.stage_weight * fraction) / self.total)
+        elapsed = now - self.started
+        eta = None
+        if status == 'processing' and percent >= 1.0:
+            eta = round(elapsed * (100.0 - percent) / percent, 1)
+
+        event = {
+            'video_id': self.video_id,
+            'status': status,
+            'stage': self.stage,
+            'percent': round(percent, 1),
+            'eta_seconds': eta,
+            'elapsed_seconds': round(elapsed, 1),
+        }
+        if error:
+            event['error'] = error
+        try:
+            self.publish(event)
+        except Exception as e:
+            # Progress is informational; never let it fail the job
+            logger.error(f"Publishing progress failed: {str(e)}")
+
+
+bus = ProgressBus(backlog=int(os.getenv('PROGRESS_BACKLOG', 16)))
@@ -0,0 +1,136 @@
+import logging
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ffmpeg_tools import iter_frames
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_WIDTH = 160
+BATCH_FRAMES = 256
+# Joint hue x saturation histogram. Both are unchanged by fades, which
+# would otherwise push whole regions across value bins at once; brightness
+# is covered by the luma difference. Pixels too dark for a meaningful hue
+# go to one extra bin, blending in between DARK_LOW and DARK_HIGH so a
+# fade moves them over gradually. Below about 100, 8-bit rounding shifts
+# saturation by several steps from frame to frame of a fade, so each pixel
+# is also split between its two nearest saturation bins: that noise moves
+# a little weight instead of flipping pixels across a bin edge.
+HUE_BINS, SAT_BINS = 16, 8
+DARK_LOW, DARK_HIGH = 32, 96
+HIST_BINS = HUE_BINS * SAT_BINS + 1
+# Weight of the histogram distance against the luma difference
+HIST_WEIGHT = 0.7
+
+
+def frame_differences(frames_iter, batch_frames=BATCH_FRAMES):
+    """Change score in [0, 1] between each frame and the one before it.
+
+    Frames are stacked into batches; HSV conversion, histogramming (one
+    ``bincount`` per batch with a per-frame offset) and the luma
+    differences are all computed on the whole batch. The first frame
+    scores 0.
+    """
+    import cv2
+
+    scores = []
+    previous_hist = previous_luma = None
+    batch = []
+
+    def flush():
+        nonlocal previous_hist, previous_luma
+        stack = np.stack(batch)
+        count, height, width = stack.shape[:3]
+        # One cv2 call per batch: frames stacked as a single tall image
+        tall = stack.reshape(count * height, width, 3)
+        hsv = cv2.cvtColor(tall, cv2.COLOR_RGB2HSV).reshape(count, height * width, 3)
+        luma = cv2.cvtColor(tall, cv2.COLOR_RGB2GRAY).reshape(count, height * width)
+
+        offsets = (np.arange(count, dtype=np.int32) * HIST_BINS)[:, None]
+        hue_bins = (hsv[..., 0].astype(np.int32) * HUE_BINS // 180) * SAT_BINS + offsets
+        # Position between saturation bin centres, and the weight of the upper one
+        sat = np.clip(hsv[..., 1] * np.float32(SAT_BINS / 256.0) - np.float32(0.5), 0, SAT_BINS - 1)
+        sat_low = sat.astype(np.int32)
+        sat_upper = sat - sat_low
+        lit = np.clip((hsv[..., 2] - np.float32(DARK_LOW)) * np.float32(1.0 / (DARK_HIGH - DARK_LOW)), 0, 1)
+        upper = lit * sat_upper
+        # Pixels in the top saturation bin have sat_upper 0, so the upper
+        # neighbour never spills into the next hue
+        hist = (np.bincount((hue_bins + sat_low).ravel(), weights=(lit - upper).ravel(),
+                            minlength=count * HIST_BINS)
+                + np.bincount((hue_bins + sat_low + 1).ravel(), weights=upper.ravel(),
+                              minlength=count * HIST_BINS + 1)[:count * HIST_BINS])
+        hist = hist.reshape(count, HIST_BINS)
+        hist[:, -1] = (1 - lit).sum(axis=1)
+        hist /= height * width
+        if previous_hist is not None:
+            hist = np.vstack([previous_hist, hist])
+            luma = np.vstack([previous_luma, luma])
+        hist_distance = 0.5 * np.abs(np.diff(hist, axis=0)).sum(axis=1)
+        luma_distance = np.abs(np.diff(luma.astype(np.int16), axis=0)).mean(axis=1) / 255.0
+        if previous_hist is None:
+            scores.append(0.0)
+        scores.extend(HIST_WEIGHT * hist_distance + (1 - HIST_WEIGHT) * luma_distance)
+        previous_hist, previous_luma = hist[-1:], luma[-1:]
+        batch.clear()
+
+    for frame in frames_iter:
+        batch.append(frame)
+        if len(batch) >= batch_frames:
+            flush()
+    if batch:
+        flush()
+    return np.asarray(scores, dtype=np.float32)
+
+
+def pick_boundaries(scores, fps, window_seconds=2.0, sensitivity=6.0, min_score=0.12,
+                    min_scene_seconds=0.6):
+    """Frame indices where a new shot starts.
+
+    A frame is a cut when its score stands out from its neighbourhood: it
+    must exceed the rolling median by ``sensitivity`` times the rolling
+    median absolute deviation, and ``min_score`` in absolute terms. The
+    local statistics keep the threshold high through handheld or busy
+    footage and low in calm scenes. Cuts closer than ``min_scene_seconds``
+    keep only the strongest.
+    """
+    if len(scores) < 2:
+        return []
+    radius = max(1, int(window_seconds * fps / 2))
+    padded = np.pad(scores, radius, mode="edge")
+    windows = sliding_window_view(padded, 2 * radius + 1)
+    median = np.median(windows, axis=1)
+    mad = np.median(np.abs(windows - median[:, None]), axis=1)
+    threshold = np.maximum(median + sensitivity * np.maximum(mad, 0.01), min_score)
+
+    candidates = np.flatnonzero(scores > threshold)
+    min_gap = max(1, int(min_scene_seconds * fps))
+    cuts = []
+    for index in candidates[np.argsort(-scores[candidates])]:
+        if index > 0 and all(abs(index - cut) >= min_gap for cut in cuts):
+            cuts.append(int(index))
+    return sorted(cuts)
+
+
+def detect_scenes(filepath, info, analysis_width=ANALYSIS_WIDTH, **threshold_options):
+    """Split a video into shots in one streaming decode of downscaled frames.
+
+    Returns a list of ``{"start", "end"}`` scenes in seconds covering the
+    whole video.
+    """
+    fps = info.get("fps") or 30.0
+    width = analysis_width
+    height = max(2, round(info["height"] * width / info["width"] / 2) * 2)
+    frames = iter_frames(
+        filepath, width, height,
+        video_filter=f"scale={width}:{height}:flags=fast_bilinear"
+    )
+    scores = frame_differences(frames)
+    cuts = pick_boundaries(scores, fps, **threshold_options)
+
+    duration = info.get("duration") or len(scores) / fps
+    starts = [0.0] + [cut / fps for cut in cuts]
+    ends = starts[1:] + [duration]
+    logger.info(f"Detected {len(starts)} scenes in {len(scores)} frames of {filepath}")
+    return [{"start": round(start, 3), "end": round(end, 3)} for start, end in zip(starts, ends)]
@@ -1,26 +1,87 @@
 import jwt
-import bcrypt
-from datetime import datetime, timedelta
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from bson.objectid import ObjectId
+from services.password_hasher import PasswordHasher, PasswordHasherBusy
 import os
 
+
+class TokenCache:
+    """Bounded LRU of verified tokens, each dropped at its ``exp`` or after ``ttl``.
+
+    A hit skips the HS256 signature check and claim parsing; the frontend
+    polls with the same token every few seconds, so nearly every request
+    hits.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry[1], entry[2]
+
+    def put(self, token, user_id, jti, exp):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (min(exp, time.time() + self.ttl), user_id, jti)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, token):
+        with self._lock:
+            self._entries.pop(token, None)
+
+
 class AuthService:
     def __init__(self, db):
         self.db = db
         self.users = db.users
+        self.revoked_tokens = db.revoked_tokens
+        self.password_hasher = PasswordHasher()
         self.secret_key = os.getenv('JWT_SECRET_KEY', 'your-default-secret-key-change-this-in-production')
         
         # Ensure we have a valid string secret key
         if not self.secret_key or not isinstance(self.secret_key, str):
             self.secret_key = 'your-default-secret-key-change-this-in-production'
 
+        self.token_cache = TokenCache(
+            int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000)),
+            float(os.getenv('AUTH_TOKEN_CACHE_TTL', 300))
+        )
+        # Revoked token ids -> expiry, mirrored from the revoked_tokens
+        # collection so each check is a set lookup; other processes'
+        # revocations are pulled in every AUTH_REVOCATION_SYNC seconds
+        self.revocation_sync = float(os.getenv('AUTH_REVOCATION_SYNC', 5))
+        # Long enough to watch a video: HLS players fetch segments with it
+        # for as long as playback lasts
+        self.media_token_seconds = int(os.getenv('MEDIA_TOKEN_SECONDS', 3600))
+        self._revoked = {}
+        self._revoked_synced_at = None
+        self._revocation_lock = threading.Lock()
+
     def register_user(self, email, password, first_name=None, last_name=None):
         if self.users.find_one({"email": email}):
             raise ValueError("Email already registered")
 
-        salt = bcrypt.gensalt()
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), salt)
-        
+        password_hash = self.password_hasher.hash(password)
+
         user_doc = {
             "email": email,
             "password_hash": password_hash,
@@ -38,9 +99,13 @@ class AuthService:
             raise ValueError("Invalid email or password")
 
         # Verify password
-        if not bcrypt.checkpw(password.encode('utf-8'), user_doc['password_hash']):
+        if not self.password_hasher.verify(password, user_doc['password_hash']):
             raise ValueError("Invalid email or password")
 
+        # Bring the stored hash to BCRYPT_ROUNDS while the password is at hand
+        if self.password_hasher.needs_rehash(user_doc['password_hash']):
+            self._rehash_password(user_doc, password)
+
         # Generate JWT
         token = self.generate_token(str(user_doc['_id']))
 
@@ -54,25 +119,117 @@ class AuthService:
 
         return token, user_data
 
+    def _rehash_password(self, user_doc, password):
+        try:
+            password_hash = self.password_hasher.hash(password)
+        except PasswordHasherBusy:
+            return  # best effort; the next login tries again
+        # Conditional on the old hash so a concurrent password change wins
+        self.users.update_one(
+            {"_id": user_doc['_id'], "password_hash": user_doc['password_hash']},
+            {"$set": {"password_hash": password_hash}}
+        )
+
     def generate_token(self, user_id):
         try:
             payload = {
                 'user_id': str(user_id),  # Ensure user_id is a string
-                'exp': datetime.utcnow() + timedelta(days=1)
+                'exp': datetime.utcnow() + timedelta(days=1),
+                'jti': uuid.uuid4().hex  # lets a single token be revoked
             }
             return jwt.encode(payload, self.secret_key, algorithm='HS256')
         except Exception as e:
             raise ValueError(f"Failed to generate token: {str(e)}")
 
+    def generate_media_token(self, user_id, video_id, session_token):
+        """A short-lived token for the media of one video.
+
+        For URLs that <video>, <track> and EventSource load without
+        headers, where a token can leak through logs and Referer. It is
+        only accepted by verify_media_token, for that video, and stops
+        working when the session it came from is revoked.
+        """
+        session = self._decode(session_token)
+        payload = {
+            'user_id': str(user_id),
+            'video_id': str(video_id),
+            'scope': 'media',
+            'sid': _token_id(session_token, session),
+            'exp': min(datetime.utcnow() + timedelta(seconds=self.media_token_seconds),
+                       datetime.utcfromtimestamp(session['exp']))
+        }
+        return jwt.encode(payload, self.secret_key, algorithm='HS256')
+
+    def verify_media_token(self, token, video_id):
+        """The user id of a media token issued for ``video_id``"""
+        payload = self._decode(token)
+        if payload.get('scope') != 'media' or payload.get('video_id') != str(video_id):
+            raise ValueError("Invalid media token")
+        if self._is_revoked(payload.get('sid')):
+            raise ValueError("Token has been revoked")
+        return payload['user_id']
+
     def verify_token(self, token):
+        cached = self.token_cache.get(token)
+        if cached:
+            user_id, jti = cached
+        else:
+            payload = self._decode(token)
+            if payload.get('scope'):
+                # A media token is not a session
+                raise ValueError("Invalid token")
+            user_id, jti = payload['user_id'], _token_id(token, payload)
+            self.token_cache.put(token, user_id, jti, payload['exp'])
+
+        if self._is_revoked(jti):
+            self.token_cache.discard(token)
+            raise ValueError("Token has been revoked")
+        return user_id
+
+    def revoke_token(self, token):
+        """Reject ``token`` from now on, in this and (after a sync) every process"""
+        payload = self._decode(token)
+        jti = _token_id(token, payload)
+        expires_at = datetime.utcfromtimestamp(payload['exp'])
+        self.revoked_tokens.update_one(
+            {"_id": jti},
+            {"$set": {"expires_at": expires_at, "revoked_at": datetime.utcnow()}},
+            upsert=True
+        )
+        with self._revocation_lock:
+            self._revoked[jti] = payload['exp']
+        self.token_cache.discard(token)
+
+    def _decode(self, token):
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=['HS256'])
-            return payload['user_id']
+            return jwt.decode(token, self.secret_key, algorithms=['HS256'], options={'require': ['exp']})
         except jwt.ExpiredSignatureError:
             raise ValueError("Token has expired")
         except jwt.InvalidTokenError:
             raise ValueError("Invalid token")
 
+    def _is_revoked(self, jti):
+        now = time.time()
+        if self._revoked_synced_at is None or now - self._revoked_synced_at >= self.revocation_sync:
+            self._sync_revocations(now)
+        return jti in self._revoked
+
+    def _sync_revocations(self, now):
+        with self._revocation_lock:
+            if self._revoked_synced_at is not None and now - self._revoked_synced_at < self.revocation_sync:
+                return
+            query = {"expires_at": {"$gt": datetime.utcnow()}}
+            if self._revoked_synced_at is not None:
+                # Overlap the window a little so a slow write is not missed
+                since = datetime.utcfromtimestamp(self._revoked_synced_at - self.revocation_sync)
+                query["revoked_at"] = {"$gte": since}
+            for doc in self.revoked_tokens.find(query, {"expires_at": 1}):
+                self._revoked[doc["_id"]] = doc["expires_at"].replace(tzinfo=timezone.utc).timestamp()
+            # Expired tokens fail verification anyway
+            for jti in [jti for jti, exp in self._revoked.items() if exp <= now]:
+                del self._revoked[jti]
+            self._revoked_synced_at = now
+
     def get_user_by_id(self, user_id):
         from models.user import User  # import here to avoid circular
         user_doc = self.users.find_one({"_id": ObjectId(user_id)})
@@ -89,3 +246,8 @@ class AuthService:
         if result.modified_count == 0:
             raise ValueError("User not found or no changes made")
         return self.get_user_by_id(user_id)
+
+
+def _token_id(token, payload):
+    """The token's ``jti``; tokens issued before jti existed are identified by their hash"""
+    return payload.get('jti') or hashlib.sha256(token.encode('utf-8')).hexdigest()
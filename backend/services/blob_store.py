@@ -0,0 +1,174 @@
+import os
+import glob
+import shutil
+import json
+import time
+import hashlib
+import logging
+from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# How long add_reference waits for a blob that is being deleted
+ADD_REFERENCE_RETRIES = 100
+ADD_REFERENCE_WAIT = 0.05
+
+
+def options_fingerprint(options):
+    """Short stable hash of processing options, used to key derived artifacts"""
+    encoded = json.dumps(options or {}, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:16]
+
+
+class BlobStore:
+    """Content-addressed storage for uploaded media.
+
+    Each distinct upload is stored once as ``blobs/<sha256><ext>`` and
+    counted in the ``blobs`` collection; videos point at the blob and hold
+    a reference. Derived files are written next to the blob (see
+    VideoService._output_base) and recorded per options fingerprint under
+    ``artifacts``, so another video of the same content processed with the
+    same options reuses them. Since those videos share the output paths,
+    one video at a time builds them: it holds ``building.<fingerprint>``
+    (see claim_artifact). Files are removed with the last reference.
+    """
+
+    def __init__(self, db, upload_folder):
+        self.db = db
+        self.blobs = db.blobs
+        self.folder = os.path.join(upload_folder, 'blobs')
+
+    def blob_path(self, sha256, ext=''):
+        return os.path.join(self.folder, f"{sha256}{ext.lower()}")
+
+    def get(self, sha256):
+        return self.blobs.find_one({"_id": sha256})
+
+    def add_reference(self, sha256, source_path, container=None):
+        """Take ``source_path`` as the content of blob ``sha256`` and count a reference.
+
+        When the blob is already stored, ``source_path`` is deleted. Returns
+        the blob document after the increment.
+
+        A live blob (ref_count > 0) can only gain references, never be deleted
+        underneath this call; one that release() has taken to zero is being
+        deleted, so wait for its document to go and store the file afresh.
+        """
+        for _ in range(ADD_REFERENCE_RETRIES):
+            blob = self.blobs.find_one_and_update(
+                {"_id": sha256, "ref_count": {"$gt": 0}},
+                {"$inc": {"ref_count": 1}},
+                return_document=ReturnDocument.AFTER
+            )
+            if blob:
+                os.remove(source_path)
+                logger.info(f"Upload matches stored blob {sha256[:12]}, keeping one copy")
+                return blob
+
+            path = self.blob_path(sha256, os.path.splitext(source_path)[1])
+            blob = {
+                "_id": sha256,
+                "ref_count": 1,
+                "path": path,
+                "size": os.path.getsize(source_path),
+                "container": container,
+                "metadata": {},
+                "artifacts": {},
+                "created_at": datetime.utcnow()
+            }
+            try:
+                self.blobs.insert_one(blob)
+            except DuplicateKeyError:
+                # Another upload just stored it, or a release is deleting it
+                time.sleep(ADD_REFERENCE_WAIT)
+                continue
+            os.makedirs(self.folder, exist_ok=True)
+            os.replace(source_path, path)
+            return blob
+        raise RuntimeError(f"Blob {sha256[:12]} is still being deleted")
+
+    def set_metadata(self, sha256, metadata):
+        """Remember probed metadata so further copies skip probing"""
+        self.blobs.update_one({"_id": sha256}, {"$set": {"metadata": metadata}})
+
+    def get_artifact(self, sha256, fingerprint):
+        """Outputs already derived from this blob with the same options, if their files still exist"""
+        blob = self.blobs.find_one({"_id": sha256}, {f"artifacts.{fingerprint}": 1})
+        artifact = (blob or {}).get("artifacts", {}).get(fingerprint)
+        if not artifact or not all(os.path.exists(path) for path in _output_paths(artifact["outputs"])):
+            return None
+        return artifact
+
+    def put_artifact(self, sha256, fingerprint, outputs, metadata):
+        """Record outputs for reuse; only for runs where every stage produced real output"""
+        self.blobs.update_one({"_id": sha256}, {"$set": {f"artifacts.{fingerprint}": {
+            "outputs": outputs,
+            "metadata": metadata,
+            "created_at": datetime.utcnow()
+        }}})
+
+    def claim_artifact(self, sha256, fingerprint, video_id):
+        """Take the right to build the outputs of ``fingerprint`` for video ``video_id``.
+
+        Returns False while another video holds it; see artifact_builder.
+        A claim this video left behind in an earlier run is taken back.
+        """
+        field = f"building.{fingerprint}"
+        result = self.blobs.update_one(
+            {"_id": sha256, "$or": [{field: {"$exists": False}}, {field: str(video_id)}]},
+            {"$set": {field: str(video_id)}}
+        )
+        return bool(result.matched_count)
+
+    def artifact_builder(self, sha256, fingerprint):
+        """Id of the video building the outputs of ``fingerprint``, if any"""
+        blob = self.blobs.find_one({"_id": sha256}, {f"building.{fingerprint}": 1})
+        return (blob or {}).get("building", {}).get(fingerprint)
+
+    def release_artifact(self, sha256, fingerprint, video_id):
+        """Give up a claim, if ``video_id`` still holds it"""
+        field = f"building.{fingerprint}"
+        self.blobs.update_one({"_id": sha256, field: str(video_id)}, {"$unset": {field: ""}})
+
+    def release(self, sha256):
+        """Drop one reference; the blob and everything derived from it go with the last.
+
+        Returns True when the files were removed. Only the release that takes
+        the count to zero sees it there, and it removes the files before the
+        document, so add_reference never counts on files being deleted.
+        """
+        blob = self.blobs.find_one_and_update(
+            {"_id": sha256, "ref_count": {"$gt": 0}},
+            {"$inc": {"ref_count": -1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not blob or blob["ref_count"] > 0:
+            return False
+
+        from stabilizer import trf_cache_path
+        stem = os.path.splitext(blob["path"])[0]
+        derived = glob.glob(f"{glob.escape(stem)}_*") + [trf_cache_path(blob["path"], sha256)]
+        for path in [blob["path"]] + derived:
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            except OSError:
+                pass
+        self.blobs.delete_one({"_id": sha256, "ref_count": 0})
+        logger.info(f"Removed blob {sha256[:12]} and its derived files")
+        return True
+
+
+def _output_paths(outputs):
+    for value in (outputs or {}).values():
+        if isinstance(value, str):
+            yield value
+        elif isinstance(value, dict):
+            # Subtitles {"srt", "json", "language", "style"}, storyboard {"sprite", "vtt"}
+            for key in ("srt", "json", "sprite", "vtt"):
+                if value.get(key):
+                    yield value[key]
@@ -0,0 +1,301 @@
+import os
+import time
+import atexit
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+import metrics
+import progress_bus
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# A queued or running job carries ``active: True``; a partial unique index on
+# (video_id) over those documents keeps a video to one active job
+ENQUEUE_RETRIES = 3
+
+# Per-process state of a pool worker, set up once by _init_worker
+_worker_db = None
+_worker_video_service = None
+_worker_events = None
+
+
+def _init_worker(mongodb_uri, db_name, events=None):
+    """Give every pool process its own MongoDB client and VideoService;
+    progress events go back to the web process through ``events``"""
+    global _worker_db, _worker_video_service, _worker_events
+    from pymongo import MongoClient
+    from services.video_service import VideoService
+
+    client = MongoClient(mongodb_uri)
+    _worker_db = client[db_name]
+    _worker_video_service = VideoService(_worker_db)
+    _worker_events = events
+
+
+def _run_job(job_id, video_id, options):
+    """Entry point executed inside a pool process.
+
+    Returns the outcome and the metrics recorded while running, for the web
+    process to replay.
+    """
+    metrics.registry.start_journal()
+    jobs = _worker_db.jobs
+    query = {"_id": ObjectId(job_id)}
+    jobs.update_one(query, {"$set": {
+        "status": "running",
+        "stage": None,
+        "pid": os.getpid(),
+        "started_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    }})
+
+    def on_stage(stage):
+        jobs.update_one(query, {"$set": {"stage": stage, "updated_at": datetime.utcnow()}})
+
+    def on_progress(event):
+        if _worker_events is not None:
+            _worker_events.put((video_id, event))
+
+    try:
+        _worker_video_service.process_video(video_id, options, on_stage=on_stage, on_progress=on_progress)
+    except Exception as e:
+        logger.exception(f"Job {job_id} failed")
+        jobs.update_one(query, {"$set": {
+            "status": "failed",
+            "error": str(e),
+            "finished_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        }, "$unset": {"active": ""}})
+        return {"status": "failed", "metrics": metrics.registry.take_journal()}
+
+    jobs.update_one(query, {"$set": {
+        "status": "done",
+        "stage": None,
+        "finished_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    }, "$unset": {"active": ""}})
+    return {"status": "done", "metrics": metrics.registry.take_journal()}
+
+
+class JobService:
+    """Runs video processing jobs on a local process pool.
+
+    Job state lives in the ``jobs`` collection so any web worker can answer
+    status requests; the pool itself is created lazily on the first enqueue.
+    The web process that owns a job refreshes its ``heartbeat_at`` every
+    JOB_HEARTBEAT_SECONDS while it is queued or running; a job whose
+    heartbeat is older than JOB_STALE_SECONDS lost its process (a restart,
+    a deploy, a crash) and ``recover_orphaned_jobs`` marks it failed.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.jobs = db.jobs
+        self.max_workers = int(os.getenv('JOB_WORKERS', 2))
+        self.start_method = os.getenv('JOB_START_METHOD', 'spawn')
+        self.mongodb_uri = os.getenv('MONGODB_URI')
+        self.db_name = db.name
+        self.heartbeat_seconds = float(os.getenv('JOB_HEARTBEAT_SECONDS', 30))
+        self.stale_after = timedelta(seconds=float(os.getenv('JOB_STALE_SECONDS', 300)))
+        self._executor = None
+        self._events = None
+        self._in_flight = set()
+        self._heartbeat = None
+        self._lock = threading.Lock()
+        atexit.register(self.shutdown)
+        try:
+            self.recover_orphaned_jobs()
+        except Exception as e:
+            logger.error(f"Recovering orphaned jobs failed: {str(e)}")
+
+    def enqueue_processing(self, video_id, user_id, options):
+        """Queue a processing job for a video and return its id.
+
+        If the video already has a queued or running job, that job's id is
+        returned instead of starting a second one.
+        """
+        for _ in range(ENQUEUE_RETRIES):
+            now = datetime.utcnow()
+            job_doc = {
+                "type": "process_video",
+                "video_id": str(video_id),
+                "user_id": str(user_id),
+                "options": options,
+                "status": "queued",
+                "active": True,
+                "stage": None,
+                "error": None,
+                "created_at": now,
+                "updated_at": now,
+                "heartbeat_at": now,
+                "started_at": None,
+                "finished_at": None
+            }
+            try:
+                job_id = str(self.jobs.insert_one(job_doc).inserted_id)
+                break
+            except DuplicateKeyError:
+                active = self.jobs.find_one({"video_id": str(video_id), "active": True})
+                if active and not self.recover_orphaned_jobs(video_id):
+                    return str(active["_id"])
+                # the active job finished, or was orphaned and is now failed
+        else:
+            raise RuntimeError(f"Could not queue a job for video {video_id}")
+
+        self.db.videos.update_one(
+            {"_id": ObjectId(video_id)},
+            {"$set": {"status": "queued"}, "$inc": {"version": 1}}
+        )
+        progress_bus.bus.publish(video_id, {
+            "video_id": str(video_id), "status": "queued", "stage": None,
+            "percent": 0.0, "eta_seconds": None
+        })
+
+        with self._lock:
+            self._in_flight.add(job_id)
+        self._start_heartbeat()
+        future = self._get_executor().submit(_run_job, job_id, str(video_id), options)
+        future.add_done_callback(lambda f: self._on_job_finished(job_id, video_id, f))
+        logger.info(f"Queued job {job_id} for video {video_id}")
+        return job_id
+
+    def recover_orphaned_jobs(self, video_id=None):
+        """Fail the queued or running jobs whose heartbeat stopped, and their
+        videos; returns how many there were.
+
+        Jobs from before the heartbeat was recorded go by ``updated_at``.
+        """
+        cutoff = datetime.utcnow() - self.stale_after
+        query = {
+            "status": {"$in": list(ACTIVE_STATUSES)},
+            "$or": [
+                {"heartbeat_at": {"$lt": cutoff}},
+                {"heartbeat_at": {"$exists": False}, "updated_at": {"$lt": cutoff}}
+            ]
+        }
+        if video_id is not None:
+            query["video_id"] = str(video_id)
+
+        recovered = 0
+        for job in self.jobs.find(query, {"video_id": 1}):
+            error = "Job stopped responding; its worker was restarted or crashed"
+            if self._fail_job(job["_id"], job["video_id"], error, extra=query):
+                logger.warning(f"Marked orphaned job {job['_id']} for video {job['video_id']} failed")
+                recovered += 1
+        return recovered
+
+    def get_job(self, job_id):
+        try:
+            job = self.jobs.find_one({"_id": ObjectId(job_id)})
+        except Exception:
+            return None
+        if not job:
+            return None
+        job["_id"] = str(job["_id"])
+        return job
+
+    def shutdown(self, wait=False):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=not wait)
+                self._executor = None
+            if self._events is not None:
+                self._events.put(None)  # stops the relay thread
+                self._events = None
+            self._in_flight.clear()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context(self.start_method)
+                if self._events is None:
+                    # Outlives a broken pool; the workers of the next one reuse it
+                    self._events = context.Queue()
+                    progress_bus.bus.relay(self._events)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(self.mongodb_uri, self.db_name, self._events)
+                )
+            return self._executor
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat is not None and self._heartbeat.is_alive():
+                return
+            self._heartbeat = threading.Thread(target=self._beat, name='job-heartbeat', daemon=True)
+            self._heartbeat.start()
+
+    def _beat(self):
+        """Refresh ``heartbeat_at`` of the jobs this process queued, queued
+        ones included: they may wait behind long jobs without being stale"""
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            with self._lock:
+                job_ids = [ObjectId(job_id) for job_id in self._in_flight]
+            if not job_ids:
+                continue
+            try:
+                self.jobs.update_many(
+                    {"_id": {"$in": job_ids}, "status": {"$in": list(ACTIVE_STATUSES)}},
+                    {"$set": {"heartbeat_at": datetime.utcnow()}}
+                )
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {str(e)}")
+
+    def _fail_job(self, job_id, video_id, error, extra=None):
+        """Mark a job that is still active failed, and its video if that is
+        still waiting on it; returns whether the job was updated"""
+        query = dict(extra or {}, _id=ObjectId(job_id), status={"$in": list(ACTIVE_STATUSES)})
+        result = self.jobs.update_one(query, {
+            "$set": {
+                "status": "failed",
+                "error": error,
+                "finished_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
+            },
+            "$unset": {"active": ""}
+        })
+        if not result.modified_count:
+            return False
+        result = self.db.videos.update_one(
+            {"_id": ObjectId(video_id), "status": {"$in": ["queued", "processing"]}},
+            {"$set": {"status": "failed", "error": error}, "$inc": {"version": 1}}
+        )
+        if result.modified_count:
+            progress_bus.bus.publish(video_id, {
+                "video_id": str(video_id), "status": "failed", "stage": None,
+                "percent": 0.0, "eta_seconds": None, "error": error
+            })
+        return True
+
+    def _on_job_finished(self, job_id, video_id, future):
+        with self._lock:
+            self._in_flight.discard(job_id)
+        if future.cancelled():
+            error = "Job cancelled during shutdown"
+        else:
+            exc = future.exception()
+            if exc is None:
+                result = future.result() or {}
+                metrics.registry.replay(result.get("metrics"))
+                metrics.JOBS.inc(status=result.get("status", "done"))
+                return
+            error = str(exc) or type(exc).__name__
+            if isinstance(exc, BrokenProcessPool):
+                # A worker died (e.g. OOM); start a fresh pool for later jobs
+                logger.error(f"Job pool broke while running job {job_id}")
+                with self._lock:
+                    self._executor = None
+        metrics.JOBS.inc(status="cancelled" if future.cancelled() else "crashed")
+
+        self._fail_job(job_id, video_id, error)
@@ -0,0 +1,65 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+
+class PasswordHasherBusy(RuntimeError):
+    """More password checks are pending than PASSWORD_HASH_QUEUE allows"""
+
+
+def hash_cost(hashed):
+    """The cost (log2 rounds) recorded in a ``$2b$12$...`` hash"""
+    try:
+        return int(hashed[4:6])
+    except (TypeError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """bcrypt on a bounded worker pool.
+
+    bcrypt releases the GIL, so PASSWORD_HASH_WORKERS threads (default one
+    per CPU) hash in parallel while the request threads only wait. At most
+    PASSWORD_HASH_QUEUE operations may be running or waiting; beyond that a
+    burst is refused with PasswordHasherBusy straight away rather than
+    leaving every web worker stuck behind a queue of ~250 ms hashes. New
+    hashes use BCRYPT_ROUNDS (default 12); see needs_rehash.
+    """
+
+    def __init__(self, rounds=None, workers=None, max_pending=None, timeout=None):
+        self.rounds = rounds or int(os.getenv('BCRYPT_ROUNDS', 12))
+        self.workers = workers or int(os.getenv('PASSWORD_HASH_WORKERS', 0)) or os.cpu_count() or 1
+        self.max_pending = max_pending or int(os.getenv('PASSWORD_HASH_QUEUE', 0)) or self.workers * 4
+        self.timeout = timeout or float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+
+    def hash(self, password):
+        return self._run(lambda: bcrypt.hashpw(_encode(password), bcrypt.gensalt(self.rounds)))
+
+    def verify(self, password, hashed):
+        return self._run(lambda: bcrypt.checkpw(_encode(password), _encode(hashed)))
+
+    def needs_rehash(self, hashed):
+        """True when ``hashed`` was made with a cost other than BCRYPT_ROUNDS"""
+        return hash_cost(_encode(hashed)) != self.rounds
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, operation):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy("Too many concurrent password checks, try again shortly")
+        try:
+            future = self._executor.submit(operation)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+
+def _encode(value):
+    return value.encode('utf-8') if isinstance(value, str) else value
@@ -1,10 +1,20 @@
 from datetime import datetime
 from models.support_ticket import SupportTicket
 from bson.objectid import ObjectId
+from pagination import keyset_page, projection_for
 import logging
 
 logger = logging.getLogger(__name__)
 
+TICKET_FIELDS = {
+    'user_id', 'name', 'email', 'subject', 'description', 'priority', 'type',
+    'status', 'created_at', 'updated_at', 'responses'
+}
+TICKET_LIST_FIELDS = [
+    'user_id', 'name', 'email', 'subject', 'description', 'priority', 'type',
+    'status', 'created_at', 'updated_at'
+]
+
 class SupportService:
     def __init__(self, db):
         self.db = db
@@ -42,29 +52,34 @@ class SupportService:
             logger.error(f"Error fetching support ticket: {e}")
             return None
 
-    def get_user_tickets(self, user_id):
-        """Get all tickets for a specific user"""
+    def get_user_tickets(self, user_id, limit=None, cursor=None, fields=None):
+        """One page of a user's tickets, newest first: ``(tickets, next_cursor)``"""
         try:
-            tickets = self.tickets.find({"user_id": ObjectId(user_id)}).sort("created_at", -1)
-            return [SupportTicket.from_dict(ticket).to_dict() for ticket in tickets]
+            projection = projection_for(fields, TICKET_FIELDS, TICKET_LIST_FIELDS)
+            return keyset_page(self.tickets, {"user_id": ObjectId(user_id)}, "created_at",
+                               limit, cursor, projection)
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"Error fetching user tickets: {e}")
-            return []
+            return [], None
 
-    def get_all_tickets(self, status=None, priority=None):
-        """Get all tickets (admin function)"""
+    def get_all_tickets(self, status=None, priority=None, limit=None, cursor=None, fields=None):
+        """One page of all tickets (admin function): ``(tickets, next_cursor)``"""
         try:
             query = {}
             if status:
                 query['status'] = status
             if priority:
                 query['priority'] = priority
-                
-            tickets = self.tickets.find(query).sort("created_at", -1)
-            return [SupportTicket.from_dict(ticket).to_dict() for ticket in tickets]
+
+            projection = projection_for(fields, TICKET_FIELDS, TICKET_LIST_FIELDS)
+            return keyset_page(self.tickets, query, "created_at", limit, cursor, projection)
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"Error fetching all tickets: {e}")
-            return []
+            return [], None
 
     def update_ticket_status(self, ticket_id, status, user_id=None):
         """Update ticket status"""
@@ -0,0 +1,103 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def speech_audio_hash(audio):
+    """sha256 of the decoded 16 kHz mono speech samples.
+
+    Hashing the samples rather than the upload means re-muxed or re-encoded
+    copies with identical audio share one transcript.
+    """
+    import numpy as np
+    return hashlib.sha256(np.ascontiguousarray(audio, dtype=np.float32).data).hexdigest()
+
+
+class TranscriptStore:
+    """Content-addressed transcripts shared by subtitles and summaries.
+
+    Entries are keyed by (audio hash, model, language). Segments are kept
+    as JSON files under TRANSCRIPT_FOLDER and indexed in the
+    ``transcripts`` collection, so each audio track is transcribed at most
+    once per model and language.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.transcripts = db.transcripts
+        self.folder = os.getenv(
+            'TRANSCRIPT_FOLDER',
+            os.path.join(os.getenv('UPLOAD_FOLDER', 'uploads'), 'transcripts')
+        )
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    @staticmethod
+    def key(audio_hash, model, language):
+        return f"{audio_hash}:{model}:{language}"
+
+    def get(self, audio_hash, model, language):
+        """Cached segments, or None when this audio was never transcribed"""
+        entry = self.transcripts.find_one({"_id": self.key(audio_hash, model, language)})
+        if not entry:
+            return None
+        try:
+            with open(entry["path"], 'r', encoding='utf-8') as f:
+                segments = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Transcript file for {entry['_id']} is unreadable, dropping entry: {e}")
+            self.transcripts.delete_one({"_id": entry["_id"]})
+            return None
+        self.transcripts.update_one({"_id": entry["_id"]}, {"$set": {"last_used_at": datetime.utcnow()}})
+        return segments
+
+    def put(self, audio_hash, model, language, segments):
+        key = self.key(audio_hash, model, language)
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, f"{audio_hash}_{model}_{language}.json")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(segments, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        now = datetime.utcnow()
+        self.transcripts.update_one({"_id": key}, {
+            "$set": {
+                "audio_hash": audio_hash,
+                "model": model,
+                "language": language,
+                "path": path,
+                "segment_count": len(segments),
+                "duration": segments[-1]["end"] if segments else 0.0,
+                "last_used_at": now
+            },
+            "$setOnInsert": {"created_at": now}
+        }, upsert=True)
+        return segments
+
+    def get_or_transcribe(self, audio_hash, model, language, transcribe):
+        """Return cached segments, calling ``transcribe()`` only on a miss.
+
+        Concurrent requests for the same key in this process wait for the
+        first one instead of transcribing in parallel.
+        """
+        segments = self.get(audio_hash, model, language)
+        if segments is not None:
+            logger.info(f"Transcript cache hit for {audio_hash[:12]} ({model}, {language})")
+            return segments
+
+        key = self.key(audio_hash, model, language)
+        with self._locks_guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            segments = self.get(audio_hash, model, language)
+            if segments is None:
+                segments = self.put(audio_hash, model, language, transcribe())
+        with self._locks_guard:
+            self._locks.pop(key, None)
+        return segments
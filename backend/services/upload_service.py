@@ -0,0 +1,365 @@
+import os
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+from werkzeug.utils import secure_filename
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 1024 * 1024
+# Enough of the file to recognise every container in sniff_container
+SNIFF_BYTES = 16
+# A chunk writer that has not finished within this long is presumed dead
+# (its worker was killed) and the offset can be claimed again
+WRITER_TIMEOUT = timedelta(minutes=10)
+# How long complete() waits for a concurrent completion of the same upload
+COMPLETE_WAIT_SECONDS = 30
+
+
+def sniff_container(header):
+    """Identify a video container from its first bytes, None if unknown"""
+    if len(header) >= 8 and header[4:8] in (b'ftyp', b'moov', b'mdat', b'wide', b'free'):
+        return 'mp4'
+    if header[:4] == b'\x1a\x45\xdf\xa3':
+        return 'matroska'
+    if header[:4] == b'RIFF' and header[8:12] == b'AVI ':
+        return 'avi'
+    if header[:3] == b'FLV':
+        return 'flv'
+    if header[:16] == b'\x30\x26\xb2\x75\x8e\x66\xcf\x11\xa6\xd9\x00\xaa\x00\x62\xce\x6c':
+        return 'asf'
+    return None
+
+
+def copy_stream(stream, out, hasher, limit=None, block_size=BLOCK_SIZE):
+    """Copy ``stream`` into ``out`` in fixed blocks, feeding ``hasher``.
+
+    Returns the number of bytes written; raises ValueError past ``limit``.
+    """
+    written = 0
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            return written
+        written += len(block)
+        if limit is not None and written > limit:
+            raise ValueError("Upload is larger than declared")
+        hasher.update(block)
+        out.write(block)
+
+
+class UploadService:
+    """Chunked, resumable uploads streamed straight to disk.
+
+    A session is created with the final size, then the client appends the
+    body at the offset the server reports, as many times as it likes, and
+    finally completes it. The SHA-256 is computed while the bytes arrive
+    and the container magic is checked on the first chunk, so a bad upload
+    is rejected before the rest is sent. Session state lives in the
+    ``uploads`` collection, so an interrupted upload resumes from its last
+    offset on any web worker.
+
+    Each append first claims the upload at its offset with one conditional
+    update, so a retried or duplicated chunk is refused instead of written
+    twice; completion is claimed the same way. Sessions left untouched for
+    UPLOAD_ABANDON_HOURS are swept, with their partial files.
+    """
+
+    def __init__(self, db, video_service):
+        self.db = db
+        self.uploads = db.uploads
+        self.video_service = video_service
+        self.upload_folder = video_service.upload_folder
+        self.partial_folder = os.path.join(self.upload_folder, 'partial')
+        self.max_size = video_service.max_content_length
+        # Running hashes of in-progress uploads handled by this process
+        self._hashers = {}
+        self._lock = threading.Lock()
+        self.abandon_after = timedelta(hours=float(os.getenv('UPLOAD_ABANDON_HOURS', 24)))
+        self._swept_at = 0.0
+
+    def create_upload(self, user_id, filename, size):
+        filename = secure_filename(filename or '')
+        if not filename:
+            raise ValueError("No filename provided")
+        size = int(size)
+        if size <= 0:
+            raise ValueError("Invalid upload size")
+        if size > self.max_size:
+            raise ValueError(f"File too large. Maximum size is {self.max_size // (1024 * 1024)}MB")
+
+        self._maybe_sweep()
+        os.makedirs(self.partial_folder, exist_ok=True)
+        upload_id = ObjectId()
+        part_path = os.path.join(self.partial_folder, f"{upload_id}.part")
+        open(part_path, 'wb').close()
+
+        now = datetime.utcnow()
+        self.uploads.insert_one({
+            "_id": upload_id,
+            "user_id": str(user_id),
+            "filename": filename,
+            "size": size,
+            "offset": 0,
+            "status": "uploading",
+            "container": None,
+            "part_path": part_path,
+            "created_at": now,
+            "updated_at": now
+        })
+        return self.get_upload(str(upload_id))
+
+    def get_upload(self, upload_id):
+        upload = self.uploads.find_one({"_id": ObjectId(upload_id)})
+        if upload:
+            upload["_id"] = str(upload["_id"])
+            upload.pop("part_path", None)
+        return upload
+
+    def append(self, upload_id, user_id, offset, stream):
+        """Write ``stream`` at ``offset``; returns the new offset.
+
+        Raises UploadOffsetMismatch when ``offset`` is not where the upload
+        stands, so the client can resume from the reported offset, and
+        UploadBusy while another request is writing to it.
+        """
+        upload = self._claim_offset(upload_id, user_id, offset)
+        writer = upload["writer"]
+
+        hasher = self._hasher_at(upload)
+        failed = False
+        try:
+            with open(upload["part_path"], 'r+b') as out:
+                out.seek(offset)
+                while True:
+                    # The first read stops after the magic bytes so a bad
+                    # container is rejected before the rest of the body
+                    block = stream.read(SNIFF_BYTES - offset if offset < SNIFF_BYTES else BLOCK_SIZE)
+                    if not block:
+                        break
+                    if offset + len(block) > upload["size"]:
+                        raise ValueError("Upload is larger than declared")
+                    out.write(block)
+                    hasher.update(block)
+                    offset += len(block)
+                    if upload["container"] is None and offset >= min(SNIFF_BYTES, upload["size"]):
+                        out.flush()
+                        self._check_container(upload)
+        except InvalidContainer:
+            failed = True
+            raise
+        finally:
+            # Keep whatever arrived before an error or a dropped connection,
+            # unless the claim was lost meanwhile
+            if not failed:
+                result = self.uploads.update_one({"_id": upload["_id"], "writer": writer}, {"$set": {
+                    "offset": offset,
+                    "writer": None,
+                    "updated_at": datetime.utcnow()
+                }})
+                if result.modified_count:
+                    with self._lock:
+                        self._hashers[upload_id] = (offset, hasher.copy())
+        return offset
+
+    def complete(self, upload_id, user_id, expected_sha256=None):
+        """Turn a fully received upload into a video; returns ``(video_id, sha256)``.
+
+        Idempotent: a repeated call returns the video the first one created,
+        waiting for it if that call is still running.
+        """
+        upload = self._get_owned(upload_id, user_id)
+        claimed = self.uploads.find_one_and_update(
+            {"_id": upload["_id"], "status": "uploading", "offset": upload["size"], "writer": None},
+            {"$set": {"status": "completing", "updated_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not claimed:
+            return self._completed(upload)
+        upload = claimed
+
+        try:
+            sha256 = self._hasher_at(upload).hexdigest()
+            if expected_sha256 and expected_sha256.lower() != sha256:
+                self._fail(upload, "Checksum mismatch")
+                raise ValueError("Checksum mismatch")
+
+            os.makedirs(self.upload_folder, exist_ok=True)
+            filepath = os.path.join(self.upload_folder, upload["filename"])
+            if os.path.exists(filepath):
+                name, ext = os.path.splitext(upload["filename"])
+                filepath = os.path.join(self.upload_folder, f"{name}_{upload_id}{ext}")
+            os.replace(upload["part_path"], filepath)
+            with self._lock:
+                self._hashers.pop(upload_id, None)
+        except Exception:
+            # Nothing moved yet: let the client try again (a checksum
+            # mismatch has already failed the upload, so this is a no-op)
+            self.uploads.update_one({"_id": upload["_id"], "status": "completing"},
+                                    {"$set": {"status": "uploading"}})
+            raise
+
+        try:
+            video_id = self.video_service.create_video(
+                filepath, upload["filename"], user_id, sha256=sha256, container=upload["container"]
+            )
+        except Exception as e:
+            self.uploads.update_one({"_id": upload["_id"]}, {"$set": {
+                "status": "failed",
+                "error": str(e),
+                "updated_at": datetime.utcnow()
+            }})
+            raise
+        self.uploads.update_one({"_id": upload["_id"]}, {"$set": {
+            "status": "complete",
+            "sha256": sha256,
+            "video_id": video_id,
+            "updated_at": datetime.utcnow()
+        }})
+        return video_id, sha256
+
+    def sweep_abandoned(self):
+        """Expire sessions idle for longer than UPLOAD_ABANDON_HOURS and delete their partial files"""
+        cutoff = datetime.utcnow() - self.abandon_after
+        swept = 0
+        for upload in self.uploads.find({"status": "uploading", "updated_at": {"$lt": cutoff}},
+                                        {"part_path": 1}):
+            result = self.uploads.update_one(
+                {"_id": upload["_id"], "status": "uploading", "updated_at": {"$lt": cutoff}},
+                {"$set": {"status": "expired", "updated_at": datetime.utcnow()}}
+            )
+            if not result.modified_count:
+                continue
+            if os.path.exists(upload["part_path"]):
+                os.remove(upload["part_path"])
+            with self._lock:
+                self._hashers.pop(str(upload["_id"]), None)
+            swept += 1
+        if swept:
+            logger.info(f"Expired {swept} abandoned uploads")
+        return swept
+
+    def _maybe_sweep(self):
+        # At most once an hour per process; a failure must not block uploads
+        now = time.monotonic()
+        if now - self._swept_at < 3600:
+            return
+        self._swept_at = now
+        try:
+            self.sweep_abandoned()
+        except Exception as e:
+            logger.error(f"Sweeping abandoned uploads failed: {str(e)}")
+
+    def _claim_offset(self, upload_id, user_id, offset):
+        """Take the upload for one append at ``offset``, or say why not"""
+        upload = self._get_owned(upload_id, user_id)
+        now = datetime.utcnow()
+        claimed = self.uploads.find_one_and_update(
+            {
+                "_id": upload["_id"],
+                "status": "uploading",
+                "offset": offset,
+                "$or": [{"writer": None}, {"writer_since": {"$lt": now - WRITER_TIMEOUT}}]
+            },
+            {"$set": {"writer": uuid.uuid4().hex, "writer_since": now}},
+            return_document=ReturnDocument.AFTER
+        )
+        if claimed:
+            return claimed
+
+        upload = self._get_owned(upload_id, user_id)
+        if upload["status"] != "uploading":
+            raise ValueError(f"Upload is {upload['status']}")
+        if offset != upload["offset"]:
+            raise UploadOffsetMismatch(upload["offset"])
+        raise UploadBusy(upload["offset"])
+
+    def _completed(self, upload):
+        """The result of a completion claimed by another request"""
+        deadline = time.monotonic() + COMPLETE_WAIT_SECONDS
+        while True:
+            if upload["status"] == "complete":
+                return upload["video_id"], upload["sha256"]
+            if upload["status"] == "failed":
+                raise ValueError(upload.get("error") or "Upload failed")
+            if upload["status"] != "completing":
+                raise UploadOffsetMismatch(upload["offset"])
+            if time.monotonic() > deadline:
+                raise UploadBusy(upload["offset"])
+            time.sleep(0.2)
+            upload = self.uploads.find_one({"_id": upload["_id"]})
+
+    def _get_owned(self, upload_id, user_id):
+        upload = self.uploads.find_one({"_id": ObjectId(upload_id)})
+        if not upload:
+            raise ValueError("Upload not found")
+        if upload["user_id"] != str(user_id):
+            raise ValueError("Unauthorized")
+        return upload
+
+    def _hasher_at(self, upload):
+        """Running SHA-256 of the bytes received so far.
+
+        Another worker, or a restart, may have received the earlier chunks;
+        the partial file is then hashed again once and the state kept.
+        """
+        upload_id = str(upload["_id"])
+        with self._lock:
+            cached = self._hashers.get(upload_id)
+        if cached and cached[0] == upload["offset"]:
+            # A copy, so a failed append cannot advance the cached state
+            return cached[1].copy()
+
+        hasher = hashlib.sha256()
+        with open(upload["part_path"], 'rb') as f:
+            remaining = upload["offset"]
+            while remaining:
+                block = f.read(min(BLOCK_SIZE, remaining))
+                if not block:
+                    raise ValueError("Partial upload is shorter than its recorded offset")
+                hasher.update(block)
+                remaining -= len(block)
+        return hasher
+
+    def _check_container(self, upload):
+        with open(upload["part_path"], 'rb') as f:
+            container = sniff_container(f.read(SNIFF_BYTES))
+        if container is None:
+            self._fail(upload, "Invalid video file")
+            raise InvalidContainer("Invalid video file")
+        upload["container"] = container
+        self.uploads.update_one({"_id": upload["_id"]}, {"$set": {"container": container}})
+
+    def _fail(self, upload, error):
+        if os.path.exists(upload["part_path"]):
+            os.remove(upload["part_path"])
+        with self._lock:
+            self._hashers.pop(str(upload["_id"]), None)
+        self.uploads.update_one({"_id": upload["_id"]}, {"$set": {
+            "status": "failed",
+            "error": error,
+            "updated_at": datetime.utcnow()
+        }})
+
+
+class UploadOffsetMismatch(ValueError):
+    def __init__(self, offset):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+class UploadBusy(UploadOffsetMismatch):
+    """Another request is writing to or completing the upload"""
+
+    def __init__(self, offset):
+        ValueError.__init__(self, "Upload is busy, try again shortly")
+        self.offset = offset
+
+
+class InvalidContainer(ValueError):
+    pass
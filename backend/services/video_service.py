@@ -1,16 +1,51 @@
 import os
 import json
+import time
+import logging
 from datetime import datetime
-from models.video import Video
+from models.video import Video, VideoConflict
 from bson.objectid import ObjectId
 from werkzeug.utils import secure_filename
-import magic
-import cv2
-import numpy as np
-from moviepy.editor import VideoFileClip
-from pydub import AudioSegment
-import tensorflow as tf
-from transformers import pipeline
+from model_registry import get_hf_pipeline
+from services.transcript_store import TranscriptStore
+from services.blob_store import BlobStore, options_fingerprint
+from pagination import keyset_page, projection_for
+from metrics import timed_stage
+
+# cv2, numpy, moviepy, pydub and libmagic are imported inside the methods
+# that use them so that importing this module (and booting app.py) does not
+# load the media stack.
+
+logger = logging.getLogger(__name__)
+
+# Fields a listing may ask for with ?fields=, and the default set
+VIDEO_FIELDS = {
+    "user_id", "filename", "size", "status", "processing_options", "upload_date",
+    "process_start_time", "process_end_time", "error", "metadata", "outputs",
+    "metadata.duration", "metadata.resolution", "metadata.fps", "metadata.format",
+    "outputs.thumbnail", "outputs.summary",
+}
+VIDEO_LIST_FIELDS = [
+    "filename", "size", "status", "upload_date", "processing_options", "error",
+    "metadata.duration", "metadata.resolution",
+]
+
+# Optimistic update attempts before giving up on a busy document
+UPDATE_RETRIES = 5
+# How often a job waiting on another video's outputs for the same blob checks on it
+ARTIFACT_WAIT_SECONDS = 1.0
+
+
+def planned_stages(options):
+    """The stages process_video runs for ``options``, in order"""
+    stages = [stage for stage in ('cut_silence', 'enhance_audio', 'detect_scenes', 'generate_thumbnail',
+                                  'generate_subtitles', 'summarize') if options.get(stage)]
+    if any([options.get('stabilization'), options.get('brightness'), options.get('contrast')]):
+        stages.append('video_enhancements')
+    if options.get('hls'):
+        stages.append('package_hls')
+    return stages
+
 
 class VideoService:
     def __init__(self, db):
@@ -18,81 +53,174 @@ class VideoService:
         self.videos = db.videos
         self.upload_folder = os.getenv('UPLOAD_FOLDER', 'uploads')
         self.max_content_length = int(os.getenv('MAX_CONTENT_LENGTH', 500 * 1024 * 1024))
-        
-        # Initialize AI models
-        try:
-            self.summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-            self.speech_recognizer = pipeline("automatic-speech-recognition")
-        except Exception as e:
-            print(f"Warning: Could not initialize AI models: {e}")
-            self.summarizer = None
-            self.speech_recognizer = None
+        self.whisper_model_size = os.getenv('WHISPER_MODEL', 'base')
+        self.summarizer_model = os.getenv('SUMMARIZER_MODEL', 'facebook/bart-large-cnn')
+        self.transcript_store = TranscriptStore(db)
+        self.blob_store = BlobStore(db, self.upload_folder)
 
     def save_video(self, file, user_id):
         if not file:
             raise ValueError("No file provided")
 
+        import hashlib
+        from services.upload_service import sniff_container, copy_stream, SNIFF_BYTES
+
         filename = secure_filename(file.filename)
         filepath = os.path.join(self.upload_folder, filename)
         
         # Create upload directory if it doesn't exist
         os.makedirs(self.upload_folder, exist_ok=True)
         
-        # Save file
-        file.save(filepath)
-        
-        # Validate file
-        if not self._is_valid_video(filepath):
-            os.remove(filepath)
+        # Validate the container magic before copying the rest
+        header = file.stream.read(SNIFF_BYTES)
+        container = sniff_container(header)
+        if container is None:
             raise ValueError("Invalid video file")
 
-        # Create video document
+        # Stream to disk in fixed blocks, hashing on the way
+        hasher = hashlib.sha256(header)
+        with open(filepath, 'wb') as out:
+            out.write(header)
+            copy_stream(file.stream, out, hasher)
+
+        return self.create_video(filepath, filename, user_id, sha256=hasher.hexdigest(), container=container)
+
+    def create_video(self, filepath, filename, user_id, sha256=None, container=None):
+        """Register a file already in the upload folder as a video of ``user_id``.
+
+        With a ``sha256`` the file is moved into the blob store, or dropped
+        if that content is already stored, and the video points at the blob.
+        """
+        blob = None
+        if sha256:
+            blob = self.blob_store.add_reference(sha256, filepath, container)
+            filepath = blob["path"]
+
         video = Video(
             user_id=ObjectId(user_id),
             filename=filename,
             filepath=filepath,
             size=os.path.getsize(filepath)
         )
+        if sha256:
+            video.metadata["sha256"] = sha256
+        if container:
+            video.metadata["container"] = container
         
-        # Extract metadata
-        self._extract_metadata(video)
+        # Extract metadata, once per distinct content
+        if blob and blob.get("metadata"):
+            video.metadata.update(blob["metadata"])
+        else:
+            self._extract_metadata(video)
+            if blob:
+                self.blob_store.set_metadata(sha256, video.metadata)
         
         # Save to database
         result = self.videos.insert_one(video.to_dict())
         return str(result.inserted_id)
 
-    def process_video(self, video_id, options):
+    def process_video(self, video_id, options, on_stage=None, on_progress=None):
+        """Run the selected processing stages on a video.
+
+        ``on_stage`` is called with the name of each stage as it starts, so a
+        caller such as the job worker can report progress; ``on_progress``
+        receives progress_bus events with percent-complete and ETA. What each
+        stage produced is saved (just the changed fields) before the next starts.
+        """
         video = self.get_video(video_id)
         if not video:
             raise ValueError("Video not found")
 
+        from media_context import MediaContext
+        from progress_bus import StageProgress
+
+        def start_stage(stage):
+            # Persist what the previous stage produced before the next starts
+            self.update_video(video)
+            progress.start(stage)
+            if on_stage:
+                on_stage(stage)
+
         video.status = "processing"
         video.process_start_time = datetime.utcnow()
         video.processing_options = options
+
+        # Another copy of this content already went through the same options
+        sha256 = video.metadata.get("sha256")
+        fingerprint = options_fingerprint(options)
+        artifact = self._claim_artifact(video, sha256, fingerprint) if sha256 else None
+        stages = ['reuse_artifacts'] if artifact else planned_stages(options)
+        progress = StageProgress(video_id, stages, on_progress or (lambda event: None))
+        if artifact:
+            start_stage('reuse_artifacts')
+            video.outputs.update(artifact["outputs"])
+            video.metadata.update(artifact["metadata"])
+            video.status = "completed"
+            video.process_end_time = datetime.utcnow()
+            self.update_video(video)
+            progress.finish(video.status)
+            return
+
+        # One decode of the source shared by every stage of this job
+        media = MediaContext(
+            video.filepath,
+            video.metadata,
+            speech_audio=bool(options.get('generate_subtitles') or options.get('summarize'))
+        )
         
+        # Stages that failed or fell back to placeholder output; a run with
+        # any of these is not cached for reuse
+        incomplete = []
+        # Tags of the previous run's outputs; those files may be rewritten now
+        video.outputs.pop("etags", None)
+
+        def run_stage(stage, method, *args, **kwargs):
+            start_stage(stage)
+            if not method(*args, **kwargs):
+                incomplete.append(stage)
+
         try:
             # Enhanced processing with actual options
             if options.get('cut_silence'):
-                self._cut_silence(video)
+                run_stage('cut_silence', self._cut_silence, video, options, media)
             
             if options.get('enhance_audio'):
-                self._enhance_audio(video, options)
+                run_stage('enhance_audio', self._enhance_audio, video, options, media)
             
+            if options.get('detect_scenes'):
+                run_stage('detect_scenes', self._detect_scenes, video, media)
+
             if options.get('generate_thumbnail'):
-                self._generate_thumbnail(video)
+                run_stage('generate_thumbnail', self._generate_thumbnail, video, options, media)
             
             if options.get('generate_subtitles'):
-                self._generate_subtitles(video, options)
+                run_stage('generate_subtitles', self._generate_subtitles, video, options, media)
             
             if options.get('summarize'):
-                self._summarize_video(video)
+                run_stage('summarize', self._summarize_video, video, options, media)
 
             # Apply video enhancements
             if any([options.get('stabilization'), options.get('brightness'), options.get('contrast')]):
-                self._apply_video_enhancements(video, options)
+                run_stage('video_enhancements', self._apply_video_enhancements, video, options, media,
+                          progress=progress.fraction)
+
+            # Adaptive streaming copy of the final result
+            if options.get('hls'):
+                run_stage('package_hls', self._package_hls, video, options, media)
 
+            if media.metadata.get("probe"):
+                video.metadata["probe"] = media.metadata["probe"]
+            # Hashed here, once, rather than by the first request for each file
+            from media_server import output_etags
+            video.outputs["etags"] = output_etags(video.outputs)
             video.status = "completed"
             video.process_end_time = datetime.utcnow()
+            if incomplete:
+                video.metadata["incomplete_stages"] = incomplete
+            else:
+                video.metadata.pop("incomplete_stages", None)
+                if sha256:
+                    self.blob_store.put_artifact(sha256, fingerprint, video.outputs, video.metadata)
             
         except Exception as e:
             video.status = "failed"
@@ -101,10 +229,79 @@ class VideoService:
             raise
         
         finally:
-            self.videos.update_one(
-                {"_id": ObjectId(video_id)},
-                {"$set": video.to_dict()}
-            )
+            media.close()
+            if sha256:
+                self.blob_store.release_artifact(sha256, fingerprint, video._id)
+            try:
+                self.update_video(video)
+            except VideoConflict as conflict:
+                # A failing stage's error is the one to report, not the save's
+                if video.status != "failed":
+                    raise
+                logger.error(f"Could not record the failure of video {video_id}: {conflict}")
+            progress.finish(video.status, video.error)
+
+    def _claim_artifact(self, video, sha256, fingerprint):
+        """Outputs another video of this blob built with the same options, or None
+        once ``video`` holds the claim to build them itself.
+
+        Videos of one blob write to the same output paths, so while another
+        video is building them this waits for its artifact, and takes over
+        the claim if that video stops processing without recording one.
+        """
+        while True:
+            artifact = self.blob_store.get_artifact(sha256, fingerprint)
+            if artifact:
+                return artifact
+            if self.blob_store.claim_artifact(sha256, fingerprint, video._id):
+                # The previous builder may have recorded its outputs just before
+                artifact = self.blob_store.get_artifact(sha256, fingerprint)
+                if artifact:
+                    self.blob_store.release_artifact(sha256, fingerprint, video._id)
+                return artifact
+            builder = self.blob_store.artifact_builder(sha256, fingerprint)
+            if builder is None:
+                if not self.blob_store.get(sha256):
+                    return None
+                continue
+            active = self.videos.find_one({"_id": ObjectId(builder), "status": {"$in": ["queued", "processing"]}},
+                                          {"_id": 1})
+            if not active:
+                logger.warning(f"Video {builder} left outputs of blob {sha256[:12]} unfinished, taking over")
+                self.blob_store.release_artifact(sha256, fingerprint, builder)
+                continue
+            time.sleep(ARTIFACT_WAIT_SECONDS)
+
+    def update_video(self, video):
+        """Write the fields of ``video`` changed since it was read, and only those.
+
+        The update applies only if the stored version is still the one read
+        (documents from before versioning have none). If another writer got
+        in first, the changes are rebased onto a fresh read and retried;
+        VideoConflict is raised when both changed the same field.
+        """
+        for _ in range(UPDATE_RETRIES):
+            to_set, to_unset = video.changes()
+            if not to_set and not to_unset:
+                return
+            update = {"$inc": {"version": 1}}
+            if to_set:
+                update["$set"] = to_set
+            if to_unset:
+                update["$unset"] = {path: "" for path in to_unset}
+
+            version = video.version if video.version else {"$in": [0, None]}
+            result = self.videos.update_one({"_id": video._id, "version": version}, update)
+            if result.matched_count:
+                video.version += 1
+                video.mark_saved()
+                return
+
+            fresh = self.videos.find_one({"_id": video._id})
+            if not fresh:
+                raise ValueError("Video not found")
+            video.rebase(Video.from_dict(fresh))
+        raise VideoConflict(set(video.changes()[0]))
 
     def get_video(self, video_id):
         video_data = self.videos.find_one({"_id": ObjectId(video_id)})
@@ -112,9 +309,19 @@ class VideoService:
             return None
         return Video.from_dict(video_data)
 
-    def get_user_videos(self, user_id):
-        videos = self.videos.find({"user_id": ObjectId(user_id)})
-        return [Video.from_dict(video).to_dict() for video in videos]
+    def get_video_status(self, video_id):
+        """Just the owner, status and error of a video, as stored"""
+        return self.videos.find_one({"_id": ObjectId(video_id)}, {"user_id": 1, "status": 1, "error": 1})
+
+    def get_user_videos(self, user_id, limit=None, cursor=None, fields=None):
+        """One page of a user's videos, newest first, with only the listed fields.
+
+        Returns ``(videos, next_cursor)``; see pagination.keyset_page.
+        """
+        # Video.to_dict stores user_id as a string, older documents hold an ObjectId
+        query = {"user_id": {"$in": [str(user_id), ObjectId(user_id)]}}
+        projection = projection_for(fields, VIDEO_FIELDS, VIDEO_LIST_FIELDS)
+        return keyset_page(self.videos, query, "upload_date", limit, cursor, projection)
 
     def delete_video(self, video_id, user_id):
         video = self.get_video(video_id)
@@ -124,118 +331,152 @@ class VideoService:
         if str(video.user_id) != str(user_id):
             raise ValueError("Unauthorized")
         
-        # Delete file
-        if os.path.exists(video.filepath):
-            os.remove(video.filepath)
-        
-        # Delete processed files
-        if video.outputs.get('processed_video') and os.path.exists(video.outputs['processed_video']):
-            os.remove(video.outputs['processed_video'])
+        sha256 = video.metadata.get("sha256")
+        if sha256 and self.blob_store.get(sha256):
+            # Shared content: files go with the last video referencing them
+            self.blob_store.release(sha256)
+        else:
+            # Delete file
+            if os.path.exists(video.filepath):
+                os.remove(video.filepath)
+            
+            # Delete processed files
+            if video.outputs.get('processed_video') and os.path.exists(video.outputs['processed_video']):
+                os.remove(video.outputs['processed_video'])
         
         # Delete from database
         self.videos.delete_one({"_id": ObjectId(video_id)})
 
-    def _is_valid_video(self, filepath):
-        try:
-            mime = magic.Magic(mime=True)
-            file_type = mime.from_file(filepath)
-            return file_type.startswith('video/')
-        except:
-            # Fallback: check file extension
-            valid_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv']
-            return any(filepath.lower().endswith(ext) for ext in valid_extensions)
+    def _output_base(self, video, options):
+        """Path prefix for files derived from ``video`` with ``options``.
+
+        The source stem plus an options fingerprint: copies of one blob
+        share outputs, while different options never overwrite each other.
+        """
+        return f"{os.path.splitext(video.filepath)[0]}_{options_fingerprint(options)}"
 
     def _extract_metadata(self, video):
         try:
-            clip = VideoFileClip(video.filepath)
+            from media_probe import probe_media
+            # Container headers only, kept so processing jobs do not probe again
+            info = probe_media(video.filepath, video.metadata.get("sha256"))
             video.metadata.update({
-                "duration": clip.duration,
-                "fps": clip.fps,
-                "resolution": f"{clip.size[0]}x{clip.size[1]}",
-                "format": os.path.splitext(video.filename)[1][1:]
+                "duration": info["duration"],
+                "fps": info["fps"],
+                "resolution": f"{info['width']}x{info['height']}" if info["width"] else None,
+                "format": os.path.splitext(video.filename)[1][1:],
+                "probe": info
             })
-            clip.close()
         except Exception as e:
-            print(f"Error extracting metadata: {e}")
+            logger.error(f"Error extracting metadata: {e}")
             video.metadata.update({
                 "format": os.path.splitext(video.filename)[1][1:]
             })
 
-    def _apply_video_enhancements(self, video, options):
+    @timed_stage('video_enhancements')
+    def _apply_video_enhancements(self, video, options, media, progress=None):
         """Apply video enhancements like brightness, contrast, stabilization"""
         try:
-            clip = VideoFileClip(video.filepath)
+            from ffmpeg_tools import VideoWriter
+            from frame_filters import brightness_contrast_lut, apply_lut, map_frames_ordered
+            
+            info = media.info
+            width, height, fps = info["width"], info["height"], info["fps"] or 30.0
+            filters = []
             
             # Apply brightness and contrast adjustments
             brightness = options.get('brightness', 100) / 100.0  # Convert percentage to multiplier
             contrast = options.get('contrast', 100) / 100.0
             
             if brightness != 1.0 or contrast != 1.0:
-                def adjust_brightness_contrast(image):
-                    # Convert to float for calculations
-                    img = image.astype(np.float32)
-                    
-                    # Apply brightness (additive)
-                    if brightness != 1.0:
-                        img = img * brightness
-                    
-                    # Apply contrast (multiplicative around midpoint)
-                    if contrast != 1.0:
-                        img = (img - 128) * contrast + 128
-                    
-                    # Clip values to valid range
-                    img = np.clip(img, 0, 255)
-                    return img.astype(np.uint8)
-                
-                clip = clip.fl_image(adjust_brightness_contrast)
+                # Pure per-pixel map: precompute it once as a 256-entry table
+                lut = brightness_contrast_lut(brightness, contrast)
+                filters.append(lambda index, frame: apply_lut(frame, lut))
             
-            # Apply stabilization (basic implementation)
+            # Apply stabilization: motion analysis is cached per source hash,
+            # so only the smoothing and warp run again for another level
             stabilization = options.get('stabilization', 'none')
-            if stabilization != 'none':
-                # For now, we'll just apply a simple smoothing
-                # In a real implementation, you'd use more sophisticated stabilization
-                pass
-            
-            # Save enhanced video
-            output_path = f"{os.path.splitext(video.filepath)[0]}_enhanced.mp4"
-            clip.write_videofile(output_path, codec='libx264', audio_codec='aac')
+            if stabilization and stabilization != 'none':
+                from stabilizer import Stabilizer
+                # The blob is named by its hash; no need to read it again for that
+                stabilizer = Stabilizer(video.filepath, info, content_hash=video.metadata.get("sha256"))
+                filters.insert(0, stabilizer.frame_filter(stabilization))
+            
+            def apply_filters(item):
+                index, frame = item
+                for apply in filters:
+                    frame = apply(index, frame)
+                return frame
+            
+            # Save enhanced video; frames are filtered on a thread pool in order
+            output_path = f"{self._output_base(video, options)}_enhanced.mp4"
+            total_frames = max(1, int(media.duration * fps)) if media.duration else None
+            with VideoWriter(output_path, width, height, fps, audio_source=video.filepath) as writer:
+                for index, frame in enumerate(map_frames_ordered(enumerate(media.iter_frames()), apply_filters)):
+                    writer.write(frame)
+                    if progress and total_frames:
+                        progress(index / total_frames)
             video.outputs["processed_video"] = output_path
-            
-            clip.close()
+            return True
             
         except Exception as e:
-            print(f"Error applying video enhancements: {e}")
+            logger.error(f"Error applying video enhancements: {e}")
             raise
 
-    def _cut_silence(self, video):
+    @timed_stage('package_hls')
+    def _package_hls(self, video, options, media):
         try:
-            audio = AudioSegment.from_file(video.filepath)
-            chunks = []
-            silence_thresh = -40
-            min_silence_len = 500
-            
-            # Process audio in chunks
-            chunk_length = 10000
-            for i in range(0, len(audio), chunk_length):
-                chunk = audio[i:i + chunk_length]
-                if chunk.dBFS > silence_thresh:
-                    chunks.append(chunk)
-            
-            # Combine non-silent chunks
-            processed_audio = AudioSegment.empty()
-            for chunk in chunks:
-                processed_audio += chunk
+            from hls_packager import package_hls
+            from media_probe import probe_media
+
+            source = video.outputs.get("processed_video") or video.filepath
+            info = media.info if source == video.filepath else probe_media(source)
+            audio_source = None
+            if not info.get("video_codec"):
+                # enhance_audio alone leaves an audio-only file: the picture
+                # comes from the original, the sound from that file
+                source, audio_source, info = video.filepath, source, media.info
+            output_dir = f"{self._output_base(video, options)}_hls"
+            video.outputs["hls"] = package_hls(source, output_dir, info, audio_source=audio_source)
+            return True
+        except Exception as e:
+            logger.error(f"Error packaging HLS: {e}")
+            raise
+
+    @timed_stage('cut_silence')
+    def _cut_silence(self, video, options, media):
+        try:
+            from silence_detection import detect_silence, invert_intervals
+            from cut_plan import cut_intervals
+
+            pcm = media.pcm()
+            sample_rate = media.sample_rate
+            silences = detect_silence(
+                pcm,
+                sample_rate,
+                threshold_db=options.get('silence_threshold_db', -40),
+                min_silence_ms=options.get('silence_min_ms', 500)
+            )
+            keep = invert_intervals(silences, len(pcm) / sample_rate)
             
-            # Save processed audio
-            output_path = f"{os.path.splitext(video.filepath)[0]}_processed.mp4"
-            processed_audio.export(output_path, format="mp4")
+            # Cut video and audio together; only GOPs split by a cut are re-encoded
+            output_path = f"{self._output_base(video, options)}_processed.mp4"
+            plan = cut_intervals(video.filepath, output_path, keep, media.info)
             video.outputs["processed_video"] = output_path
+            video.metadata["silence_cut"] = {
+                "removed_seconds": sum(end - start for start, end in silences),
+                "pieces": len(plan),
+                "copied_pieces": sum(1 for piece in plan if piece["mode"] == "copy")
+            }
+            return True
         except Exception as e:
-            print(f"Error cutting silence: {e}")
+            logger.error(f"Error cutting silence: {e}")
+            return False
 
-    def _enhance_audio(self, video, options):
+    @timed_stage('enhance_audio')
+    def _enhance_audio(self, video, options, media):
         try:
-            audio = AudioSegment.from_file(video.filepath)
+            audio = media.audio_segment()
             
             # Get enhancement type
             enhancement_type = options.get('audio_enhancement_type', 'full')
@@ -255,114 +496,98 @@ class VideoService:
                 enhanced = enhanced.high_pass_filter(80)
             
             # Save enhanced audio
-            output_path = f"{os.path.splitext(video.filepath)[0]}_enhanced_audio.mp4"
+            output_path = f"{self._output_base(video, options)}_enhanced_audio.mp4"
             enhanced.export(output_path, format="mp4")
             video.outputs["processed_video"] = output_path
+            return True
         except Exception as e:
-            print(f"Error enhancing audio: {e}")
+            logger.error(f"Error enhancing audio: {e}")
+            return False
 
-    def _generate_thumbnail(self, video):
+    @timed_stage('detect_scenes')
+    def _detect_scenes(self, video, media):
         try:
-            cap = cv2.VideoCapture(video.filepath)
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            cap.set(cv2.CAP_PROP_POS_FRAMES, total_frames // 2)
-            ret, frame = cap.read()
-            
-            if ret:
-                thumbnail_path = f"{os.path.splitext(video.filepath)[0]}_thumb.jpg"
-                cv2.imwrite(thumbnail_path, frame)
-                video.outputs["thumbnail"] = thumbnail_path
-            
-            cap.release()
+            from scene_detection import detect_scenes
+
+            # Shot boundaries for chapters, thumbnails and smart cuts
+            video.metadata["scenes"] = detect_scenes(video.filepath, media.info)
+            return True
         except Exception as e:
-            print(f"Error generating thumbnail: {e}")
+            logger.error(f"Error detecting scenes: {e}")
+            return False
 
-    def _generate_subtitles(self, video, options):
-        """Enhanced subtitle generation with language support"""
+    @timed_stage('generate_thumbnail')
+    def _generate_thumbnail(self, video, options, media):
+        try:
+            from thumbnails import generate_previews
+
+            # Poster and storyboard from one keyframe-only decode
+            base = self._output_base(video, options)
+            thumbnail_path = f"{base}_thumb.jpg"
+            sprite_path = f"{base}_storyboard.jpg"
+            vtt_path = f"{base}_storyboard.vtt"
+            generate_previews(video.filepath, media.info, thumbnail_path, sprite_path, vtt_path)
+            video.outputs["thumbnail"] = thumbnail_path
+            video.outputs["storyboard"] = {"sprite": sprite_path, "vtt": vtt_path}
+            return True
+        except Exception as e:
+            logger.error(f"Error generating thumbnail: {e}")
+            return False
+
+    @timed_stage('generate_subtitles')
+    def _generate_subtitles(self, video, options, media=None):
+        """Enhanced subtitle generation with language support.
+
+        Returns True for a real transcription, False when the sample-text
+        fallback was written instead.
+        """
+        owns_media = media is None
+        if owns_media:
+            from media_context import MediaContext
+            media = MediaContext(video.filepath, video.metadata, speech_audio=True)
         try:
             # Get language and style from options
             language = options.get('subtitle_language', 'en')
             style = options.get('subtitle_style', 'clean')
             
-            print(f"[SUBTITLE DEBUG] Starting subtitle generation for video: {video.filepath}")
-            print(f"[SUBTITLE DEBUG] Language: {language}, Style: {style}")
-            
-            # Extract audio for transcription
-            clip = VideoFileClip(video.filepath)
-            audio_path = f"{os.path.splitext(video.filepath)[0]}_audio.wav"
-            print(f"[SUBTITLE DEBUG] Extracting audio to: {audio_path}")
-            clip.audio.write_audiofile(audio_path)
-            print(f"[SUBTITLE DEBUG] Audio extraction completed")
+            logger.debug(f"Generating {language} subtitles ({style}) for {video.filepath}")
             
             # Try to use Whisper for real transcription
             try:
-                print(f"[SUBTITLE DEBUG] Attempting Whisper transcription...")
-                import whisper
-                print(f"[SUBTITLE DEBUG] Whisper imported successfully")
-                
-                model = whisper.load_model("base")
-                print(f"[SUBTITLE DEBUG] Whisper model loaded successfully")
-                
-                whisper_lang = self._get_whisper_language_code(language)
-                print(f"[SUBTITLE DEBUG] Using Whisper language code: {whisper_lang}")
-                
-                # Load audio data directly using moviepy instead of relying on FFmpeg
-                import librosa
-                audio_data, sample_rate = librosa.load(audio_path, sr=16000)
-                print(f"[SUBTITLE DEBUG] Audio loaded with librosa: {len(audio_data)} samples at {sample_rate}Hz")
-                
-                result = model.transcribe(audio_data, language=whisper_lang)
-                print(f"[SUBTITLE DEBUG] Whisper transcription completed")
-                print(f"[SUBTITLE DEBUG] Found {len(result.get('segments', []))} segments")
-                
-                # Extract segments with timestamps
-                segments = []
-                for i, segment in enumerate(result['segments']):
-                    segments.append({
-                        'start': segment['start'],
-                        'end': segment['end'],
-                        'text': segment['text'].strip()
-                    })
-                    print(f"[SUBTITLE DEBUG] Segment {i+1}: {segment['start']:.2f}s-{segment['end']:.2f}s: '{segment['text'].strip()}'")
-                
-                print(f"[SUBTITLE DEBUG] Successfully processed {len(segments)} segments from Whisper")
+                # Cached per (audio, model, language): new styles reuse it
+                segments = self._get_transcript(video, media, language)
+                logger.debug(f"Whisper returned {len(segments)} segments for {video.filepath}")
                 
                 # Generate both SRT and JSON format subtitles
                 srt_content, json_data = self._create_subtitles_from_segments(segments, language, style)
-                print(f"[SUBTITLE DEBUG] Using REAL Whisper transcription")
+                transcribed = True
                 
             except ImportError as e:
-                print(f"[SUBTITLE DEBUG] Whisper or librosa not available: {e}")
-                print(f"[SUBTITLE DEBUG] Falling back to sample text")
+                logger.warning(f"Whisper not available, using sample subtitles: {e}")
                 # Fallback to sample text
                 text = self._get_sample_text(language)
-                srt_content, json_data = self._create_subtitles(text, language, style, clip.duration)
+                srt_content, json_data = self._create_subtitles(text, language, style, media.duration)
+                transcribed = False
                 
-            except Exception as e:
-                print(f"[SUBTITLE DEBUG] Whisper transcription failed with error: {e}")
-                print(f"[SUBTITLE DEBUG] Error type: {type(e).__name__}")
-                import traceback
-                traceback.print_exc()
-                print(f"[SUBTITLE DEBUG] Falling back to sample text")
+            except Exception:
+                logger.exception("Whisper transcription failed, using sample subtitles")
                 
                 # Fallback to sample text
                 text = self._get_sample_text(language)
-                srt_content, json_data = self._create_subtitles(text, language, style, clip.duration)
+                srt_content, json_data = self._create_subtitles(text, language, style, media.duration)
+                transcribed = False
             
             # Save subtitles file
-            srt_path = f"{os.path.splitext(video.filepath)[0]}_{language}.srt"
-            print(f"[SUBTITLE DEBUG] Saving SRT file to: {srt_path}")
+            srt_path = f"{self._output_base(video, options)}_{language}.srt"
             with open(srt_path, 'w', encoding='utf-8') as f:
                 f.write(srt_content)
             
             # Save JSON format for live display
-            json_path = f"{os.path.splitext(video.filepath)[0]}_{language}.json"
-            print(f"[SUBTITLE DEBUG] Saving JSON file to: {json_path}")
+            json_path = f"{self._output_base(video, options)}_{language}.json"
             with open(json_path, 'w', encoding='utf-8') as f:
                 json.dump(json_data, f, ensure_ascii=False, indent=2)
             
-            print(f"[SUBTITLE DEBUG] Subtitle generation completed successfully")
-            print(f"[SUBTITLE DEBUG] Files saved: SRT={srt_path}, JSON={json_path}")
+            logger.debug(f"Subtitles saved: SRT={srt_path}, JSON={json_path}")
             
             video.outputs["subtitles"] = {
                 "srt": srt_path,
@@ -370,15 +595,34 @@ class VideoService:
                 "language": language,
                 "style": style
             }
-            
-            clip.close()
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
+            return transcribed
                 
         except Exception as e:
-            print(f"Error generating subtitles: {e}")
+            logger.error(f"Error generating subtitles: {e}")
             # Create fallback subtitles
             self._create_fallback_subtitles(video, options)
+            return False
+        finally:
+            if owns_media:
+                media.close()
+
+    def _get_transcript(self, video, media, language):
+        """Whisper segments for the video's audio, transcribed at most once per language"""
+        from transcription import transcribe
+        from services.transcript_store import speech_audio_hash
+
+        whisper_lang = self._get_whisper_language_code(language)
+        # The audio hash is remembered on the video, so a cache hit skips decoding
+        audio_hash = video.metadata.get("speech_audio_sha256")
+        if not audio_hash:
+            audio_hash = speech_audio_hash(media.speech_audio())
+            video.metadata["speech_audio_sha256"] = audio_hash
+
+        # Long audio is split at pauses and transcribed on a process pool
+        return self.transcript_store.get_or_transcribe(
+            audio_hash, self.whisper_model_size, whisper_lang,
+            lambda: transcribe(media.speech_audio(), self.whisper_model_size, whisper_lang)
+        )
 
     def _get_whisper_language_code(self, language):
         """Convert our language codes to Whisper language codes"""
@@ -503,11 +747,11 @@ class VideoService:
         fallback_text = self._get_sample_text(language)
         srt_content, json_data = self._create_subtitles(fallback_text, language, style, 15)
         
-        srt_path = f"{os.path.splitext(video.filepath)[0]}_{language}_fallback.srt"
+        srt_path = f"{self._output_base(video, options)}_{language}_fallback.srt"
         with open(srt_path, 'w', encoding='utf-8') as f:
             f.write(srt_content)
         
-        json_path = f"{os.path.splitext(video.filepath)[0]}_{language}_fallback.json"
+        json_path = f"{self._output_base(video, options)}_{language}_fallback.json"
         with open(json_path, 'w', encoding='utf-8') as f:
             json.dump(json_data, f, ensure_ascii=False, indent=2)
         
@@ -518,37 +762,34 @@ class VideoService:
             "style": style
         }
 
-    def _summarize_video(self, video):
-        if not self.summarizer or not self.speech_recognizer:
-            print("AI models not available for summarization")
-            return
-            
+    @timed_stage('summarize')
+    def _summarize_video(self, video, options, media):
         try:
-            # Extract audio and convert to text
-            clip = VideoFileClip(video.filepath)
-            audio_path = f"{os.path.splitext(video.filepath)[0]}_audio.wav"
-            clip.audio.write_audiofile(audio_path)
+            summarizer = get_hf_pipeline("summarization", self.summarizer_model)
+        except Exception as e:
+            logger.warning(f"AI models not available for summarization: {e}")
+            return False
             
-            # Generate transcription
-            transcription = self.speech_recognizer(audio_path)
-            text = transcription.get('text', '')
+        try:
+            # Same cached Whisper transcript the subtitles use
+            segments = self._get_transcript(video, media, options.get('subtitle_language', 'en'))
+            text = " ".join(segment['text'] for segment in segments).strip()
             
             if text:
                 # Summarize text
-                summary = self.summarizer(text, max_length=130, min_length=30)
+                summary = summarizer(text, max_length=130, min_length=30)
                 
                 # Save summary
-                summary_path = f"{os.path.splitext(video.filepath)[0]}_summary.txt"
+                summary_path = f"{self._output_base(video, options)}_summary.txt"
                 with open(summary_path, 'w', encoding='utf-8') as f:
                     f.write(summary[0]['summary_text'])
                 
                 video.outputs["summary"] = summary_path
-            
-            clip.close()
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
+            # No speech is a result too, but not one worth caching
+            return bool(text)
         except Exception as e:
-            print(f"Error summarizing video: {e}")
+            logger.error(f"Error summarizing video: {e}")
+            return False
 
     def _format_timestamp(self, seconds):
         """Format timestamp for SRT format"""
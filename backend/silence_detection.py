@@ -0,0 +1,97 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _full_scale(samples):
+    if np.issubdtype(samples.dtype, np.integer):
+        return float(np.iinfo(samples.dtype).max + 1)
+    return 1.0
+
+
+def frame_levels_db(samples, sample_rate, frame_ms=20, hop_ms=10):
+    """RMS level in dBFS of each analysis frame.
+
+    ``samples`` is int16/float PCM, either 1-D or ``(frames, channels)``.
+    Like pydub's ``dBFS`` the RMS is taken over all channels, so
+    interleaved audio is never downmixed or copied to float. Per-hop
+    energies are summed once through a strided view of the block array and
+    frames are windows of whole hops over those energies.
+    Returns ``(levels_db, hop_seconds)``.
+    """
+    samples = np.asarray(samples)
+    channels = samples.shape[1] if samples.ndim == 2 else 1
+    interleaved = samples.reshape(-1)
+
+    hop = max(1, int(sample_rate * hop_ms / 1000))
+    hops_per_frame = max(1, int(round(frame_ms / hop_ms)))
+    block = hop * channels
+    n_blocks = len(interleaved) // block
+    if len(interleaved) % block:
+        n_blocks += 1
+        interleaved = np.pad(interleaved, (0, n_blocks * block - len(interleaved)))
+    if n_blocks < hops_per_frame:
+        interleaved = np.pad(interleaved, (0, (hops_per_frame - n_blocks) * block))
+        n_blocks = hops_per_frame
+
+    blocks = interleaved.reshape(n_blocks, block)
+    block_energy = np.einsum('ij,ij->i', blocks, blocks, dtype=np.float64)
+    frame_energy = sliding_window_view(block_energy, hops_per_frame).sum(axis=1)
+    mean_square = frame_energy / (hops_per_frame * block * _full_scale(samples) ** 2)
+    levels = 10.0 * np.log10(np.maximum(mean_square, 1e-12))
+    return levels, hop / sample_rate
+
+
+def detect_silence(samples, sample_rate, threshold_db=-40.0, min_silence_ms=500,
+                   padding_ms=100, hysteresis_db=3.0, frame_ms=20, hop_ms=10):
+    """Find silent stretches of an audio signal.
+
+    A frame enters silence when its level drops to ``threshold_db`` and only
+    leaves it once the level rises above ``threshold_db + hysteresis_db``, so
+    noise hovering around the threshold does not split a pause. Silences
+    shorter than ``min_silence_ms`` are ignored and ``padding_ms`` of each
+    silence is left next to the surrounding sound.
+
+    Returns a list of ``(start_seconds, end_seconds)`` intervals.
+    """
+    levels, hop_seconds = frame_levels_db(samples, sample_rate, frame_ms, hop_ms)
+    if len(levels) == 0:
+        return []
+
+    enter = levels <= threshold_db
+    leave = levels > threshold_db + hysteresis_db
+
+    # Hysteresis: frames between the two thresholds keep the previous state.
+    # Forward-fill the last frame that made a decision.
+    decided = enter | leave
+    last_decision = np.where(decided, np.arange(len(levels)), 0)
+    np.maximum.accumulate(last_decision, out=last_decision)
+    silent = enter[last_decision] & decided[last_decision]
+
+    duration = np.shape(samples)[0] / sample_rate
+    edges = np.diff(np.concatenate(([False], silent, [False])).astype(np.int8))
+    starts = np.flatnonzero(edges == 1) * hop_seconds
+    end_frames = np.flatnonzero(edges == -1)
+    # Silence through the last frame lasts to the end; frames stop a window short of it
+    ends = np.where(end_frames == len(levels), duration, np.minimum(end_frames * hop_seconds, duration))
+
+    long_enough = (ends - starts) >= min_silence_ms / 1000.0
+    starts, ends = starts[long_enough], ends[long_enough]
+
+    padding = padding_ms / 1000.0
+    starts = np.where(starts > 0, starts + padding, starts)
+    ends = np.where(ends < duration, ends - padding, ends)
+    valid = ends > starts
+    return [(float(s), float(e)) for s, e in zip(starts[valid], ends[valid])]
+
+
+def invert_intervals(intervals, duration):
+    """Complement of sorted, non-overlapping intervals within ``[0, duration]``"""
+    kept = []
+    cursor = 0.0
+    for start, end in intervals:
+        if start > cursor:
+            kept.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < duration:
+        kept.append((cursor, duration))
+    return kept
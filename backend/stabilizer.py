@@ -0,0 +1,200 @@
+import os
+import math
+import struct
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ffmpeg_tools import iter_frames
+
+logger = logging.getLogger(__name__)
+
+TRF_MAGIC = b"TRF1"
+TRF_VERSION = 2
+# magic, version, sha256 of the source, analysis width, fps, transform count
+_TRF_HEADER = struct.Struct("<4sI32sIdI")
+
+ANALYSIS_WIDTH = 320
+# Smoothing radius in frames at 30 fps for each stabilization level
+SMOOTHING_RADIUS = {"low": 10, "medium": 30, "high": 60}
+# Zoom applied after warping so moving borders stay outside the frame
+BORDER_ZOOM = {"low": 1.02, "medium": 1.04, "high": 1.08}
+
+
+def file_sha256(filepath, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def trf_cache_path(filepath, content_hash, cache_dir=None):
+    """Where the motion analysis of ``filepath`` (content ``content_hash``) is cached"""
+    cache_dir = cache_dir or os.getenv(
+        'STABILIZATION_CACHE_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(filepath)), 'transforms')
+    )
+    return os.path.join(cache_dir, f"{content_hash}.trf")
+
+
+class Stabilizer:
+    """Two-pass video stabilizer in the spirit of vid.stab.
+
+    Pass one estimates frame-to-frame motion (dx, dy, da) with sparse
+    optical flow on downscaled grey frames, in parallel over frame ranges,
+    and caches it in a TRF file named after the source hash. Pass two
+    smooths the camera trajectory and warps each full-size frame, so
+    re-rendering with another level only repeats pass two.
+    """
+
+    def __init__(self, filepath, info, content_hash=None, cache_dir=None, workers=None):
+        self.filepath = filepath
+        self.info = info
+        self.content_hash = content_hash or file_sha256(filepath)
+        self.cache_dir = cache_dir
+        self.workers = workers or int(os.getenv('STABILIZATION_WORKERS', 0)) or os.cpu_count() or 1
+        self._transforms = None
+
+    @property
+    def trf_path(self):
+        return trf_cache_path(self.filepath, self.content_hash, self.cache_dir)
+
+    def transforms(self):
+        """Per-frame motion ``(n, 3)`` array of dx, dy (full-size pixels) and da (radians)"""
+        if self._transforms is None:
+            self._transforms = self._load_trf()
+            if self._transforms is None:
+                self._transforms = self._analyze()
+                self._save_trf(self._transforms)
+        return self._transforms
+
+    def warp_matrices(self, level="medium"):
+        """Affine matrices ``(n + 1, 2, 3)`` that move each frame onto the smoothed path"""
+        transforms = self.transforms()
+        fps = self.info.get("fps") or 30.0
+        radius = max(1, int(SMOOTHING_RADIUS.get(level, SMOOTHING_RADIUS["medium"]) * fps / 30.0))
+
+        # Camera position of every frame relative to frame 0, and the offset
+        # that moves it onto the smoothed path
+        trajectory = np.vstack([np.zeros((1, 3)), np.cumsum(transforms, axis=0)])
+        corrected = _moving_average(trajectory, radius) - trajectory
+        dx, dy, da = corrected[:, 0], corrected[:, 1], corrected[:, 2]
+        cos, sin = np.cos(da), np.sin(da)
+
+        zoom = BORDER_ZOOM.get(level, BORDER_ZOOM["medium"])
+        cx, cy = self.info["width"] / 2.0, self.info["height"] / 2.0
+        matrices = np.empty((len(corrected), 2, 3), dtype=np.float64)
+        matrices[:, 0, 0] = zoom * cos
+        matrices[:, 0, 1] = -zoom * sin
+        matrices[:, 1, 0] = zoom * sin
+        matrices[:, 1, 1] = zoom * cos
+        # Zoom about the centre after translating by the correction
+        matrices[:, 0, 2] = zoom * dx + (1 - zoom) * cx
+        matrices[:, 1, 2] = zoom * dy + (1 - zoom) * cy
+        return matrices
+
+    def frame_filter(self, level="medium"):
+        """Return ``warp(index, frame)`` for the rendering pass"""
+        import cv2
+
+        matrices = self.warp_matrices(level)
+        size = (self.info["width"], self.info["height"])
+
+        def warp(index, frame):
+            matrix = matrices[min(index, len(matrices) - 1)]
+            return cv2.warpAffine(frame, matrix, size, borderMode=cv2.BORDER_REFLECT)
+
+        return warp
+
+    def _analyze(self):
+        fps = self.info.get("fps") or 30.0
+        total_frames = int(round((self.info.get("duration") or 0) * fps))
+        if total_frames < 2:
+            return np.zeros((0, 3))
+
+        # Each range also reads the first frame of the next one so the pair
+        # spanning the boundary is not lost
+        chunk = math.ceil(total_frames / self.workers)
+        ranges = [(start, min(start + chunk, total_frames - 1))
+                  for start in range(0, total_frames - 1, chunk)]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            parts = list(pool.map(lambda r: self._analyze_range(*r, fps), ranges))
+
+        transforms = np.vstack(parts)
+        # Motion was measured on downscaled frames
+        transforms[:, :2] *= self.info["width"] / float(ANALYSIS_WIDTH)
+        logger.info(f"Analyzed motion of {len(transforms) + 1} frames in {len(ranges)} ranges")
+        return transforms
+
+    def _analyze_range(self, first, last, fps):
+        import cv2
+
+        width, height = self.info["width"], self.info["height"]
+        analysis_height = max(2, int(round(height * ANALYSIS_WIDTH / width / 2)) * 2)
+        frames = iter_frames(
+            self.filepath, ANALYSIS_WIDTH, analysis_height, pix_fmt="gray",
+            video_filter=f"scale={ANALYSIS_WIDTH}:{analysis_height}",
+            input_args=["-ss", f"{first / fps:.6f}"] if first else None,
+            max_frames=last - first + 1
+        )
+
+        transforms = []
+        previous = None
+        for gray in frames:
+            if previous is not None:
+                transforms.append(_estimate_motion(cv2, previous, gray))
+            previous = gray
+        return np.array(transforms, dtype=np.float64).reshape(-1, 3)
+
+    def _load_trf(self):
+        if not os.path.exists(self.trf_path):
+            return None
+        try:
+            with open(self.trf_path, "rb") as f:
+                header = f.read(_TRF_HEADER.size)
+                magic, version, digest, analysis_width, _fps, count = _TRF_HEADER.unpack(header)
+                if (magic != TRF_MAGIC or version != TRF_VERSION
+                        or digest.hex() != self.content_hash or analysis_width != ANALYSIS_WIDTH):
+                    return None
+                data = np.frombuffer(f.read(count * 3 * 8), dtype="<f8")
+            if len(data) != count * 3:
+                return None
+            logger.info(f"Reusing cached motion analysis {self.trf_path}")
+            return data.reshape(count, 3).copy()
+        except (OSError, struct.error):
+            return None
+
+    def _save_trf(self, transforms):
+        os.makedirs(os.path.dirname(self.trf_path), exist_ok=True)
+        tmp_path = f"{self.trf_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_TRF_HEADER.pack(
+                TRF_MAGIC, TRF_VERSION, bytes.fromhex(self.content_hash),
+                ANALYSIS_WIDTH, float(self.info.get("fps") or 0), len(transforms)
+            ))
+            f.write(np.ascontiguousarray(transforms, dtype="<f8").tobytes())
+        os.replace(tmp_path, self.trf_path)
+
+
+def _estimate_motion(cv2, previous, current):
+    points = cv2.goodFeaturesToTrack(previous, maxCorners=200, qualityLevel=0.01, minDistance=20, blockSize=3)
+    if points is None or len(points) < 6:
+        return (0.0, 0.0, 0.0)
+    moved, status, _err = cv2.calcOpticalFlowPyrLK(previous, current, points, None)
+    good = status.reshape(-1) == 1
+    if good.sum() < 6:
+        return (0.0, 0.0, 0.0)
+    matrix, _inliers = cv2.estimateAffinePartial2D(points[good], moved[good])
+    if matrix is None:
+        return (0.0, 0.0, 0.0)
+    return (float(matrix[0, 2]), float(matrix[1, 2]), float(math.atan2(matrix[1, 0], matrix[0, 0])))
+
+
+def _moving_average(curve, radius):
+    size = 2 * radius + 1
+    kernel = np.ones(size) / size
+    padded = np.pad(curve, ((radius, radius), (0, 0)), mode="edge")
+    return np.column_stack([np.convolve(padded[:, i], kernel, mode="valid") for i in range(curve.shape[1])])
@@ -0,0 +1,62 @@
+import sys
+import time
+from contextlib import contextmanager
+
+# Top-level packages that should only be imported once media processing runs
+HEAVY_MODULES = (
+    'tensorflow', 'torch', 'transformers', 'whisper', 'librosa',
+    'cv2', 'moviepy', 'pydub', 'magic'
+)
+
+_process_start = time.perf_counter()
+_phases = []
+# Set by log_report, once startup is over
+_startup_seconds = None
+
+
+@contextmanager
+def phase(name):
+    """Time a block of startup work and record which modules it imported"""
+    modules_before = set(sys.modules)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        new_modules = set(sys.modules) - modules_before
+        _phases.append({
+            "phase": name,
+            "seconds": elapsed,
+            "modules_loaded": len(new_modules),
+            "top_level": sorted({m.split('.')[0] for m in new_modules})
+        })
+
+
+def loaded_heavy_modules():
+    return sorted(m for m in HEAVY_MODULES if m in sys.modules)
+
+
+def report():
+    """Startup time and phases, and the heavy modules loaded so far.
+
+    ``total_seconds`` is the time log_report froze at the end of startup,
+    or the time since the process started when asked before that.
+    """
+    total = _startup_seconds if _startup_seconds is not None else time.perf_counter() - _process_start
+    return {
+        "total_seconds": total,
+        "phases": list(_phases),
+        "heavy_modules_loaded": loaded_heavy_modules()
+    }
+
+
+def log_report(logger):
+    global _startup_seconds
+    _startup_seconds = time.perf_counter() - _process_start
+    data = report()
+    logger.info(f"Startup finished in {data['total_seconds']:.2f}s")
+    for entry in sorted(data["phases"], key=lambda p: p["seconds"], reverse=True):
+        logger.info(f"  {entry['phase']:<28} {entry['seconds'] * 1000:8.1f} ms "
+                    f"({entry['modules_loaded']} modules)")
+    if data["heavy_modules_loaded"]:
+        logger.warning(f"Heavy modules loaded at startup: {', '.join(data['heavy_modules_loaded'])}")
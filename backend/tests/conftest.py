@@ -0,0 +1,35 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+# The backend modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """backend/app.py, imported once against an in-memory MongoDB"""
+    mongomock = pytest.importorskip("mongomock")
+    import pymongo
+
+    patch = pytest.MonkeyPatch()
+    patch.setattr(pymongo, "MongoClient", mongomock.MongoClient)
+    patch.setenv("JWT_SECRET_KEY", "test-secret-" + "x" * 32)
+    patch.setenv("UPLOAD_FOLDER", str(tmp_path_factory.mktemp("uploads")))
+    import app
+    yield app
+    patch.undo()
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def user_token(app_module):
+    """A session token for a fresh user, as ``(user_id, token)``"""
+    user_id = str(app_module.db.users.insert_one({"email": f"{uuid.uuid4().hex}@example.com"}).inserted_id)
+    return user_id, app_module.auth_service.generate_token(user_id)
@@ -0,0 +1,127 @@
+import hashlib
+import time
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from services.auth_service import AuthService, TokenCache  # noqa: E402
+
+USER_ID = "64b7f0c2a1b2c3d4e5f60718"
+SECRET = "test-secret-" + "x" * 32
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setenv("JWT_SECRET_KEY", SECRET)
+    return mongomock.MongoClient().db
+
+
+@pytest.fixture
+def auth(db):
+    return AuthService(db)
+
+
+def count_decodes(service, monkeypatch):
+    calls = []
+    decode = service._decode
+    monkeypatch.setattr(service, "_decode", lambda token: calls.append(token) or decode(token))
+    return calls
+
+
+def test_the_cache_is_a_bounded_lru():
+    cache = TokenCache(max_size=2, ttl=60)
+    exp = time.time() + 3600
+    cache.put("a", "user-a", "jti-a", exp)
+    cache.put("b", "user-b", "jti-b", exp)
+    assert cache.get("a") == ("user-a", "jti-a")
+
+    cache.put("c", "user-c", "jti-c", exp)
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+
+
+def test_entries_end_at_the_token_expiry():
+    cache = TokenCache(max_size=10, ttl=60)
+    cache.put("a", "user-a", "jti-a", time.time() - 1)
+    assert cache.get("a") is None
+
+    disabled = TokenCache(max_size=0, ttl=60)
+    disabled.put("a", "user-a", "jti-a", time.time() + 3600)
+    assert disabled.get("a") is None
+
+
+def test_a_verified_token_is_not_decoded_again(auth, monkeypatch):
+    token = auth.generate_token(USER_ID)
+    decodes = count_decodes(auth, monkeypatch)
+
+    assert [auth.verify_token(token) for _ in range(5)] == [USER_ID] * 5
+    assert decodes == [token]
+
+
+def test_a_media_token_is_not_a_session(auth):
+    session = auth.generate_token(USER_ID)
+    media = auth.generate_media_token(USER_ID, "video", session)
+
+    assert auth.verify_media_token(media, "video") == USER_ID
+    with pytest.raises(ValueError, match="Invalid token"):
+        auth.verify_token(media)
+    with pytest.raises(ValueError, match="Invalid media token"):
+        auth.verify_media_token(media, "another-video")
+
+
+def test_revocation_reaches_other_processes_at_the_next_sync(db, auth):
+    token = auth.generate_token(USER_ID)
+    other = AuthService(db)
+    assert other.verify_token(token) == USER_ID
+    media = auth.generate_media_token(USER_ID, "video", token)
+
+    auth.revoke_token(token)
+    with pytest.raises(ValueError, match="revoked"):
+        auth.verify_token(token)
+
+    # The other process still trusts its mirror until the sync interval passes
+    assert other.verify_token(token) == USER_ID
+    other._revoked_synced_at -= other.revocation_sync
+    with pytest.raises(ValueError, match="revoked"):
+        other.verify_token(token)
+    with pytest.raises(ValueError, match="revoked"):
+        other.verify_media_token(media, "video")
+    assert db.revoked_tokens.find_one()["expires_at"] > datetime.utcnow()
+
+
+def test_tokens_without_a_jti_are_revoked_by_their_hash(db, auth):
+    legacy = jwt.encode({"user_id": USER_ID, "exp": datetime.utcnow() + timedelta(hours=1)},
+                        SECRET, algorithm="HS256")
+    assert auth.verify_token(legacy) == USER_ID
+
+    auth.revoke_token(legacy)
+
+    assert db.revoked_tokens.find_one()["_id"] == hashlib.sha256(legacy.encode()).hexdigest()
+    with pytest.raises(ValueError, match="revoked"):
+        auth.verify_token(legacy)
+
+
+def test_logout_revokes_the_callers_token(client, user_token):
+    _, token = user_token
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+    assert client.post("/api/auth/logout", headers=headers).status_code == 200
+
+    assert client.get("/api/auth/me", headers=headers).status_code == 401
+
+
+def test_the_user_is_loaded_once_per_request(app_module, user_token, monkeypatch):
+    user_id, _ = user_token
+    loads = []
+    get_user_by_id = app_module.auth_service.get_user_by_id
+    monkeypatch.setattr(app_module.auth_service, "get_user_by_id",
+                        lambda user_id: loads.append(user_id) or get_user_by_id(user_id))
+
+    with app_module.app.test_request_context():
+        app_module.g.user_id = user_id
+        assert app_module.current_user() is app_module.current_user()
+    assert loads == [user_id]
@@ -0,0 +1,141 @@
+import os
+import threading
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from models.video import Video  # noqa: E402
+from services import video_service  # noqa: E402
+from services.blob_store import options_fingerprint  # noqa: E402
+from services.video_service import VideoService  # noqa: E402
+
+SHA256 = "ab" * 32
+USER_ID = "64b7f0c2a1b2c3d4e5f60718"
+OPTIONS = {"cut_silence": True}
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setenv("UPLOAD_FOLDER", str(tmp_path))
+    monkeypatch.setattr(video_service, "ARTIFACT_WAIT_SECONDS", 0.01)
+    return VideoService(mongomock.MongoClient().db)
+
+
+@pytest.fixture
+def store(service):
+    return service.blob_store
+
+
+def upload(tmp_path, name, data=b"same bytes"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def add_video(service, blob, status="uploaded"):
+    video = Video(user_id=USER_ID, filename="clip.mp4", filepath=blob["path"], size=blob["size"])
+    video.metadata["sha256"] = SHA256
+    video.status = status
+    return service.videos.insert_one(video.to_dict()).inserted_id
+
+
+def test_identical_uploads_share_one_blob(store, tmp_path):
+    first = store.add_reference(SHA256, upload(tmp_path, "a.mp4"), "mp4")
+    second = store.add_reference(SHA256, upload(tmp_path, "b.mp4"), "mp4")
+
+    assert second["path"] == first["path"] == store.blob_path(SHA256, ".mp4")
+    assert second["ref_count"] == 2
+    assert os.path.exists(first["path"])
+    # The second upload was dropped in favour of the stored copy
+    assert not os.path.exists(tmp_path / "b.mp4")
+
+
+def test_files_go_with_the_last_reference(store, tmp_path):
+    blob = store.add_reference(SHA256, upload(tmp_path, "a.mp4"), "mp4")
+    store.add_reference(SHA256, upload(tmp_path, "b.mp4"), "mp4")
+    derived = f"{os.path.splitext(blob['path'])[0]}_0123456789abcdef_processed.mp4"
+    open(derived, "wb").close()
+
+    assert store.release(SHA256) is False
+    assert os.path.exists(blob["path"]) and os.path.exists(derived)
+
+    assert store.release(SHA256) is True
+    assert not os.path.exists(blob["path"]) and not os.path.exists(derived)
+    assert store.get(SHA256) is None
+    # A release past zero is a no-op
+    assert store.release(SHA256) is False
+
+
+def test_artifacts_are_reused_only_while_their_files_exist(store, tmp_path):
+    store.add_reference(SHA256, upload(tmp_path, "a.mp4"), "mp4")
+    thumbnail = upload(tmp_path, "thumb.jpg", b"jpeg")
+    store.put_artifact(SHA256, "f1", {"thumbnail": thumbnail}, {"duration": 2.0})
+
+    assert store.get_artifact(SHA256, "f1")["outputs"] == {"thumbnail": thumbnail}
+    assert store.get_artifact(SHA256, "f2") is None
+    os.remove(thumbnail)
+    assert store.get_artifact(SHA256, "f1") is None
+
+
+def test_one_video_at_a_time_builds_an_artifact(store, tmp_path):
+    store.add_reference(SHA256, upload(tmp_path, "a.mp4"), "mp4")
+
+    assert store.claim_artifact(SHA256, "f1", "video-a")
+    assert not store.claim_artifact(SHA256, "f1", "video-b")
+    # Other options are a separate slot, and a holder may claim again
+    assert store.claim_artifact(SHA256, "f2", "video-b")
+    assert store.claim_artifact(SHA256, "f1", "video-a")
+    assert store.artifact_builder(SHA256, "f1") == "video-a"
+
+    # Only the holder's release counts
+    store.release_artifact(SHA256, "f1", "video-b")
+    assert store.artifact_builder(SHA256, "f1") == "video-a"
+    store.release_artifact(SHA256, "f1", "video-a")
+    assert store.claim_artifact(SHA256, "f1", "video-b")
+
+
+def test_processing_waits_for_the_video_building_the_same_outputs(service, store, tmp_path):
+    blob = store.add_reference(SHA256, upload(tmp_path, "a.mp4"), "mp4")
+    store.add_reference(SHA256, upload(tmp_path, "b.mp4"), "mp4")
+    builder = add_video(service, blob, status="processing")
+    waiter = add_video(service, blob)
+    fingerprint = options_fingerprint(OPTIONS)
+    assert store.claim_artifact(SHA256, fingerprint, builder)
+
+    stages = []
+    service._cut_silence = lambda video, options, media: stages.append(video._id) or True
+    thumbnail = upload(tmp_path, "thumb.jpg", b"jpeg")
+
+    def finish_building():
+        store.put_artifact(SHA256, fingerprint, {"thumbnail": thumbnail}, {"duration": 2.0})
+        store.release_artifact(SHA256, fingerprint, builder)
+
+    timer = threading.Timer(0.1, finish_building)
+    timer.start()
+    service.process_video(str(waiter), OPTIONS)
+    timer.join()
+
+    stored = service.videos.find_one({"_id": waiter})
+    assert stages == []
+    assert stored["status"] == "completed"
+    assert stored["outputs"]["thumbnail"] == thumbnail
+
+
+def test_processing_takes_over_from_a_builder_that_stopped(service, store, tmp_path):
+    blob = store.add_reference(SHA256, upload(tmp_path, "a.mp4"), "mp4")
+    store.add_reference(SHA256, upload(tmp_path, "b.mp4"), "mp4")
+    builder = add_video(service, blob, status="failed")
+    waiter = add_video(service, blob)
+    fingerprint = options_fingerprint(OPTIONS)
+    assert store.claim_artifact(SHA256, fingerprint, builder)
+
+    stages = []
+    service._cut_silence = lambda video, options, media: stages.append(video._id) or True
+    service.process_video(str(waiter), OPTIONS)
+
+    assert stages == [waiter]
+    assert service.videos.find_one({"_id": waiter})["status"] == "completed"
+    assert store.get_artifact(SHA256, fingerprint) is not None
+    # The claim is given up once the outputs are recorded
+    assert store.artifact_builder(SHA256, fingerprint) is None
@@ -0,0 +1,67 @@
+import pytest
+
+import cut_plan
+from cut_plan import build_cut_plan
+
+# A keyframe every two seconds
+KEYFRAMES = [0.0, 2.0, 4.0, 6.0, 8.0, 10.0]
+
+
+def modes(plan):
+    return [(piece["start"], piece["end"], piece["mode"]) for piece in plan]
+
+
+def test_cut_on_keyframes_is_copied_whole():
+    assert modes(build_cut_plan([(2.0, 6.0)], KEYFRAMES)) == [(2.0, 6.0, "copy")]
+
+
+def test_partial_gops_at_both_ends_are_encoded():
+    assert modes(build_cut_plan([(1.0, 7.5)], KEYFRAMES)) == [
+        (1.0, 2.0, "encode"),
+        (2.0, 6.0, "copy"),
+        (6.0, 7.5, "encode"),
+    ]
+
+
+def test_interval_without_a_keyframe_span_is_encoded():
+    # One keyframe inside: nothing between two keyframes to copy
+    assert modes(build_cut_plan([(3.0, 5.0)], KEYFRAMES)) == [(3.0, 5.0, "encode")]
+    # No keyframe inside at all
+    assert modes(build_cut_plan([(4.2, 5.8)], KEYFRAMES)) == [(4.2, 5.8, "encode")]
+
+
+def test_copy_shorter_than_min_copy_is_encoded():
+    keyframes = [0.0, 1.0, 1.3, 5.0]
+    assert modes(build_cut_plan([(0.9, 2.0)], keyframes, min_copy=0.5)) == [(0.9, 2.0, "encode")]
+    assert modes(build_cut_plan([(0.9, 2.0)], keyframes, min_copy=0.2)) == [
+        (0.9, 1.0, "encode"),
+        (1.0, 1.3, "copy"),
+        (1.3, 2.0, "encode"),
+    ]
+
+
+def test_several_intervals_keep_their_order_and_skip_empty_ones():
+    plan = build_cut_plan([(0.0, 4.0), (5.0, 5.0), (8.0, 9.0)], KEYFRAMES)
+    assert modes(plan) == [(0.0, 4.0, "copy"), (8.0, 9.0, "encode")]
+
+
+def test_pieces_cover_exactly_the_kept_intervals():
+    keep = [(0.3, 3.1), (4.0, 9.9)]
+    plan = build_cut_plan(keep, KEYFRAMES)
+    assert sum(piece["end"] - piece["start"] for piece in plan) == pytest.approx(
+        sum(end - start for start, end in keep))
+    for before, after in zip(plan, plan[1:]):
+        assert before["end"] <= after["start"]
+
+
+def test_without_keyframes_everything_is_encoded():
+    assert modes(build_cut_plan([(1.0, 3.0)], [])) == [(1.0, 3.0, "encode")]
+
+
+def test_source_without_streams_is_refused_before_running_ffmpeg(monkeypatch):
+    calls = []
+    monkeypatch.setattr(cut_plan, "run_ffmpeg", calls.append)
+
+    with pytest.raises(ValueError, match="no video or audio stream"):
+        cut_plan.cut_intervals("in.mp4", "out.mp4", [(0.0, 1.0)], {"video_codec": None, "audio_codec": None})
+    assert calls == []
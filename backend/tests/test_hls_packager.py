@@ -0,0 +1,107 @@
+import os
+import subprocess
+
+import pytest
+
+import hls_packager
+import media_probe
+from ffmpeg_tools import ffmpeg_binary
+from hls_packager import package_hls, select_renditions
+
+INFO = {"width": 320, "height": 240, "video_codec": "h264", "audio_codec": "aac"}
+
+
+@pytest.fixture(scope="session")
+def clip(tmp_path_factory):
+    """Three seconds of 320x240 test pattern with a tone"""
+    try:
+        binary = ffmpeg_binary()
+    except Exception as e:
+        pytest.skip(f"ffmpeg not available: {e}")
+    path = tmp_path_factory.mktemp("hls_source") / "clip.mp4"
+    subprocess.run([
+        binary, "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", "testsrc=size=320x240:rate=25:duration=3",
+        "-f", "lavfi", "-i", "sine=sample_rate=22050:duration=3",
+        "-shortest", str(path)
+    ], check=True)
+    return str(path)
+
+
+def test_the_ladder_stops_at_the_source_height():
+    assert [r[0] for r in select_renditions(1080)] == ["1080p", "720p", "480p", "360p"]
+    assert [r[0] for r in select_renditions(720)] == ["720p", "480p", "360p"]
+    # Smaller than every rendition: one at the source's own (even) height
+    assert [r[:2] for r in select_renditions(241)] == [("240p", 240)]
+    assert [r[0] for r in select_renditions(None)] == ["360p"]
+
+
+def test_a_clip_is_packaged_with_a_master_playlist(clip, tmp_path):
+    output_dir = str(tmp_path / "hls")
+    master = package_hls(clip, output_dir, INFO, segment_seconds=1)
+
+    assert master == os.path.join(output_dir, "master.m3u8")
+    with open(master) as f:
+        playlist = f.read()
+    assert 'CODECS="avc1.4d401e,mp4a.40.2",RESOLUTION=320x240' in playlist
+    assert "240p/index.m3u8" in playlist
+
+    segments = sorted(name for name in os.listdir(os.path.join(output_dir, "240p")) if name.endswith(".ts"))
+    assert len(segments) == 3
+    for name in segments:
+        with open(os.path.join(output_dir, "240p", name), "rb") as f:
+            assert f.read(1) == b"\x47"  # MPEG-TS sync byte
+    assert not os.path.exists(f"{output_dir}.tmp")
+
+
+def test_a_failed_encode_keeps_the_previous_package(tmp_path, monkeypatch):
+    output_dir = tmp_path / "hls"
+    output_dir.mkdir()
+    (output_dir / "master.m3u8").write_text("#EXTM3U\n")
+
+    def fail(args):
+        raise RuntimeError("encoder crashed")
+    monkeypatch.setattr(hls_packager, "run_ffmpeg", fail)
+
+    with pytest.raises(RuntimeError):
+        package_hls("clip.mp4", str(output_dir), INFO)
+    assert (output_dir / "master.m3u8").read_text() == "#EXTM3U\n"
+    assert not os.path.exists(f"{output_dir}.tmp")
+
+
+def test_sound_can_come_from_another_file(tmp_path, monkeypatch):
+    runs = []
+    monkeypatch.setattr(hls_packager, "run_ffmpeg", runs.append)
+
+    package_hls("picture.mp4", str(tmp_path / "hls"), dict(INFO, audio_codec=None), audio_source="sound.m4a")
+
+    args = runs[0]
+    assert args[:4] == ["-i", "picture.mp4", "-i", "sound.m4a"]
+    assert args[args.index("-map", args.index("-map") + 1) + 1] == "1:a:0"
+    with open(tmp_path / "hls" / "master.m3u8") as f:
+        assert "mp4a.40.2" in f.read()
+
+
+def test_an_audio_only_result_is_packaged_over_the_original_picture(tmp_path, monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    from models.video import Video
+    from services.video_service import VideoService
+
+    calls = []
+    monkeypatch.setenv("UPLOAD_FOLDER", str(tmp_path))
+    monkeypatch.setattr(hls_packager, "package_hls",
+                        lambda source, output_dir, info, audio_source=None: calls.append((source, audio_source, info))
+                        or os.path.join(output_dir, "master.m3u8"))
+    monkeypatch.setattr(media_probe, "probe_media", lambda path, sha256=None: {"video_codec": None,
+                                                                                "audio_codec": "aac"})
+
+    class Media:
+        info = INFO
+
+    video = Video(user_id="64b7f0c2a1b2c3d4e5f60718", filename="clip.mp4",
+                  filepath=str(tmp_path / "clip.mp4"), size=1)
+    video.outputs["processed_video"] = str(tmp_path / "clip_enhanced.m4a")
+    VideoService(mongomock.MongoClient().db)._package_hls(video, {"hls": True}, Media())
+
+    assert calls == [(video.filepath, str(tmp_path / "clip_enhanced.m4a"), INFO)]
+    assert video.outputs["hls"].endswith("_hls/master.m3u8")
@@ -0,0 +1,136 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from bson import ObjectId  # noqa: E402
+
+from db_indexes import ensure_indexes  # noqa: E402
+from services import job_service  # noqa: E402
+from services.job_service import JobService  # noqa: E402
+
+USER_ID = "64b7f0c2a1b2c3d4e5f60718"
+
+
+class PendingExecutor:
+    """Takes jobs and never runs them, so their state can be inspected"""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(args)
+        return Future()
+
+    def shutdown(self, wait=False, cancel_futures=False):
+        pass
+
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient().db
+    ensure_indexes(db)
+    return db
+
+
+@pytest.fixture
+def video_id(db):
+    return str(db.videos.insert_one({"user_id": USER_ID, "status": "uploaded", "version": 1}).inserted_id)
+
+
+@pytest.fixture
+def service(db, monkeypatch):
+    service = JobService(db)
+    executor = PendingExecutor()
+    monkeypatch.setattr(service, "_get_executor", lambda: executor)
+    service.executor = executor
+    yield service
+    service.shutdown()
+
+
+def make_stale(db, job_id):
+    db.jobs.update_one({"_id": ObjectId(job_id)},
+                       {"$set": {"heartbeat_at": datetime.utcnow() - timedelta(hours=1)}})
+
+
+def test_a_video_has_one_active_job(service, db, video_id):
+    first = service.enqueue_processing(video_id, USER_ID, {"cut_silence": True})
+    second = service.enqueue_processing(video_id, USER_ID, {"summarize": True})
+
+    assert second == first
+    assert db.jobs.count_documents({"video_id": video_id}) == 1
+    assert len(service.executor.submitted) == 1
+    assert db.videos.find_one({"_id": ObjectId(video_id)})["status"] == "queued"
+
+
+def test_a_finished_job_makes_way_for_the_next(service, db, video_id):
+    first = service.enqueue_processing(video_id, USER_ID, {})
+    db.jobs.update_one({"_id": ObjectId(first)}, {"$set": {"status": "done"}, "$unset": {"active": ""}})
+
+    second = service.enqueue_processing(video_id, USER_ID, {})
+    assert second != first
+    assert db.jobs.count_documents({"video_id": video_id, "active": True}) == 1
+
+
+def test_an_orphaned_job_is_failed_and_replaced(service, db, video_id):
+    orphan = service.enqueue_processing(video_id, USER_ID, {})
+    make_stale(db, orphan)
+
+    replacement = service.enqueue_processing(video_id, USER_ID, {})
+    assert replacement != orphan
+    stored = db.jobs.find_one({"_id": ObjectId(orphan)})
+    assert stored["status"] == "failed"
+    assert "active" not in stored
+
+
+def test_orphans_are_recovered_at_startup(db, video_id):
+    db.videos.update_one({"_id": ObjectId(video_id)}, {"$set": {"status": "processing"}})
+    stale = datetime.utcnow() - timedelta(hours=1)
+    orphan = db.jobs.insert_one({"video_id": video_id, "status": "running", "active": True,
+                                 "heartbeat_at": stale}).inserted_id
+    # From before heartbeats were recorded
+    legacy = db.jobs.insert_one({"video_id": "other", "status": "queued", "updated_at": stale}).inserted_id
+    live = db.jobs.insert_one({"video_id": "live", "status": "running", "active": True,
+                               "heartbeat_at": datetime.utcnow()}).inserted_id
+
+    JobService(db).shutdown()
+
+    assert db.jobs.find_one({"_id": orphan})["status"] == "failed"
+    assert db.jobs.find_one({"_id": legacy})["status"] == "failed"
+    assert db.jobs.find_one({"_id": live})["status"] == "running"
+    video = db.videos.find_one({"_id": ObjectId(video_id)})
+    assert video["status"] == "failed" and video["error"]
+
+
+def test_a_crashed_worker_fails_its_job(service, db, video_id):
+    job_id = service.enqueue_processing(video_id, USER_ID, {})
+    future = Future()
+    future.set_exception(BrokenProcessPool("worker died"))
+
+    service._on_job_finished(job_id, video_id, future)
+
+    job = db.jobs.find_one({"_id": ObjectId(job_id)})
+    assert job["status"] == "failed" and job["error"] == "worker died"
+    assert "active" not in job
+    assert db.videos.find_one({"_id": ObjectId(video_id)})["status"] == "failed"
+
+
+def test_worker_records_a_failed_run(db, video_id, monkeypatch):
+    class FailingVideoService:
+        def process_video(self, video_id, options, on_stage=None, on_progress=None):
+            on_stage("cut_silence")
+            raise RuntimeError("decoder crashed")
+
+    monkeypatch.setattr(job_service, "_worker_db", db)
+    monkeypatch.setattr(job_service, "_worker_video_service", FailingVideoService())
+    job_id = str(db.jobs.insert_one({"video_id": video_id, "status": "queued", "active": True}).inserted_id)
+
+    result = job_service._run_job(job_id, video_id, {})
+
+    assert result["status"] == "failed"
+    job = db.jobs.find_one({"_id": ObjectId(job_id)})
+    assert (job["status"], job["stage"], job["error"]) == ("failed", "cut_silence", "decoder crashed")
+    assert "active" not in job
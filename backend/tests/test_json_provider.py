@@ -0,0 +1,77 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+from flask import Flask, jsonify
+
+import json_provider
+from json_provider import MongoJSONProvider, encode_default
+from models.support_ticket import SupportTicket
+from models.user import User
+from models.video import Video
+
+OID = ObjectId("64b7f0c2a1b2c3d4e5f60718")
+WHEN = datetime(2024, 5, 1, 12, 30, 15, 250000)
+DOCUMENT = {"_id": OID, "upload_date": WHEN, "day": date(2024, 5, 1),
+            "nested": [{"owner": OID, "at": WHEN.replace(tzinfo=timezone.utc)}]}
+EXPECTED = {"_id": str(OID), "upload_date": "2024-05-01T12:30:15.250000Z", "day": "2024-05-01",
+            "nested": [{"owner": str(OID), "at": "2024-05-01T12:30:15.250000Z"}]}
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def app(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(json_provider, "orjson", None)
+    app = Flask(__name__)
+    app.json = MongoJSONProvider(app)
+    return app
+
+
+def test_encode_default_handles_mongo_types():
+    assert encode_default(OID) == str(OID)
+    assert encode_default(WHEN) == "2024-05-01T12:30:15.250000Z"
+    assert encode_default(WHEN.replace(tzinfo=timezone.utc)) == "2024-05-01T12:30:15.250000Z"
+    # Other offsets are kept rather than converted
+    assert encode_default(WHEN.replace(tzinfo=timezone(timedelta(hours=5)))) == "2024-05-01T12:30:15.250000+05:00"
+    with pytest.raises(TypeError):
+        encode_default(object())
+
+
+def test_documents_are_returned_as_read(app):
+    with app.app_context():
+        response = jsonify(DOCUMENT)
+        assert response.mimetype == "application/json"
+        assert json.loads(response.get_data()) == EXPECTED
+        assert json.loads(app.json.dumps(DOCUMENT)) == EXPECTED
+
+
+def test_integers_orjson_refuses_still_encode(app):
+    with app.app_context():
+        assert json.loads(jsonify({"size": 2 ** 70}).get_data()) == {"size": 2 ** 70}
+
+
+def test_the_video_listing_needs_no_fixups(client, user_token, app_module):
+    user_id, token = user_token
+    video = Video(user_id=user_id, filename="clip.mp4", filepath="/media/clip.mp4", size=1)
+    video_id = app_module.db.videos.insert_one(video.to_dict()).inserted_id
+
+    response = client.get("/api/videos", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    listed = response.get_json()[0]
+    assert listed["_id"] == str(video_id)
+    assert datetime.fromisoformat(listed["upload_date"].replace("Z", "+00:00")).tzinfo == timezone.utc
+
+
+@pytest.mark.parametrize("model", [
+    Video(user_id=str(OID), filename="clip.mp4", filepath="/media/clip.mp4", size=1),
+    User(email="user@example.com", password_hash="hash"),
+    SupportTicket(user_id=str(OID), subject="Help"),
+])
+def test_models_are_slotted(model):
+    assert not hasattr(model, "__dict__")
+    with pytest.raises(AttributeError):
+        model.misspelt_field = 1
@@ -0,0 +1,95 @@
+import subprocess
+
+import pytest
+
+import media_probe
+from ffmpeg_tools import ffmpeg_binary
+
+# container -> (extension, expected video codec, expected audio codec)
+CONTAINERS = {
+    "mp4": ("mp4", "h264", "aac"),
+    "mkv": ("mkv", "h264", "vorbis"),
+    "webm": ("webm", "vp9", "opus"),
+}
+
+
+@pytest.fixture(scope="session")
+def media_dir(tmp_path_factory):
+    """One second of 64x48 test pattern with a mono tone, per container"""
+    try:
+        binary = ffmpeg_binary()
+    except Exception as e:
+        pytest.skip(f"ffmpeg not available: {e}")
+    directory = tmp_path_factory.mktemp("media")
+    for extension, _, _ in CONTAINERS.values():
+        subprocess.run([
+            binary, "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", "testsrc=size=64x48:rate=25:duration=1",
+            "-f", "lavfi", "-i", "sine=sample_rate=22050:duration=1",
+            "-shortest", str(directory / f"clip.{extension}")
+        ], check=True)
+    return directory
+
+
+@pytest.fixture(autouse=True)
+def no_ffmpeg_probe(monkeypatch):
+    """Fail any test that falls back to running ffmpeg, unless it swaps this out"""
+    def probe(filepath):
+        raise AssertionError(f"fell back to ffmpeg for {filepath}")
+    monkeypatch.setattr(media_probe, "probe", probe)
+    media_probe._cache.clear()
+
+
+@pytest.mark.parametrize("container", sorted(CONTAINERS))
+def test_headers_are_parsed_without_ffmpeg(media_dir, container):
+    extension, video_codec, audio_codec = CONTAINERS[container]
+    info = media_probe.probe_media(str(media_dir / f"clip.{extension}"))
+
+    assert info["video_codec"] == video_codec
+    assert (info["width"], info["height"]) == (64, 48)
+    assert info["fps"] == pytest.approx(25.0)
+    assert info["duration"] == pytest.approx(1.0, abs=0.05)
+    assert info["audio_codec"] == audio_codec
+    assert info["channels"] == 1
+    assert info["sample_rate"]
+
+
+def test_results_are_cached_by_content_hash(media_dir):
+    path = str(media_dir / "clip.mp4")
+    first = media_probe.probe_media(path, sha256="a" * 64)
+    first["width"] = 1
+    # A copy is returned, and the hash alone finds the cached entry
+    assert media_probe.probe_media("/nonexistent.mp4", sha256="a" * 64)["width"] == 64
+
+
+def test_unknown_containers_fall_back_to_ffmpeg(tmp_path, monkeypatch):
+    path = tmp_path / "clip.avi"
+    path.write_bytes(b"RIFF\x00\x00\x00\x00AVI LIST" + bytes(64))
+    calls = []
+    monkeypatch.setattr(media_probe, "probe", lambda filepath: calls.append(filepath) or {"duration": 2.0})
+
+    assert media_probe.probe_media(str(path)) == {"duration": 2.0}
+    assert calls == [str(path)]
+
+
+def test_truncated_mp4_falls_back_to_ffmpeg(media_dir, tmp_path, monkeypatch):
+    data = (media_dir / "clip.mp4").read_bytes()
+    path = tmp_path / "truncated.mp4"
+    path.write_bytes(data[:64])
+    calls = []
+    monkeypatch.setattr(media_probe, "probe", lambda filepath: calls.append(filepath) or {"duration": 1.0})
+
+    media_probe.probe_media(str(path))
+    assert calls == [str(path)]
+
+
+@pytest.mark.parametrize("size", [6, 30, 60])
+def test_truncated_matroska_falls_back_to_ffmpeg(media_dir, tmp_path, monkeypatch, size):
+    data = (media_dir / "clip.mkv").read_bytes()
+    path = tmp_path / "truncated.mkv"
+    path.write_bytes(data[:size])
+    calls = []
+    monkeypatch.setattr(media_probe, "probe", lambda filepath: calls.append(filepath) or {"duration": 1.0})
+
+    assert media_probe.probe_media(str(path)) == {"duration": 1.0}
+    assert calls == [str(path)]
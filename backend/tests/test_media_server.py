@@ -0,0 +1,126 @@
+import hashlib
+import os
+
+import pytest
+
+import media_server
+from media_server import content_etag, hls_etag, output_etags, stored_etag
+
+BODY = bytes(range(256)) * 64
+
+
+@pytest.fixture
+def media(tmp_path):
+    path = tmp_path / "processed.mp4"
+    path.write_bytes(BODY)
+    return str(path)
+
+
+@pytest.fixture
+def video_id(app_module, user_token, media):
+    from models.video import Video
+
+    user_id, _ = user_token
+    video = Video(user_id=user_id, filename="clip.mp4", filepath=media, size=len(BODY))
+    video.outputs["processed_video"] = media
+    video.outputs["etags"] = output_etags(video.outputs)
+    return str(app_module.db.videos.insert_one(video.to_dict()).inserted_id)
+
+
+def media_token(client, video_id, session_token):
+    response = client.post(f"/api/videos/{video_id}/media-token",
+                           headers={"Authorization": f"Bearer {session_token}"})
+    assert response.status_code == 200
+    return response.get_json()["token"]
+
+
+def test_output_etags_are_stored_per_file(tmp_path, media):
+    vtt = tmp_path / "storyboard.vtt"
+    vtt.write_text("WEBVTT\n")
+    outputs = {"processed_video": media, "storyboard": {"vtt": str(vtt), "columns": 5},
+               "summary": "not a file", "etags": {"stale": "tag"}}
+
+    etags = output_etags(outputs)
+    assert etags == {
+        "processed_video": hashlib.sha256(BODY).hexdigest(),
+        "storyboard_vtt": hashlib.sha256(b"WEBVTT\n").hexdigest(),
+    }
+    assert stored_etag(dict(outputs, etags=etags), "storyboard", "vtt") == etags["storyboard_vtt"]
+    assert stored_etag(outputs, "thumbnail") is None
+
+
+def test_hls_packages_get_an_etag_index(tmp_path):
+    package = tmp_path / "hls"
+    (package / "720p").mkdir(parents=True)
+    (package / "master.m3u8").write_text("#EXTM3U\n")
+    (package / "720p" / "segment_00000.ts").write_bytes(b"segment")
+
+    output_etags({"hls": str(package / "master.m3u8")})
+
+    assert hls_etag(str(package), "720p/segment_00000.ts") == hashlib.sha256(b"segment").hexdigest()
+    assert hls_etag(str(package), "720p/missing.ts") is None
+    assert hls_etag(str(tmp_path), "master.m3u8") is None
+
+
+def test_content_etag_changes_with_the_file(media):
+    first = content_etag(media)
+    assert first == hashlib.sha256(BODY).hexdigest()
+    with open(media, "ab") as f:
+        f.write(b"more")
+    assert content_etag(media) != first
+
+
+def test_ranges_are_answered_with_206(client, user_token, video_id):
+    _, token = user_token
+    response = client.get(f"/api/videos/{video_id}/download",
+                          headers={"Authorization": f"Bearer {token}", "Range": "bytes=100-199"})
+
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes 100-199/{len(BODY)}"
+    assert response.data == BODY[100:200]
+    assert response.headers["Accept-Ranges"] == "bytes"
+
+
+def test_the_stored_etag_answers_conditional_requests(client, user_token, video_id):
+    _, token = user_token
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.get(f"/api/videos/{video_id}/download", headers=headers)
+    etag = response.headers["ETag"].strip('"')
+    assert etag == hashlib.sha256(BODY).hexdigest()
+    assert "no-cache" in response.headers["Cache-Control"]
+
+    cached = client.get(f"/api/videos/{video_id}/download", headers=dict(headers, **{"If-None-Match": f'"{etag}"'}))
+    assert cached.status_code == 304
+    assert cached.data == b""
+
+
+def test_media_urls_take_a_media_token_only(client, user_token, video_id, app_module):
+    _, session_token = user_token
+    token = media_token(client, video_id, session_token)
+
+    assert client.get(f"/api/videos/{video_id}/download?inline=1&token={token}").status_code == 200
+    # The session token never goes in a URL, and a media token is no session
+    assert client.get(f"/api/videos/{video_id}/download?token={session_token}").status_code == 401
+    assert client.get("/api/videos", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+    other = str(app_module.db.videos.insert_one({"user_id": user_token[0], "filepath": "/x"}).inserted_id)
+    assert client.get(f"/api/videos/{other}/download?token={token}").status_code == 401
+
+
+def test_accel_redirect_leaves_the_body_to_nginx(client, user_token, video_id, media, monkeypatch):
+    _, token = user_token
+    monkeypatch.setenv("MEDIA_ACCEL_REDIRECT", "/protected/")
+    monkeypatch.setenv("MEDIA_ROOT", os.path.dirname(media))
+
+    response = client.get(f"/api/videos/{video_id}/download", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert response.headers["X-Accel-Redirect"] == "/protected/processed.mp4"
+    assert response.data == b""
+    assert response.headers["ETag"].strip('"') == hashlib.sha256(BODY).hexdigest()
+
+
+def test_accel_redirect_refuses_paths_outside_media_root(media, tmp_path, monkeypatch):
+    monkeypatch.setenv("MEDIA_ROOT", str(tmp_path / "elsewhere"))
+    with pytest.raises(ValueError, match="outside MEDIA_ROOT"):
+        media_server._accel_redirect(media, "/protected", None, False, "video/mp4", "tag")
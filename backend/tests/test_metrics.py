@@ -0,0 +1,95 @@
+import pytest
+
+from metrics import STAGE_SECONDS, Registry, timed_stage
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+def test_counters_render_one_sample_per_label_set(registry):
+    jobs = registry.counter("jobs_total", "Jobs finished.", ("status",))
+    jobs.inc(status="done")
+    jobs.inc(2, status="done")
+    jobs.inc(status='fa"iled\n')
+
+    assert registry.render() == (
+        "# HELP jobs_total Jobs finished.\n"
+        "# TYPE jobs_total counter\n"
+        'jobs_total{status="done"} 3\n'
+        'jobs_total{status="fa\\"iled\\n"} 1\n'
+    )
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    seconds = registry.histogram("stage_seconds", "Stage time.", ("stage",), buckets=(1, 0.5))
+    for value in (0.2, 0.5, 0.7, 3.0):
+        seconds.observe(value, stage="cut")
+
+    assert registry.render().splitlines()[2:] == [
+        'stage_seconds_bucket{stage="cut",le="0.5"} 2',
+        'stage_seconds_bucket{stage="cut",le="1"} 3',
+        'stage_seconds_bucket{stage="cut",le="+Inf"} 4',
+        'stage_seconds_sum{stage="cut"} 4.4',
+        'stage_seconds_count{stage="cut"} 4',
+    ]
+
+
+def test_the_timer_labels_errors_and_stages_returning_false(registry):
+    seconds = registry.histogram("stage_seconds", "Stage time.", ("stage", "status"))
+
+    @seconds.time(stage="thumbnail")
+    def stage(result):
+        return result
+
+    stage(True)
+    stage(False)
+    with pytest.raises(RuntimeError):
+        with seconds.time(stage="cut"):
+            raise RuntimeError("decoder crashed")
+
+    rendered = registry.render()
+    assert 'stage_seconds_count{stage="thumbnail",status="ok"} 1' in rendered
+    assert 'stage_seconds_count{stage="thumbnail",status="error"} 1' in rendered
+    assert 'stage_seconds_count{stage="cut",status="error"} 1' in rendered
+
+
+def test_a_job_process_journal_is_replayed_by_the_web_process(registry):
+    worker, web = Registry(), registry
+    for target in (worker, web):
+        target.counter("jobs_total", "Jobs finished.", ("status",))
+        target.histogram("stage_seconds", "Stage time.", ("stage",))
+
+    worker.start_journal()
+    worker._metrics["jobs_total"].inc(status="done")
+    worker._metrics["stage_seconds"].observe(0.2, stage="cut")
+    web.replay(worker.take_journal())
+
+    assert web.render() == worker.render()
+    assert worker.take_journal() == []
+
+
+def test_processing_stages_are_timed_into_the_shared_histogram():
+    @timed_stage("test_stage")
+    def failing_stage():
+        return False
+
+    failing_stage()
+
+    assert 'snipx_processing_stage_duration_seconds_count{stage="test_stage",status="error"} 1' \
+        in STAGE_SECONDS.registry.render()
+
+
+def test_the_scrape_endpoint(client, monkeypatch):
+    client.get("/api/health/startup")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert 'snipx_http_request_duration_seconds_count{method="GET",route="/api/health/startup",' \
+        in response.get_data(as_text=True)
+
+    monkeypatch.setenv("METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
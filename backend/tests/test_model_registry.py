@@ -0,0 +1,92 @@
+import threading
+import time
+
+from model_registry import ModelRegistry
+
+MB = 1024 * 1024
+
+
+def loader(value, calls=None):
+    def load():
+        if calls is not None:
+            calls.append(value)
+        return value
+    return load
+
+
+def test_models_load_once_and_are_then_hits():
+    registry = ModelRegistry(100 * MB)
+    calls = []
+
+    assert registry.get("whisper", "base", "cpu", loader("model", calls), size_hint=MB) == "model"
+    assert registry.get("whisper", "base", "cpu", loader("other", calls), size_hint=MB) == "model"
+    # Another device is another model
+    assert registry.get("whisper", "base", "cuda", loader("gpu", calls), size_hint=MB) == "gpu"
+
+    assert calls == ["model", "gpu"]
+    stats = registry.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+
+
+def test_least_recently_used_models_go_first():
+    registry = ModelRegistry(30 * MB)
+    for name in ("a", "b", "c"):
+        registry.get(name, "base", "cpu", loader(name), size_hint=10 * MB)
+    registry.get("a", "base", "cpu", loader("a"))
+
+    registry.get("d", "base", "cpu", loader("d"), size_hint=10 * MB)
+
+    loaded = [entry["name"] for entry in registry.stats()["loaded"]]
+    assert loaded == ["c", "a", "d"]
+    assert registry.stats()["evictions"] == 1
+
+
+def test_a_model_over_the_budget_is_still_returned():
+    registry = ModelRegistry(10 * MB)
+    registry.get("small", "base", "cpu", loader("small"), size_hint=5 * MB)
+
+    assert registry.get("large", "base", "cpu", loader("large"), size_hint=50 * MB) == "large"
+    assert [entry["name"] for entry in registry.stats()["loaded"]] == ["large"]
+
+
+def test_reservations_count_against_the_budget():
+    registry = ModelRegistry(30 * MB)
+    registry.get("a", "base", "cpu", loader("a"), size_hint=10 * MB)
+    registry.get("b", "base", "cpu", loader("b"), size_hint=10 * MB)
+
+    registry.reserve("whisper", "base", "cpu", 15 * MB)
+    assert [entry["name"] for entry in registry.stats()["loaded"]] == ["b"]
+    assert registry.available_bytes() == 5 * MB
+
+    registry.unreserve("whisper", "base", "cpu")
+    assert registry.available_bytes() == 20 * MB
+
+
+def test_evict_matches_the_given_key_parts():
+    registry = ModelRegistry(100 * MB)
+    for size, device in (("base", "cpu"), ("base", "cuda"), ("small", "cpu")):
+        registry.get("whisper", size, device, loader(size), size_hint=MB)
+
+    registry.evict("whisper", device="cpu")
+    assert [(entry["size"], entry["device"]) for entry in registry.stats()["loaded"]] == [("base", "cuda")]
+
+
+def test_concurrent_callers_share_one_load():
+    registry = ModelRegistry(100 * MB)
+    calls = []
+
+    def slow_load():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("m", "base", "cpu", slow_load)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len({id(result) for result in results}) == 1
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+mongomock = pytest.importorskip("mongomock")
+
+from pagination import (  # noqa: E402
+    DEFAULT_LIMIT, MAX_LIMIT, clamp_limit, decode_cursor, encode_cursor, keyset_page, projection_for
+)
+
+DAY = datetime(2024, 3, 1, 12, 0)
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient().db.videos
+
+
+def all_pages(collection, limit, query=None):
+    seen, cursor, pages = [], None, 0
+    while True:
+        documents, cursor = keyset_page(collection, query or {}, "upload_date", limit, cursor)
+        seen += [document["n"] for document in documents]
+        pages += 1
+        if not cursor:
+            return seen, pages
+
+
+def test_tied_timestamps_are_neither_skipped_nor_repeated(collection):
+    # Three timestamps shared by ten documents each; pages end mid-tie
+    for n in range(30):
+        collection.insert_one({"n": n, "upload_date": DAY - timedelta(hours=n % 3)})
+
+    seen, pages = all_pages(collection, limit=7)
+
+    assert sorted(seen) == list(range(30))
+    assert pages == 5
+    dates = [collection.find_one({"n": n})["upload_date"] for n in seen]
+    assert dates == sorted(dates, reverse=True)
+
+
+def test_documents_without_a_date_come_last(collection):
+    for n in range(12):
+        document = {"n": n}
+        if n % 3:
+            document["upload_date"] = DAY + timedelta(minutes=n % 2)
+        elif n % 2:
+            document["upload_date"] = None
+        collection.insert_one(document)
+
+    seen, _ = all_pages(collection, limit=3)
+
+    assert sorted(seen) == list(range(12))
+    assert set(seen[-4:]) == {0, 3, 6, 9}
+
+
+def test_last_page_has_no_cursor(collection):
+    for n in range(4):
+        collection.insert_one({"n": n, "upload_date": DAY})
+    documents, cursor = keyset_page(collection, {}, "upload_date", limit=4)
+    assert len(documents) == 4
+    assert cursor is None
+
+
+def test_query_and_projection_apply(collection):
+    for n in range(6):
+        collection.insert_one({"n": n, "owner": n % 2, "upload_date": DAY, "big": "x" * 10})
+
+    documents, _ = keyset_page(collection, {"owner": 1}, "upload_date", projection={"n": 1})
+
+    assert sorted(document["n"] for document in documents) == [1, 3, 5]
+    assert all("big" not in document and "upload_date" in document for document in documents)
+
+
+def test_cursor_round_trip():
+    document = {"_id": ObjectId(), "upload_date": DAY}
+    assert decode_cursor(encode_cursor(document, "upload_date")) == (DAY, document["_id"])
+
+    undated = {"_id": ObjectId()}
+    assert decode_cursor(encode_cursor(undated, "upload_date")) == (None, undated["_id"])
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", "eyJ2IjoxfQ", "eyJ2IjoieCIsImlkIjoieSJ9"])
+def test_bad_cursor_is_a_value_error(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+def test_clamp_limit():
+    assert clamp_limit(None) == DEFAULT_LIMIT
+    assert clamp_limit(10) == 10
+    assert clamp_limit(MAX_LIMIT + 1) == MAX_LIMIT
+    with pytest.raises(ValueError):
+        clamp_limit(0)
+
+
+def test_projection_for():
+    allowed, default = ("filename", "status", "size"), ("filename",)
+    assert projection_for(None, allowed, default) == {"filename": 1}
+    assert projection_for(" status, size ,", allowed, default) == {"status": 1, "size": 1}
+    with pytest.raises(ValueError, match="Unknown fields: secret"):
+        projection_for("status,secret", allowed, default)
@@ -0,0 +1,109 @@
+import threading
+
+import bcrypt
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from services.auth_service import AuthService  # noqa: E402
+from services.password_hasher import PasswordHasher, PasswordHasherBusy, hash_cost  # noqa: E402
+
+# The lowest cost bcrypt accepts, to keep the tests fast
+ROUNDS = 4
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(rounds=ROUNDS, workers=1, max_pending=1)
+    yield hasher
+    hasher.shutdown()
+
+
+@pytest.fixture
+def auth(monkeypatch):
+    monkeypatch.setenv("JWT_SECRET_KEY", "test-secret-" + "x" * 32)
+    auth = AuthService(mongomock.MongoClient().db)
+    auth.password_hasher = PasswordHasher(rounds=ROUNDS + 1)
+    yield auth
+    auth.password_hasher.shutdown()
+
+
+def add_user(auth, password="hunter22", rounds=ROUNDS):
+    password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds))
+    auth.users.insert_one({"email": "user@example.com", "password_hash": password_hash})
+    return password_hash
+
+
+def test_hashes_verify_and_record_their_cost(hasher):
+    hashed = hasher.hash("hunter22")
+
+    assert hasher.verify("hunter22", hashed)
+    assert not hasher.verify("hunter23", hashed)
+    assert hash_cost(hashed) == ROUNDS
+    assert not hasher.needs_rehash(hashed)
+    assert hasher.needs_rehash(hashed.decode().replace(f"$0{ROUNDS}$", "$12$"))
+    assert hash_cost("not a hash") is None
+
+
+def test_a_full_queue_refuses_instead_of_waiting(hasher):
+    started, release = threading.Event(), threading.Event()
+    blocker = threading.Thread(target=hasher._run, args=(lambda: started.set() or release.wait(5),))
+    blocker.start()
+    started.wait(5)
+
+    with pytest.raises(PasswordHasherBusy):
+        hasher.hash("hunter22")
+
+    release.set()
+    blocker.join()
+    assert hasher.verify("hunter22", hasher.hash("hunter22"))
+
+
+def test_login_rehashes_to_the_configured_cost(auth):
+    add_user(auth)
+
+    token, user = auth.login_user("user@example.com", "hunter22")
+
+    stored = auth.users.find_one()["password_hash"]
+    assert hash_cost(stored) == ROUNDS + 1
+    assert auth.verify_token(token) == user["id"]
+    # Once upgraded the hash is left alone
+    auth.login_user("user@example.com", "hunter22")
+    assert auth.users.find_one()["password_hash"] == stored
+
+
+def test_a_busy_pool_skips_the_rehash_not_the_login(auth, monkeypatch):
+    old_hash = add_user(auth)
+
+    def busy(password):
+        raise PasswordHasherBusy("busy")
+    monkeypatch.setattr(auth.password_hasher, "hash", busy)
+
+    assert auth.login_user("user@example.com", "hunter22")[0]
+    assert auth.users.find_one()["password_hash"] == old_hash
+
+
+def test_a_concurrent_password_change_wins_over_the_rehash(auth, monkeypatch):
+    add_user(auth)
+    changed = bcrypt.hashpw(b"new password", bcrypt.gensalt(ROUNDS + 1))
+    hash_password = auth.password_hasher.hash
+
+    def change_meanwhile(password):
+        auth.users.update_one({}, {"$set": {"password_hash": changed}})
+        return hash_password(password)
+    monkeypatch.setattr(auth.password_hasher, "hash", change_meanwhile)
+
+    auth.login_user("user@example.com", "hunter22")
+
+    assert auth.users.find_one()["password_hash"] == changed
+
+
+def test_login_answers_503_when_the_pool_is_full(client, app_module, monkeypatch):
+    def busy(email, password):
+        raise PasswordHasherBusy("Too many concurrent password checks, try again shortly")
+    monkeypatch.setattr(app_module.auth_service, "login_user", busy)
+
+    response = client.post("/api/auth/login", json={"email": "user@example.com", "password": "hunter22"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
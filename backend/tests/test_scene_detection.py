@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from scene_detection import frame_differences, pick_boundaries  # noqa: E402
+
+FPS = 25
+WIDTH, HEIGHT = 160, 90
+
+
+def shot(seed, frames):
+    """A gradient in a seeded palette with a block moving across it"""
+    rng = np.random.default_rng(seed)
+    low, high = rng.integers(0, 256, size=(2, 3)).astype(np.float32)
+    ramp = 0.6 * np.linspace(0, 1, WIDTH)[None, :, None] + 0.4 * np.linspace(0, 1, HEIGHT)[:, None, None]
+    background = (low + (high - low) * ramp).astype(np.uint8)
+    colour = rng.integers(0, 256, size=3, dtype=np.uint8)
+    for index in range(frames):
+        frame = background.copy()
+        x = index * 3 % (WIDTH - 20)
+        frame[30:50, x:x + 20] = colour
+        yield frame
+
+
+def fade_out(frames):
+    frames = list(frames)
+    for index, frame in enumerate(frames):
+        yield (frame.astype(np.float32) * (1 - (index + 1) / len(frames))).astype(np.uint8)
+
+
+def clip(seed, shots=4, shot_seconds=3, fade_seconds=0):
+    """``shots`` hard cuts apart by ``shot_seconds``, the last one ending in a fade to black"""
+    frames = []
+    for number in range(shots):
+        frames += list(shot(seed * 10 + number, shot_seconds * FPS))
+    if fade_seconds:
+        fade = fade_seconds * FPS
+        frames[-fade:] = fade_out(frames[-fade:])
+    return frames
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_hard_cuts_are_found(seed):
+    scores = frame_differences(iter(clip(seed)))
+    assert pick_boundaries(scores, FPS) == [75, 150, 225]
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_fade_to_black_is_not_a_cut(seed):
+    scores = frame_differences(iter(clip(seed, fade_seconds=2)))
+    assert pick_boundaries(scores, FPS) == [75, 150, 225]
+    assert scores[250:].max() < 0.12
+
+
+def test_whole_clip_fade_has_no_cuts():
+    frames = list(fade_out(shot(3, 6 * FPS)))
+    assert pick_boundaries(frame_differences(iter(frames)), FPS) == []
+
+
+def test_scores_do_not_depend_on_batching():
+    frames = clip(1, shots=2)
+    whole = frame_differences(iter(frames))
+    batched = frame_differences(iter(frames), batch_frames=7)
+    assert whole[0] == 0
+    np.testing.assert_allclose(batched, whole, atol=1e-6)
+
+
+def test_static_footage_has_no_cuts():
+    scores = np.zeros(200, dtype=np.float32)
+    assert pick_boundaries(scores, FPS) == []
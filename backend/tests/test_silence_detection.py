@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from silence_detection import detect_silence, frame_levels_db, invert_intervals
+
+RATE = 16000
+
+
+def tone(seconds, amplitude=0.25, frequency=440.0):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def silence(seconds, noise_db=None, seed=0):
+    samples = np.zeros(int(seconds * RATE), dtype=np.float32)
+    if noise_db is not None:
+        # White noise has an RMS equal to its standard deviation
+        rng = np.random.default_rng(seed)
+        samples = (rng.standard_normal(len(samples)) * 10 ** (noise_db / 20)).astype(np.float32)
+    return samples
+
+
+def test_levels_of_a_sine_and_of_silence():
+    levels, hop = frame_levels_db(np.concatenate([tone(1.0, amplitude=0.5), silence(1.0)]), RATE)
+    assert hop == pytest.approx(0.01)
+    # A sine's RMS is amplitude / sqrt(2): -9 dBFS at 0.5
+    assert np.median(levels[:90]) == pytest.approx(-9.03, abs=0.1)
+    assert levels[-50:].max() <= -119
+
+
+def test_int16_stereo_matches_float_mono():
+    mono = np.concatenate([tone(0.5), silence(0.5)])
+    stereo = np.repeat((mono * 32767).astype(np.int16)[:, None], 2, axis=1)
+    float_levels, _ = frame_levels_db(mono, RATE)
+    int_levels, _ = frame_levels_db(stereo, RATE)
+    np.testing.assert_allclose(int_levels[:40], float_levels[:40], atol=0.01)
+
+
+def test_pause_is_found_and_padded():
+    audio = np.concatenate([tone(1.0), silence(1.0), tone(1.0)])
+    [(start, end)] = detect_silence(audio, RATE, padding_ms=100)
+    assert start == pytest.approx(1.1, abs=0.02)
+    assert end == pytest.approx(1.9, abs=0.02)
+
+
+def test_short_pauses_are_kept():
+    audio = np.concatenate([tone(1.0), silence(0.3), tone(1.0)])
+    assert detect_silence(audio, RATE, min_silence_ms=500) == []
+
+
+def test_edges_are_not_padded():
+    audio = np.concatenate([silence(1.0), tone(1.0), silence(1.0)])
+    (first_start, _), (_, last_end) = detect_silence(audio, RATE)
+    assert first_start == 0.0
+    assert last_end == pytest.approx(3.0)
+
+
+def test_noise_around_the_threshold_does_not_split_a_pause():
+    # Bursts 2 dB over the threshold are inside the 3 dB hysteresis band
+    bursts = [np.concatenate([silence(0.2), silence(0.05, noise_db=-38, seed=i)]) for i in range(6)]
+    audio = np.concatenate([tone(1.0)] + bursts + [tone(1.0)])
+    options = {"threshold_db": -40.0, "min_silence_ms": 100, "padding_ms": 0}
+    [(start, end)] = detect_silence(audio, RATE, **options)
+    assert (start, end) == pytest.approx((1.0, 2.49), abs=0.02)
+    assert len(detect_silence(audio, RATE, hysteresis_db=0.0, **options)) == 6
+
+
+def test_empty_audio():
+    assert detect_silence(np.zeros(0, dtype=np.float32), RATE) == []
+
+
+def test_invert_intervals():
+    assert invert_intervals([(1.0, 2.0), (3.0, 4.0)], 5.0) == [(0.0, 1.0), (2.0, 3.0), (4.0, 5.0)]
+    assert invert_intervals([(0.0, 1.0), (0.5, 5.0)], 5.0) == []
+    assert invert_intervals([], 2.0) == [(0.0, 2.0)]
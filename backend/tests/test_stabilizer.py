@@ -0,0 +1,121 @@
+import os
+
+import numpy as np
+import pytest
+
+import stabilizer
+from stabilizer import Stabilizer, trf_cache_path
+
+HASH = "cd" * 32
+INFO = {"width": 640, "height": 360, "fps": 30.0, "duration": 2.0}
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(b"not decoded in these tests")
+    return str(path)
+
+
+def test_trf_cache_sits_next_to_the_source_by_default(source, tmp_path, monkeypatch):
+    monkeypatch.delenv("STABILIZATION_CACHE_DIR", raising=False)
+    assert trf_cache_path(source, HASH) == os.path.join(str(tmp_path), "transforms", f"{HASH}.trf")
+    assert trf_cache_path(source, HASH, cache_dir="/cache") == os.path.join("/cache", f"{HASH}.trf")
+
+
+def test_motion_analysis_is_cached_by_content_hash(source, tmp_path, monkeypatch):
+    analyzed = np.random.default_rng(0).normal(size=(59, 3))
+    calls = []
+    monkeypatch.setattr(Stabilizer, "_analyze", lambda self: calls.append(self) or analyzed.copy())
+
+    first = Stabilizer(source, INFO, content_hash=HASH, cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(first.transforms(), analyzed)
+    assert os.path.exists(first.trf_path)
+
+    # A new instance, as in a later job, reads the file instead of analyzing
+    second = Stabilizer(source, INFO, content_hash=HASH, cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(second.transforms(), analyzed)
+    assert len(calls) == 1
+
+    # The hash in the header must match the source
+    other = Stabilizer(source, INFO, content_hash="ef" * 32, cache_dir=str(tmp_path))
+    os.replace(first.trf_path, other.trf_path)
+    other.transforms()
+    assert len(calls) == 2
+
+
+def test_a_damaged_trf_file_is_analyzed_again(source, tmp_path, monkeypatch):
+    monkeypatch.setattr(Stabilizer, "_analyze", lambda self: np.ones((10, 3)))
+    first = Stabilizer(source, INFO, content_hash=HASH, cache_dir=str(tmp_path))
+    first.transforms()
+    with open(first.trf_path, "r+b") as f:
+        f.truncate(os.path.getsize(first.trf_path) - 8)
+
+    assert Stabilizer(source, INFO, content_hash=HASH, cache_dir=str(tmp_path))._load_trf() is None
+
+
+def test_a_steady_camera_is_only_zoomed(source, tmp_path):
+    steady = Stabilizer(source, INFO, content_hash=HASH, cache_dir=str(tmp_path))
+    steady._transforms = np.zeros((59, 3))
+
+    matrices = steady.warp_matrices("medium")
+    zoom = stabilizer.BORDER_ZOOM["medium"]
+    assert matrices.shape == (60, 2, 3)
+    np.testing.assert_allclose(matrices[:, 0, 0], zoom)
+    np.testing.assert_allclose(matrices[:, 0, 1], 0.0)
+    # The zoom is about the centre of the frame
+    np.testing.assert_allclose(matrices[:, 0, 2], (1 - zoom) * INFO["width"] / 2)
+    np.testing.assert_allclose(matrices[:, 1, 2], (1 - zoom) * INFO["height"] / 2)
+
+
+def test_jitter_is_corrected_and_smooth_motion_kept(source, tmp_path):
+    rng = np.random.default_rng(1)
+    pan = np.zeros((299, 3))
+    pan[:, 0] = 2.0
+    shaky = pan.copy()
+    shaky[:, 1] = rng.normal(scale=4.0, size=299)
+
+    def corrections(transforms):
+        video = Stabilizer(source, INFO, content_hash=HASH, cache_dir=str(tmp_path))
+        video._transforms = transforms
+        zoom = stabilizer.BORDER_ZOOM["high"]
+        matrices = video.warp_matrices("high")
+        return (matrices[:, :, 2] - (1 - zoom) * np.array([INFO["width"], INFO["height"]]) / 2) / zoom
+
+    # A steady pan needs no correction away from the ends of the clip
+    assert np.abs(corrections(pan)[100:200]).max() < 1e-6
+    # Frame-to-frame shake is taken out of the smoothed path
+    path = np.cumsum(shaky[:, 1])
+    stabilized = path + corrections(shaky)[1:, 1]
+    assert np.abs(np.diff(stabilized)).std() < np.abs(np.diff(path)).std() / 4
+
+
+def test_motion_between_two_frames_is_measured():
+    cv2 = pytest.importorskip("cv2")
+    rng = np.random.default_rng(2)
+    texture = cv2.GaussianBlur((rng.random((180, 320)) * 255).astype(np.uint8), (5, 5), 0)
+    moved = np.roll(np.roll(texture, 3, axis=0), 5, axis=1)
+
+    dx, dy, da = stabilizer._estimate_motion(cv2, texture[20:-20, 20:-20], moved[20:-20, 20:-20])
+    assert dx == pytest.approx(5.0, abs=0.3)
+    assert dy == pytest.approx(3.0, abs=0.3)
+    assert da == pytest.approx(0.0, abs=0.01)
+
+
+def test_motion_cache_goes_with_the_last_reference_to_the_blob(tmp_path, monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    from services.blob_store import BlobStore
+
+    monkeypatch.delenv("STABILIZATION_CACHE_DIR", raising=False)
+    monkeypatch.setattr(Stabilizer, "_analyze", lambda self: np.zeros((10, 3)))
+    store = BlobStore(mongomock.MongoClient().db, str(tmp_path))
+    upload = tmp_path / "upload.mp4"
+    upload.write_bytes(b"video")
+    blob = store.add_reference(HASH, str(upload))
+
+    cached = Stabilizer(blob["path"], INFO, content_hash=HASH)
+    cached.transforms()
+    assert os.path.exists(cached.trf_path)
+
+    store.release(HASH)
+    assert not os.path.exists(cached.trf_path)
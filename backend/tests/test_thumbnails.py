@@ -0,0 +1,99 @@
+import subprocess
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+import thumbnails  # noqa: E402
+from ffmpeg_tools import ffmpeg_binary  # noqa: E402
+from thumbnails import generate_previews, score_frame  # noqa: E402
+
+INFO = {"duration": 10.0, "width": 320, "height": 240}
+
+
+def textured(square, blur=0):
+    """A mid-grey checkerboard, optionally out of focus"""
+    y, x = np.indices((240, 320))
+    frame = np.where((y // square + x // square) % 2, 60, 190).astype(np.uint8)
+    frame = np.repeat(frame[:, :, None], 3, axis=2)
+    return cv2.GaussianBlur(frame, (0, 0), blur) if blur else frame
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return [str(tmp_path / name) for name in ("poster.jpg", "storyboard.jpg", "storyboard.vtt")]
+
+
+def test_flat_and_badly_exposed_frames_score_nothing():
+    assert score_frame(np.zeros((90, 160), dtype=np.uint8)) == 0.0
+    assert score_frame(np.full((90, 160), 128, dtype=np.uint8)) == 0.0
+    assert score_frame(np.full((90, 160), 250, dtype=np.uint8)) == 0.0
+
+    sharp = cv2.cvtColor(textured(16), cv2.COLOR_RGB2GRAY)
+    soft = cv2.cvtColor(textured(16, blur=3), cv2.COLOR_RGB2GRAY)
+    assert score_frame(sharp) > score_frame(soft) > 0.0
+
+
+def test_the_sharpest_keyframe_is_the_poster(paths, monkeypatch):
+    black = np.zeros((240, 320, 3), dtype=np.uint8)
+    frames = [(0.0, black), (2.0, textured(20, blur=4)), (4.1, textured(16)), (6.0, textured(40, blur=4)),
+              (8.0, black)]
+    calls = []
+
+    def keyframes(filepath, width, height, video_filter=None, input_args=None):
+        calls.append(input_args)
+        return iter(frames)
+    monkeypatch.setattr(thumbnails, "iter_timed_frames", keyframes)
+
+    assert generate_previews("clip.mp4", INFO, *paths) == 5
+    assert calls == [["-skip_frame", "nokey"]]
+
+    # JPEG is lossy; the poster is far closer to its source than to the others
+    poster = cv2.cvtColor(cv2.imread(paths[0]), cv2.COLOR_BGR2RGB).astype(int)
+    errors = [np.abs(poster - frame.astype(int)).mean() for _, frame in frames]
+    assert int(np.argmin(errors)) == 2
+
+
+def test_sparse_keyframes_fall_back_to_sampling(paths, monkeypatch):
+    calls = []
+
+    def decode(filepath, width, height, video_filter=None, input_args=None):
+        calls.append((video_filter, input_args))
+        if input_args:
+            # A single keyframe: one tile of five
+            return iter([(0.0, textured(16))])
+        return iter((float(pts), textured(8 + pts)) for pts in range(0, 10, 2))
+    monkeypatch.setattr(thumbnails, "iter_timed_frames", decode)
+
+    generate_previews("clip.mp4", INFO, *paths)
+
+    assert calls[1] == ("fps=1/2,scale=320:240", None)
+
+
+def test_nothing_decoded_is_an_error(paths, monkeypatch):
+    monkeypatch.setattr(thumbnails, "iter_timed_frames", lambda *args, **kwargs: iter(()))
+    with pytest.raises(ValueError, match="No frames"):
+        generate_previews("clip.mp4", INFO, *paths)
+
+
+def test_storyboard_of_a_real_clip(paths, tmp_path):
+    try:
+        binary = ffmpeg_binary()
+    except Exception as e:
+        pytest.skip(f"ffmpeg not available: {e}")
+    clip = str(tmp_path / "clip.mp4")
+    # Keyframe every two seconds, one per storyboard tile
+    subprocess.run([binary, "-y", "-loglevel", "error", "-f", "lavfi",
+                    "-i", "testsrc=size=320x240:rate=25:duration=10", "-g", "50", "-pix_fmt", "yuv420p", clip],
+                   check=True)
+
+    assert generate_previews(clip, INFO, *paths) == 5
+
+    assert cv2.imread(paths[0]).shape == (240, 320, 3)
+    assert cv2.imread(paths[1]).shape == (120, 5 * thumbnails.TILE_WIDTH, 3)
+    with open(paths[2]) as f:
+        cues = f.read().split("\n\n")
+    assert cues[0] == "WEBVTT"
+    assert cues[1] == "00:00:00.000 --> 00:00:02.000\nstoryboard.jpg#xywh=0,0,160,120"
+    assert cues[5].startswith("00:00:08.000 --> 00:00:10.000\nstoryboard.jpg#xywh=640,0,160,120")
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+import transcription  # noqa: E402
+from models.video import Video  # noqa: E402
+from services.transcript_store import TranscriptStore, speech_audio_hash  # noqa: E402
+from services.video_service import VideoService  # noqa: E402
+
+SEGMENTS = [{"start": 0.0, "end": 1.5, "text": "hello"}, {"start": 1.5, "end": 3.0, "text": "world"}]
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv("UPLOAD_FOLDER", str(tmp_path))
+    monkeypatch.delenv("TRANSCRIPT_FOLDER", raising=False)
+    return mongomock.MongoClient().db
+
+
+@pytest.fixture
+def store(db):
+    return TranscriptStore(db)
+
+
+def test_hash_follows_the_samples_not_their_container():
+    audio = np.linspace(-1, 1, 16000, dtype=np.float32)
+    assert speech_audio_hash(audio) == speech_audio_hash(audio.astype(np.float64))
+    assert speech_audio_hash(audio) != speech_audio_hash(audio[::-1])
+
+
+def test_entries_are_per_audio_model_and_language(store):
+    store.put("a" * 64, "base", "en", SEGMENTS)
+
+    assert store.get("a" * 64, "base", "en") == SEGMENTS
+    assert store.get("a" * 64, "base", "ur") is None
+    assert store.get("a" * 64, "small", "en") is None
+    entry = store.transcripts.find_one({"_id": TranscriptStore.key("a" * 64, "base", "en")})
+    assert (entry["segment_count"], entry["duration"]) == (2, 3.0)
+
+
+def test_an_unreadable_file_drops_its_entry(store):
+    store.put("a" * 64, "base", "en", SEGMENTS)
+    entry = store.transcripts.find_one()
+    with open(entry["path"], "w") as f:
+        f.write("{not json")
+
+    assert store.get("a" * 64, "base", "en") is None
+    assert store.transcripts.count_documents({}) == 0
+
+
+def test_concurrent_misses_transcribe_once(store):
+    calls = []
+
+    def transcribe():
+        calls.append(1)
+        time.sleep(0.05)
+        return SEGMENTS
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        store.get_or_transcribe("a" * 64, "base", "en", transcribe))) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [SEGMENTS] * 6
+
+
+def test_subtitles_and_summaries_of_the_same_audio_share_a_transcript(db, monkeypatch):
+    class Media:
+        decoded = 0
+
+        def speech_audio(self):
+            Media.decoded += 1
+            return np.zeros(16000, dtype=np.float32)
+
+    calls = []
+    monkeypatch.setattr(transcription, "transcribe", lambda audio, size, language: calls.append(language) or SEGMENTS)
+    service = VideoService(db)
+    first = Video(user_id="64b7f0c2a1b2c3d4e5f60718", filename="a.mp4", filepath="/media/a.mp4", size=1)
+    copy = Video(user_id="64b7f0c2a1b2c3d4e5f60718", filename="b.mkv", filepath="/media/b.mkv", size=1)
+
+    assert service._get_transcript(first, Media(), "en") == SEGMENTS
+    assert service._get_transcript(copy, Media(), "en") == SEGMENTS
+    assert calls == ["en"]
+
+    # The hash is remembered on the video, so a later stage does not decode again
+    decoded = Media.decoded
+    assert service._get_transcript(first, Media(), "en") == SEGMENTS
+    assert Media.decoded == decoded
+    assert first.metadata["speech_audio_sha256"] == copy.metadata["speech_audio_sha256"]
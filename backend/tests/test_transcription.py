@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+import model_registry
+import transcription
+from media_context import SPEECH_SAMPLE_RATE as RATE
+from model_registry import ModelRegistry
+
+
+def speech(seconds, pauses=()):
+    """A tone standing in for speech, silent for half a second at each pause"""
+    t = np.arange(int(seconds * RATE)) / RATE
+    audio = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    for pause in pauses:
+        audio[int(pause * RATE):int((pause + 0.5) * RATE)] = 0.0
+    return audio
+
+
+def test_short_audio_is_one_window():
+    assert transcription.plan_windows(speech(60)) == [
+        {"start": 0.0, "end": 60.0, "core_start": 0.0, "core_end": 60.0}
+    ]
+
+
+def test_long_audio_is_split_at_pauses():
+    windows = transcription.plan_windows(speech(300, pauses=(115.0, 236.0)))
+
+    cores = [(w["core_start"], w["core_end"]) for w in windows]
+    assert len(cores) == 3
+    assert cores[0][0] == 0.0 and cores[-1][1] == 300.0
+    # Cores tile the audio, split inside the pauses
+    assert [end for _, end in cores[:-1]] == [start for start, _ in cores[1:]]
+    assert 115.0 <= cores[0][1] <= 115.5
+    assert 236.0 <= cores[1][1] <= 236.5
+    # Windows reach into their neighbours
+    for window in windows[1:]:
+        assert window["start"] == pytest.approx(window["core_start"] - transcription.OVERLAP_SECONDS)
+
+
+def test_merge_keeps_overlapping_segments_once():
+    windows = [
+        {"start": 0.0, "end": 12.0, "core_start": 0.0, "core_end": 10.0},
+        {"start": 8.0, "end": 20.0, "core_start": 10.0, "core_end": 20.0},
+    ]
+    results = [
+        [{"start": 1.0, "end": 3.0, "text": " one"}, {"start": 9.0, "end": 11.5, "text": "two"}],
+        # The same words, heard again by the second window
+        [{"start": 1.0, "end": 3.5, "text": "two "}, {"start": 5.0, "end": 7.0, "text": "three"}],
+    ]
+
+    assert transcription.merge_segments(windows, results) == [
+        {"start": 1.0, "end": 3.0, "text": "one"},
+        {"start": 9.0, "end": 11.5, "text": "two"},
+        {"start": 13.0, "end": 15.0, "text": "three"},
+    ]
+
+
+def test_windows_are_transcribed_onto_one_timeline(monkeypatch):
+    class Model:
+        def __init__(self):
+            self.lengths = []
+
+        def transcribe(self, audio, language=None):
+            self.lengths.append(len(audio) / RATE)
+            # Past the overlap, so each window's segment is kept
+            return {"segments": [{"start": 3.0, "end": 4.0, "text": f"window {len(self.lengths)}"}]}
+
+    model = Model()
+    monkeypatch.setattr(model_registry, "get_whisper_model", lambda size, device: model)
+    monkeypatch.setenv("MODEL_DEVICE", "cpu")
+
+    segments = transcription.transcribe(speech(300, pauses=(115.0, 236.0)), workers=1)
+
+    assert len(model.lengths) == 3
+    assert [segment["text"] for segment in segments] == ["window 1", "window 2", "window 3"]
+    assert segments[0]["start"] == 3.0
+    assert segments[1]["start"] == pytest.approx(115.0 - transcription.OVERLAP_SECONDS + 3.0, abs=0.5)
+
+
+def test_default_workers_fit_the_cpu_share_and_memory_budget(monkeypatch):
+    monkeypatch.delenv("TRANSCRIBE_WORKERS", raising=False)
+    monkeypatch.setenv("JOB_WORKERS", "2")
+    monkeypatch.setattr(transcription.os, "cpu_count", lambda: 16)
+    budget = ModelRegistry(100 * transcription._model_bytes("base"))
+    monkeypatch.setattr(model_registry, "model_registry", budget)
+
+    # Eight CPUs for this job, two torch threads per worker
+    assert transcription._default_workers("cpu", "base") == 4
+    assert transcription._default_workers("cuda", "base") == 1
+
+    # Room for three base models left in the budget
+    budget.reserve("other", "model", "cpu", 97 * transcription._model_bytes("base"))
+    assert transcription._default_workers("cpu", "base") == 3
+
+    monkeypatch.setenv("TRANSCRIBE_WORKERS", "6")
+    assert transcription._default_workers("cpu", "base") == 6
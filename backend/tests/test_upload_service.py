@@ -0,0 +1,137 @@
+import hashlib
+import io
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from bson import ObjectId  # noqa: E402
+
+from services.upload_service import (  # noqa: E402
+    InvalidContainer, UploadBusy, UploadOffsetMismatch, UploadService, sniff_container
+)
+from services.video_service import VideoService  # noqa: E402
+
+USER_ID = "64b7f0c2a1b2c3d4e5f60718"
+DATA = b"\x00\x00\x00\x18ftypisom" + os.urandom(3000)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv("UPLOAD_FOLDER", str(tmp_path))
+    return mongomock.MongoClient().db
+
+
+def make_service(db):
+    video_service = VideoService(db)
+    # Probing needs real media; these uploads are not
+    video_service._extract_metadata = lambda video: None
+    return UploadService(db, video_service)
+
+
+@pytest.fixture
+def uploads(db):
+    return make_service(db)
+
+
+def start(uploads, data=DATA):
+    return uploads.create_upload(USER_ID, "clip.mp4", len(data))["_id"]
+
+
+def test_containers_are_sniffed_from_their_magic():
+    assert sniff_container(DATA[:16]) == "mp4"
+    assert sniff_container(b"\x1a\x45\xdf\xa3" + bytes(12)) == "matroska"
+    assert sniff_container(b"RIFF\x00\x00\x00\x00AVI LIST") == "avi"
+    assert sniff_container(b"FLV\x01" + bytes(12)) == "flv"
+    assert sniff_container(b"#!/bin/sh\nrm -rf /") is None
+
+
+def test_an_interrupted_upload_resumes_at_the_stored_offset(uploads, db):
+    upload_id = start(uploads)
+    assert uploads.append(upload_id, USER_ID, 0, io.BytesIO(DATA[:1000])) == 1000
+
+    # A chunk resent from the start is refused with the offset to resume from
+    with pytest.raises(UploadOffsetMismatch) as excinfo:
+        uploads.append(upload_id, USER_ID, 0, io.BytesIO(DATA[:1000]))
+    assert excinfo.value.offset == 1000
+
+    # Another web worker takes the rest, hashing the partial file once
+    other_worker = make_service(db)
+    assert other_worker.append(upload_id, USER_ID, 1000, io.BytesIO(DATA[1000:])) == len(DATA)
+    video_id, sha256 = other_worker.complete(upload_id, USER_ID)
+
+    assert sha256 == hashlib.sha256(DATA).hexdigest()
+    video = db.videos.find_one({"_id": ObjectId(video_id)})
+    assert video["metadata"]["sha256"] == sha256
+    with open(video["filepath"], "rb") as f:
+        assert f.read() == DATA
+
+
+def test_completion_is_idempotent(uploads):
+    upload_id = start(uploads)
+    uploads.append(upload_id, USER_ID, 0, io.BytesIO(DATA))
+
+    assert uploads.complete(upload_id, USER_ID) == uploads.complete(upload_id, USER_ID)
+
+
+def test_a_chunk_in_flight_holds_the_upload(uploads, db):
+    upload_id = start(uploads)
+    db.uploads.update_one({"_id": ObjectId(upload_id)},
+                          {"$set": {"writer": "another-request", "writer_since": datetime.utcnow()}})
+
+    with pytest.raises(UploadBusy):
+        uploads.append(upload_id, USER_ID, 0, io.BytesIO(DATA))
+
+    # A writer that never finished is presumed dead after WRITER_TIMEOUT
+    db.uploads.update_one({"_id": ObjectId(upload_id)},
+                          {"$set": {"writer_since": datetime.utcnow() - timedelta(hours=1)}})
+    assert uploads.append(upload_id, USER_ID, 0, io.BytesIO(DATA)) == len(DATA)
+
+
+def test_a_bad_container_is_rejected_on_the_first_bytes(uploads, db):
+    body = b"#!/bin/sh\n" + bytes(3000)
+    upload_id = start(uploads, body)
+    part_path = db.uploads.find_one({"_id": ObjectId(upload_id)})["part_path"]
+
+    with pytest.raises(InvalidContainer):
+        uploads.append(upload_id, USER_ID, 0, io.BytesIO(body))
+
+    assert uploads.get_upload(upload_id)["status"] == "failed"
+    assert not os.path.exists(part_path)
+
+
+def test_more_bytes_than_declared_are_refused(uploads):
+    upload_id = start(uploads)
+    with pytest.raises(ValueError, match="larger than declared"):
+        uploads.append(upload_id, USER_ID, 0, io.BytesIO(DATA + b"extra"))
+
+
+def test_a_checksum_mismatch_fails_the_upload(uploads):
+    upload_id = start(uploads)
+    uploads.append(upload_id, USER_ID, 0, io.BytesIO(DATA))
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        uploads.complete(upload_id, USER_ID, expected_sha256="0" * 64)
+    assert uploads.get_upload(upload_id)["status"] == "failed"
+
+
+def test_other_users_cannot_write(uploads):
+    upload_id = start(uploads)
+    with pytest.raises(ValueError, match="Unauthorized"):
+        uploads.append(upload_id, "64b7f0c2a1b2c3d4e5f60719", 0, io.BytesIO(DATA))
+
+
+def test_abandoned_uploads_are_swept(uploads, db):
+    stale = start(uploads)
+    fresh = start(uploads)
+    uploads.append(stale, USER_ID, 0, io.BytesIO(DATA[:100]))
+    db.uploads.update_one({"_id": ObjectId(stale)},
+                          {"$set": {"updated_at": datetime.utcnow() - timedelta(days=2)}})
+    part_path = db.uploads.find_one({"_id": ObjectId(stale)})["part_path"]
+
+    assert uploads.sweep_abandoned() == 1
+    assert uploads.get_upload(stale)["status"] == "expired"
+    assert uploads.get_upload(fresh)["status"] == "uploading"
+    assert not os.path.exists(part_path)
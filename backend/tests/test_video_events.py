@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+from bson import ObjectId
+
+
+@pytest.fixture
+def video_id(app_module, user_token):
+    user_id, _ = user_token
+    return str(app_module.db.videos.insert_one({
+        "user_id": user_id, "filename": "clip.mp4", "status": "processing", "error": None
+    }).inserted_id)
+
+
+@pytest.fixture
+def slots(app_module, monkeypatch):
+    semaphore = threading.BoundedSemaphore(2)
+    monkeypatch.setattr(app_module, "_sse_slots", semaphore)
+    return semaphore
+
+
+def open_stream(client, video_id, token):
+    return client.get(f"/api/videos/{video_id}/events", headers={"Authorization": f"Bearer {token}"},
+                      buffered=False)
+
+
+def test_streams_past_the_limit_are_refused(client, user_token, video_id, slots):
+    _, token = user_token
+    streams = [open_stream(client, video_id, token) for _ in range(2)]
+    assert [stream.status_code for stream in streams] == [200, 200]
+
+    refused = open_stream(client, video_id, token)
+    assert refused.status_code == 503
+    assert refused.headers["Retry-After"]
+
+    # Closing a stream, read or not, frees its slot
+    streams[0].close()
+    replacement = open_stream(client, video_id, token)
+    assert replacement.status_code == 200
+    for stream in streams[1:] + [replacement]:
+        stream.close()
+
+
+def test_finished_video_sends_its_status_and_ends(app_module, client, user_token, video_id, slots):
+    _, token = user_token
+    app_module.db.videos.update_one({"_id": ObjectId(video_id)}, {"$set": {"status": "completed"}})
+
+    stream = open_stream(client, video_id, token)
+    body = b"".join(stream.response).decode()
+    stream.close()
+
+    assert '"status":"completed"' in body.replace(" ", "")
+    assert slots.acquire(blocking=False) and slots.acquire(blocking=False)
+
+
+def test_streams_end_after_their_time_limit(app_module, client, user_token, video_id, slots, monkeypatch):
+    _, token = user_token
+    monkeypatch.setattr(app_module, "SSE_MAX_SECONDS", 0.2)
+
+    stream = open_stream(client, video_id, token)
+    body = b"".join(stream.response).decode()
+    stream.close()
+
+    assert '"status":"processing"' in body.replace(" ", "")
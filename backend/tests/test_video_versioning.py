@@ -0,0 +1,147 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from models.video import Video, VideoConflict  # noqa: E402
+from services.video_service import VideoService, UPDATE_RETRIES  # noqa: E402
+
+USER_ID = "64b7f0c2a1b2c3d4e5f60718"
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setenv("UPLOAD_FOLDER", str(tmp_path))
+    return VideoService(mongomock.MongoClient().db)
+
+
+@pytest.fixture
+def video_id(service):
+    video = Video(user_id=USER_ID, filename="clip.mp4", filepath="/media/clip.mp4", size=1024)
+    return service.videos.insert_one(video.to_dict()).inserted_id
+
+
+def test_changes_are_the_touched_paths_only(service, video_id):
+    video = service.get_video(video_id)
+    assert video.changes() == ({}, [])
+
+    video.outputs["thumbnail"] = "/media/clip.jpg"
+    video.metadata.pop("fps")
+    assert video.changes() == ({"outputs.thumbnail": "/media/clip.jpg"}, ["metadata.fps"])
+
+
+def test_writers_of_different_outputs_merge(service, video_id):
+    first = service.get_video(video_id)
+    second = service.get_video(video_id)
+
+    first.outputs["thumbnail"] = "/media/clip.jpg"
+    second.outputs["subtitles"] = {"srt": "/media/clip.srt"}
+    second.status = "processing"
+    service.update_video(first)
+    service.update_video(second)
+
+    stored = service.videos.find_one({"_id": video_id})
+    assert stored["outputs"]["thumbnail"] == "/media/clip.jpg"
+    assert stored["outputs"]["subtitles"] == {"srt": "/media/clip.srt"}
+    assert stored["status"] == "processing"
+    assert stored["version"] == 2
+    # The rebased copy now holds both writers' changes
+    assert second.outputs["thumbnail"] == "/media/clip.jpg"
+    assert second.version == 2
+
+
+def test_concurrent_writers_all_land(service, video_id):
+    # Each writer loses at most one race to every other one
+    keys = [f"stage_{index}" for index in range(UPDATE_RETRIES)]
+    barrier = threading.Barrier(len(keys))
+    errors = []
+
+    def write(key):
+        video = service.get_video(video_id)
+        video.outputs[key] = f"/media/{key}"
+        barrier.wait()
+        try:
+            service.update_video(video)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(key,)) for key in keys]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    stored = service.videos.find_one({"_id": video_id})
+    assert all(stored["outputs"][key] == f"/media/{key}" for key in keys)
+    assert stored["version"] == len(keys)
+
+
+def test_same_field_raises_conflict(service, video_id):
+    first = service.get_video(video_id)
+    second = service.get_video(video_id)
+
+    first.metadata["duration"] = 12.5
+    second.metadata["duration"] = 30.0
+    service.update_video(first)
+    with pytest.raises(VideoConflict) as excinfo:
+        service.update_video(second)
+
+    assert excinfo.value.paths == {"metadata.duration"}
+    assert service.videos.find_one({"_id": video_id})["metadata"]["duration"] == 12.5
+
+
+def test_same_value_is_not_a_conflict(service, video_id):
+    first = service.get_video(video_id)
+    second = service.get_video(video_id)
+
+    first.status = second.status = "completed"
+    service.update_video(first)
+    service.update_video(second)
+
+    assert service.videos.find_one({"_id": video_id})["status"] == "completed"
+
+
+def test_unversioned_legacy_document(service):
+    video_id = service.videos.insert_one({
+        "user_id": USER_ID, "filename": "old.mp4", "filepath": "/media/old.mp4", "size": 10,
+        "status": "uploaded", "upload_date": datetime(2023, 5, 1),
+        "metadata": {"duration": 4.0}, "outputs": {}
+    }).inserted_id
+
+    first = service.get_video(video_id)
+    second = service.get_video(video_id)
+    assert first.version == 0
+
+    first.outputs["thumbnail"] = "/media/old.jpg"
+    second.metadata["fps"] = 25.0
+    service.update_video(first)
+    service.update_video(second)
+
+    stored = service.videos.find_one({"_id": video_id})
+    assert stored["version"] == 2
+    assert stored["outputs"] == {"thumbnail": "/media/old.jpg"}
+    assert stored["metadata"] == {"duration": 4.0, "fps": 25.0}
+
+
+def test_update_of_deleted_video(service, video_id):
+    video = service.get_video(video_id)
+    service.videos.delete_one({"_id": video_id})
+
+    video.status = "completed"
+    with pytest.raises(ValueError, match="Video not found"):
+        service.update_video(video)
+
+
+def test_conflict_saving_a_failure_keeps_the_stage_error(service, video_id):
+    def cut_silence(video, options, media):
+        # Someone else changes the status while the stage runs
+        service.videos.update_one({"_id": video_id}, {"$set": {"status": "cancelled"}, "$inc": {"version": 1}})
+        raise RuntimeError("decoder crashed")
+
+    service._cut_silence = cut_silence
+    with pytest.raises(RuntimeError, match="decoder crashed"):
+        service.process_video(str(video_id), {"cut_silence": True})
+    assert service.videos.find_one({"_id": video_id})["status"] == "cancelled"
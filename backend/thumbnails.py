@@ -0,0 +1,122 @@
+import os
+import math
+import logging
+
+import numpy as np
+
+from ffmpeg_tools import iter_timed_frames
+
+logger = logging.getLogger(__name__)
+
+# Width of the frames decoded for scoring and for the poster image
+POSTER_WIDTH = 1280
+TILE_WIDTH = 160
+SPRITE_COLUMNS = 10
+MAX_TILES = 100
+MIN_TILE_SECONDS = 2.0
+# When keyframes land near fewer tiles than this, sample at a fixed rate instead
+MIN_KEYFRAME_COVERAGE = 0.5
+
+
+def score_frame(gray):
+    """Poster quality: sharp (Laplacian variance), well exposed, not flat"""
+    import cv2
+
+    mean = float(gray.mean())
+    if gray.std() < 12 or mean < 25 or mean > 230:
+        # Black, white or single-colour frame (fades, title cards)
+        return 0.0
+    sharpness = cv2.Laplacian(gray, cv2.CV_32F).var()
+    exposure = 1.0 - abs(mean - 128.0) / 128.0
+    return math.log1p(sharpness) * (0.5 + 0.5 * exposure)
+
+
+def generate_previews(filepath, info, poster_path, sprite_path, vtt_path):
+    """Write a poster frame and a storyboard sprite with its WebVTT index.
+
+    Only keyframes are decoded (``-skip_frame nokey``), in a single ffmpeg
+    pass without seeking. When the file has too few keyframes for the
+    storyboard (long GOPs), it is sampled at one frame per tile instead,
+    again in one pass. Returns the number of storyboard tiles.
+    """
+    import cv2
+
+    duration = info.get("duration") or 0.0
+    src_width, src_height = info["width"], info["height"]
+    width = min(POSTER_WIDTH, src_width) // 2 * 2
+    height = max(2, round(src_height * width / src_width / 2) * 2)
+    tile_height = max(2, round(src_height * TILE_WIDTH / src_width / 2) * 2)
+    interval = max(MIN_TILE_SECONDS, duration / MAX_TILES) if duration else MIN_TILE_SECONDS
+    tile_count = max(1, math.ceil(duration / interval)) if duration else 1
+
+    size = (width, height, tile_height)
+    samples = _collect(filepath, size, interval, tile_count, ["-skip_frame", "nokey"])
+    covered = sum(tile is not None for tile in samples["tiles"])
+    if covered < tile_count * MIN_KEYFRAME_COVERAGE:
+        logger.info(f"Keyframes cover {covered} of {tile_count} tiles, sampling every {interval:g}s")
+        samples = _collect(filepath, size, interval, tile_count, None, f"fps=1/{interval:g}")
+    if not samples["frames"]:
+        raise ValueError(f"No frames could be decoded from {filepath}")
+
+    cv2.imwrite(poster_path, cv2.cvtColor(samples["poster"], cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, 90])
+
+    # Each tile shows the sampled frame closest to the start of its span;
+    # slots no frame landed on borrow the nearest filled one
+    filled = [index for index, tile in enumerate(samples["tiles"]) if tile is not None]
+    rows = math.ceil(tile_count / SPRITE_COLUMNS)
+    columns = min(tile_count, SPRITE_COLUMNS)
+    sprite = np.zeros((rows * tile_height, columns * TILE_WIDTH, 3), dtype=np.uint8)
+    cues = ["WEBVTT", ""]
+    sprite_name = os.path.basename(sprite_path)
+    for index in range(tile_count):
+        start = index * interval
+        end = min(duration, start + interval) if duration else start + interval
+        nearest = min(filled, key=lambda slot: abs(slot - index))
+        row, column = divmod(index, SPRITE_COLUMNS)
+        x, y = column * TILE_WIDTH, row * tile_height
+        sprite[y:y + tile_height, x:x + TILE_WIDTH] = samples["tiles"][nearest]
+        cues += [
+            f"{_vtt_time(start)} --> {_vtt_time(end)}",
+            f"{sprite_name}#xywh={x},{y},{TILE_WIDTH},{tile_height}",
+            ""
+        ]
+
+    cv2.imwrite(sprite_path, cv2.cvtColor(sprite, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, 80])
+    with open(vtt_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(cues))
+    return tile_count
+
+
+def _collect(filepath, size, interval, tile_count, input_args, extra_filter=None):
+    """One decode pass: the frame nearest each tile start, plus the best poster"""
+    import cv2
+
+    width, height, tile_height = size
+    video_filter = f"scale={width}:{height}"
+    if extra_filter:
+        video_filter = f"{extra_filter},{video_filter}"
+
+    tiles = [None] * tile_count
+    distances = [math.inf] * tile_count
+    frames = 0
+    poster, best = None, -1.0
+    for pts, frame in iter_timed_frames(filepath, width, height, video_filter=video_filter,
+                                        input_args=input_args):
+        frames += 1
+        slot = min(tile_count - 1, max(0, int(round(pts / interval))))
+        distance = abs(pts - slot * interval)
+        if distance < distances[slot]:
+            distances[slot] = distance
+            tiles[slot] = cv2.resize(frame, (TILE_WIDTH, tile_height), interpolation=cv2.INTER_AREA)
+        # Score on a small grey copy; only the winning full frame is kept
+        small = cv2.resize(frame, (320, max(2, height * 320 // width)), interpolation=cv2.INTER_AREA)
+        score = score_frame(cv2.cvtColor(small, cv2.COLOR_RGB2GRAY))
+        if score > best:
+            poster, best = frame, score
+    return {"frames": frames, "tiles": tiles, "poster": poster}
+
+
+def _vtt_time(seconds):
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}"
@@ -0,0 +1,219 @@
+import os
+import atexit
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from media_context import SPEECH_SAMPLE_RATE
+from silence_detection import frame_levels_db
+
+logger = logging.getLogger(__name__)
+
+# Length of the audio each worker transcribes at once
+CHUNK_SECONDS = 120.0
+# Audio shared by neighbouring windows; segments in it are kept only once
+OVERLAP_SECONDS = 2.0
+# How far from the nominal boundary to look for a pause to split at
+SPLIT_SEARCH_SECONDS = 10.0
+
+# Whisper parameter counts, for the memory a pool worker's model takes
+# (float32 on CPU) before any has been loaded here to measure
+WHISPER_PARAMETERS = {
+    'tiny': 39_000_000,
+    'base': 74_000_000,
+    'small': 244_000_000,
+    'medium': 769_000_000,
+    'large': 1_550_000_000,
+}
+POOL_MODEL_NAME = 'whisper-pool'
+
+_pool = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+# Per-process state of a pool worker, set up once by _init_worker
+_worker_model_size = None
+_worker_device = None
+
+
+def plan_windows(audio, sample_rate=SPEECH_SAMPLE_RATE, chunk_seconds=CHUNK_SECONDS,
+                 overlap_seconds=OVERLAP_SECONDS, search_seconds=SPLIT_SEARCH_SECONDS):
+    """Split mono speech audio into overlapping transcription windows.
+
+    Boundaries are placed at the quietest 20 ms frame within
+    ``search_seconds`` of every multiple of ``chunk_seconds``, so words are
+    rarely cut in half. Each window covers its core span plus
+    ``overlap_seconds`` on both sides.
+
+    Returns a list of ``{"start", "end", "core_start", "core_end"}`` dicts in
+    seconds; a segment belongs to the window whose core holds its midpoint.
+    """
+    duration = len(audio) / float(sample_rate)
+    if duration <= chunk_seconds * 1.5:
+        return [{"start": 0.0, "end": duration, "core_start": 0.0, "core_end": duration}]
+
+    levels, hop_seconds = frame_levels_db(audio, sample_rate)
+    boundaries = [0.0]
+    target = chunk_seconds
+    while duration - target > chunk_seconds * 0.5:
+        lo = max(int((target - search_seconds) / hop_seconds), int(boundaries[-1] / hop_seconds) + 1)
+        hi = min(int((target + search_seconds) / hop_seconds), len(levels))
+        split = (lo + int(np.argmin(levels[lo:hi]))) * hop_seconds if hi > lo else target
+        boundaries.append(split)
+        target = split + chunk_seconds
+    boundaries.append(duration)
+
+    return [{
+        "start": max(0.0, core_start - overlap_seconds),
+        "end": min(duration, core_end + overlap_seconds),
+        "core_start": core_start,
+        "core_end": core_end
+    } for core_start, core_end in zip(boundaries, boundaries[1:])]
+
+
+def merge_segments(windows, results):
+    """Shift window-relative segments to the timeline and drop overlap duplicates"""
+    merged = []
+    last = len(windows) - 1
+    for index, (window, segments) in enumerate(zip(windows, results)):
+        for segment in segments:
+            start = segment["start"] + window["start"]
+            end = segment["end"] + window["start"]
+            middle = (start + end) / 2.0
+            if middle < window["core_start"] and index > 0:
+                continue
+            if middle >= window["core_end"] and index < last:
+                continue
+            merged.append({"start": start, "end": end, "text": segment["text"].strip()})
+    merged.sort(key=lambda segment: segment["start"])
+    return merged
+
+
+def transcribe(audio, model_size='base', language=None, workers=None):
+    """Transcribe 16 kHz mono audio with Whisper, in parallel for long inputs.
+
+    Short audio, or a single worker, goes straight to the model loaded in
+    this process. Longer audio is split with plan_windows and the windows
+    run on a process pool whose workers each load the model once
+    (TRANSCRIBE_WORKERS). By default the pool gets this job's share of the
+    CPUs, as the job pool runs JOB_WORKERS jobs side by side, and no more
+    workers than the model registry's memory budget has room for; their
+    models are reserved in the registry while the pool exists. Returns a
+    list of ``{"start", "end", "text"}`` segments on the original timeline.
+    """
+    from model_registry import default_device
+
+    audio = np.asarray(audio, dtype=np.float32)
+    device = default_device()
+    workers = workers or _default_workers(device, model_size)
+    windows = plan_windows(audio)
+
+    if len(windows) == 1 or workers == 1:
+        from model_registry import get_whisper_model
+        model = get_whisper_model(model_size, device)
+        results = [_transcribe_audio(model, _window_audio(audio, window), language) for window in windows]
+    else:
+        pool = _get_pool(model_size, device, min(workers, len(windows)))
+        futures = [pool.submit(_transcribe_window, _window_audio(audio, window), language)
+                   for window in windows]
+        results = [future.result() for future in futures]
+
+    logger.info(f"Transcribed {len(audio) / SPEECH_SAMPLE_RATE:.1f}s of audio in {len(windows)} windows")
+    return merge_segments(windows, results)
+
+
+def shutdown():
+    global _pool, _pool_key
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _release_pool_models(_pool_key)
+            _pool = None
+            _pool_key = None
+
+
+atexit.register(shutdown)
+
+
+def _cpu_share():
+    """CPUs for one processing job, of which the job pool runs JOB_WORKERS at once"""
+    return max(1, (os.cpu_count() or 1) // max(1, int(os.getenv('JOB_WORKERS', 2))))
+
+
+def _model_bytes(model_size):
+    return WHISPER_PARAMETERS.get(model_size, WHISPER_PARAMETERS['base']) * 4
+
+
+def _default_workers(device, model_size):
+    configured = int(os.getenv('TRANSCRIBE_WORKERS', 0))
+    if configured:
+        return configured
+    # One model per GPU; on CPU every worker gets at least two torch threads
+    if device != 'cpu':
+        return 1
+    workers = max(1, _cpu_share() // 2)
+    if workers > 1:
+        from model_registry import model_registry
+        reserved = _pool_key[2] * _model_bytes(model_size) if _pool_key and _pool_key[0] == model_size else 0
+        room = model_registry.available_bytes() + reserved
+        workers = max(1, min(workers, room // _model_bytes(model_size)))
+    return workers
+
+
+def _get_pool(model_size, device, workers):
+    global _pool, _pool_key
+    key = (model_size, device, workers)
+    with _pool_lock:
+        if _pool is not None and _pool_key != key:
+            _pool.shutdown(wait=False)
+            _release_pool_models(_pool_key)
+            _pool = None
+        if _pool is None:
+            from model_registry import model_registry
+            model_registry.reserve(POOL_MODEL_NAME, model_size, device, workers * _model_bytes(model_size))
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(model_size, device, max(1, _cpu_share() // workers))
+            )
+            _pool_key = key
+        return _pool
+
+
+def _release_pool_models(key):
+    from model_registry import model_registry
+    model_size, device, _ = key
+    model_registry.unreserve(POOL_MODEL_NAME, model_size, device)
+
+
+def _window_audio(audio, window):
+    return audio[int(window["start"] * SPEECH_SAMPLE_RATE):int(window["end"] * SPEECH_SAMPLE_RATE)]
+
+
+def _transcribe_audio(model, audio, language):
+    result = model.transcribe(audio, language=language)
+    return [{"start": s["start"], "end": s["end"], "text": s["text"]} for s in result["segments"]]
+
+
+def _init_worker(model_size, device, threads):
+    """Load the model once per pool process, with ``threads`` torch threads on CPU"""
+    global _worker_model_size, _worker_device
+    _worker_model_size = model_size
+    _worker_device = device
+    if device == 'cpu':
+        import torch
+        torch.set_num_threads(threads)
+
+    from model_registry import get_whisper_model
+    get_whisper_model(model_size, device)
+
+
+def _transcribe_window(audio, language):
+    """Entry point executed inside a pool process"""
+    from model_registry import get_whisper_model
+    model = get_whisper_model(_worker_model_size, _worker_device)
+    return _transcribe_audio(model, audio, language)
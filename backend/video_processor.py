@@ -1,6 +1,7 @@
 from moviepy.editor import VideoFileClip
 import numpy as np
 from pydub import AudioSegment
+from silence_detection import detect_silence, invert_intervals
 import os
 
 class VideoProcessor:
@@ -11,30 +12,21 @@ class VideoProcessor:
     def cut_silence(self, threshold=-40, min_silence_len=500):
         """Cut silent parts from video"""
         audio = AudioSegment.from_file(self.filepath)
+        samples = np.array(audio.get_array_of_samples()).reshape(-1, audio.channels)
         
         # Detect silent parts
-        chunks = []
-        is_silent = False
-        current_chunk_start = 0
-        
-        for i in range(len(audio) - min_silence_len):
-            segment = audio[i:i + min_silence_len]
-            if segment.dBFS < threshold:
-                if not is_silent:
-                    chunks.append((current_chunk_start, i))
-                    is_silent = True
-            else:
-                if is_silent:
-                    current_chunk_start = i
-                    is_silent = False
-        
-        if not is_silent:
-            chunks.append((current_chunk_start, len(audio)))
+        silences = detect_silence(
+            samples,
+            audio.frame_rate,
+            threshold_db=threshold,
+            min_silence_ms=min_silence_len
+        )
+        chunks = invert_intervals(silences, len(samples) / audio.frame_rate)
         
         # Create new video without silent parts
         final_clips = []
         for start, end in chunks:
-            clip = self.video.subclip(start/1000, end/1000)
+            clip = self.video.subclip(start, min(end, self.video.duration))
             final_clips.append(clip)
         
         return final_clips
@@ -72,7 +72,7 @@ export function AuthProvider({ children }: { children: ReactNode }) {
   };
 
   const logout = () => {
-    ApiService.clearToken();
+    void ApiService.logout();
     setUser(null);
   };
 
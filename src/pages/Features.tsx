@@ -20,7 +20,7 @@ import {
   Eye,
   Star
 } from 'lucide-react';
-import { ApiService } from '../services/api';
+import { ApiService, VideoProgressEvent } from '../services/api';
 import { useAuth } from '../contexts/AuthContext';
 import VideoPlayer from '../components/VideoPlayer';
 import toast from 'react-hot-toast';
@@ -114,6 +114,7 @@ const Features = () => {
   const processingIntervalRef = useRef<NodeJS.Timeout | null>(null);
   const consoleRef = useRef<HTMLDivElement>(null);
   const statusCheckIntervalRef = useRef<NodeJS.Timeout | null>(null);
+  const eventSourceRef = useRef<EventSource | null>(null);
   const videoRef = useRef<HTMLVideoElement>(null);
   const featuresRef = useRef<HTMLDivElement>(null);
 
@@ -281,9 +282,53 @@ const Features = () => {
       }
     };
 
-    // Check immediately and then every 2 seconds
+    const startPolling = () => {
+      // Check immediately and then every 2 seconds
+      checkStatus();
+      statusCheckIntervalRef.current = setInterval(checkStatus, 2000);
+    };
+
+    // Progress is pushed over server-sent events; poll only without them
+    if (typeof EventSource === 'undefined') {
+      startPolling();
+      return;
+    }
+
+    eventSourceRef.current?.close();
+    eventSourceRef.current = null;
+    const listen = (source: EventSource) => {
+      eventSourceRef.current = source;
+      let lastStage: string | null = null;
+
+      source.onmessage = (message) => {
+        const event: VideoProgressEvent = JSON.parse(message.data);
+        if (event.stage && event.stage !== lastStage) {
+          lastStage = event.stage;
+          const percent = event.percent != null ? ` (${Math.round(event.percent)}%)` : '';
+          logToConsole(`Processing: ${event.stage.replace(/_/g, ' ')}${percent}`);
+        }
+        if (event.status === 'completed' || event.status === 'failed') {
+          source.close();
+          eventSourceRef.current = null;
+          // One read of the finished video, which also logs the outcome
+          checkStatus();
+        }
+      };
+
+      source.onerror = () => {
+        // A dropped connection is retried by EventSource itself; CLOSED means
+        // the endpoint refused the stream (the media token expired, or a 503
+        // when the server has too many streams open), so fall back to polling
+        if (source.readyState === EventSource.CLOSED) {
+          eventSourceRef.current = null;
+          startPolling();
+        }
+      };
+    };
+
+    ApiService.videoEvents(videoId).then(listen).catch(() => startPolling());
+
     checkStatus();
-    statusCheckIntervalRef.current = setInterval(checkStatus, 2000);
   };
 
   // Demo processing function
@@ -325,6 +370,7 @@ const Features = () => {
   // Enhanced processing function with detailed options
   const processVideo = async (options: {
     cut_silence?: boolean;
+    silence_min_ms?: number;
     enhance_audio?: boolean;
     generate_thumbnail?: boolean;
     generate_subtitles?: boolean;
@@ -392,6 +438,7 @@ const Features = () => {
       if (statusCheckIntervalRef.current) {
         clearInterval(statusCheckIntervalRef.current);
       }
+      eventSourceRef.current?.close();
     };
   }, []);
 
@@ -471,6 +518,7 @@ const Features = () => {
     processVideo(
       { 
         cut_silence: true, 
+        silence_min_ms: pauseThreshold,
         enhance_audio: true,
         audio_enhancement_type: fillerWordsLevel
       },
@@ -34,6 +34,9 @@ const Profile = () => {
   const [activeTab, setActiveTab] = useState('profile');
   const [profile, setProfile] = useState<UserProfile | null>(null);
   const [videoHistory, setVideoHistory] = useState<VideoHistory[]>([]);
+  // Cursor for the next page of video history; null once everything is loaded
+  const [historyCursor, setHistoryCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [isEditing, setIsEditing] = useState(false);
   const [editForm, setEditForm] = useState({
     firstName: '',
@@ -90,10 +93,10 @@ const Profile = () => {
     }
   };
 
-  const loadVideoHistory = async () => {
+  const loadVideoHistory = async (cursor: string | null = null) => {
     try {
-      const videos = await ApiService.getUserVideos();
-      setVideoHistory(videos.map((video: any) => ({
+      const { videos, nextCursor } = await ApiService.getUserVideos(cursor);
+      const page: VideoHistory[] = videos.map((video: any) => ({
         id: video._id || video.id,
         filename: video.filename,
         uploadDate: video.upload_date || video.uploadDate,
@@ -103,9 +106,15 @@ const Profile = () => {
         processedOptions: Object.keys(video.processing_options || {}).filter(key => 
           video.processing_options[key] === true
         )
-      })));
+      }));
+      setVideoHistory((previous) => (cursor ? [...previous, ...page] : page));
+      setHistoryCursor(nextCursor);
     } catch (error) {
       console.error('Failed to load video history:', error);
+      if (cursor) {
+        toast.error('Failed to load more videos');
+        return;
+      }
       // Mock data for demo
       setVideoHistory([
         {
@@ -130,6 +139,15 @@ const Profile = () => {
     }
   };
 
+  const loadMoreVideoHistory = async () => {
+    setLoadingMore(true);
+    try {
+      await loadVideoHistory(historyCursor);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleSaveProfile = async () => {
     try {
       // API call to update profile
@@ -442,6 +460,18 @@ const Profile = () => {
                     </tbody>
                   </table>
                 </div>
+
+                {historyCursor && (
+                  <div className="flex justify-center">
+                    <button
+                      onClick={loadMoreVideoHistory}
+                      disabled={loadingMore}
+                      className="px-6 py-2 text-sm font-medium text-purple-700 bg-purple-100 rounded-xl hover:bg-purple-200 disabled:opacity-50 transition-all duration-300"
+                    >
+                      {loadingMore ? 'Loading...' : 'Load more'}
+                    </button>
+                  </div>
+                )}
               </div>
             )}
 
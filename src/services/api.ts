@@ -1,6 +1,9 @@
 import { z } from 'zod';
 
 const API_URL = 'http://localhost:5001/api';
+// Uploads are sent in resumable chunks; see backend/services/upload_service.py
+const UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024;
+const UPLOAD_MAX_RETRIES = 3;
 
 // Interface for subtitle data
 export interface SubtitleData {
@@ -27,10 +30,13 @@ const registerSchema = z.object({
 
 const videoOptionsSchema = z.object({
   cut_silence: z.boolean().optional(),
+  silence_min_ms: z.number().optional(),
   enhance_audio: z.boolean().optional(),
   generate_thumbnail: z.boolean().optional(),
   generate_subtitles: z.boolean().optional(),
   summarize: z.boolean().optional(),
+  // Package the result for adaptive streaming (HLS)
+  hls: z.boolean().optional(),
   // Enhancement specific options
   stabilization: z.string().optional(),
   audio_enhancement_type: z.string().optional(),
@@ -41,6 +47,16 @@ const videoOptionsSchema = z.object({
   subtitle_style: z.string().optional()
 });
 
+// Progress pushed by GET /videos/<id>/events; see backend/progress_bus.py
+export interface VideoProgressEvent {
+  video_id: string;
+  status: string;
+  stage: string | null;
+  percent: number | null;
+  eta_seconds: number | null;
+  error?: string | null;
+}
+
 export class ApiService {
   private static token: string | null = null;
 
@@ -62,6 +78,26 @@ export class ApiService {
   }
 
   private static async request(endpoint: string, options: RequestInit = {}) {
+    const res = await this.send(endpoint, options);
+    // Handle no-content responses
+    if (res.status === 204) {
+      return null;
+    }
+    return res.json();
+  }
+
+  // One page of a keyset-paginated list; pass nextCursor back for the page after it
+  private static async requestPage(endpoint: string, cursor?: string | null) {
+    const separator = endpoint.includes('?') ? '&' : '?';
+    const query = cursor ? `${separator}cursor=${encodeURIComponent(cursor)}` : '';
+    const res = await this.send(`${endpoint}${query}`);
+    return {
+      items: (await res.json()) as any[],
+      nextCursor: res.headers.get('X-Next-Cursor')
+    };
+  }
+
+  private static async send(endpoint: string, options: RequestInit = {}): Promise<Response> {
     const token = this.getToken();
     const isForm = options.body instanceof FormData;
 
@@ -90,12 +126,7 @@ export class ApiService {
         throw new Error(msg);
       }
 
-      // Handle no-content responses
-      if (res.status === 204) {
-        return null;
-      }
-
-      return await res.json();
+      return res;
     } catch (err) {
       console.error('API request failed:', err);
       throw err;
@@ -112,6 +143,14 @@ export class ApiService {
     return data;
   }
 
+  static async logout() {
+    // Revoke the token server-side; the local session ends either way
+    if (this.getToken()) {
+      await this.request('/auth/logout', { method: 'POST' }).catch(() => undefined);
+    }
+    this.clearToken();
+  }
+
   static async register(data: {
     email: string;
     password: string;
@@ -126,41 +165,50 @@ export class ApiService {
   }
 
   static async uploadVideo(file: File, onProgress?: (progress: number) => void) {
-    const formData = new FormData();
-    formData.append('video', file);
-    
-    // If progress callback is provided, simulate progress
-    if (onProgress) {
-      const interval = setInterval(() => {
-        onProgress(Math.min(90, Math.random() * 85 + 10));
-      }, 200);
-      
+    // Chunked, resumable upload: a dropped chunk resumes from the offset the server has
+    const session = await this.request('/uploads', {
+      method: 'POST',
+      body: JSON.stringify({ filename: file.name, size: file.size })
+    });
+    const uploadId: string = session.upload_id;
+    let offset: number = session.offset;
+    let retries = 0;
+
+    while (offset < file.size) {
       try {
-        const result = await this.request('/upload', {
-          method: 'POST',
-          body: formData
+        const result = await this.request(`/uploads/${uploadId}?offset=${offset}`, {
+          method: 'PATCH',
+          headers: { 'Content-Type': 'application/octet-stream' },
+          body: file.slice(offset, offset + UPLOAD_CHUNK_SIZE)
         });
-        clearInterval(interval);
-        onProgress(100);
-        return result;
+        offset = result.offset;
+        retries = 0;
+        onProgress?.(Math.round((offset / file.size) * 100));
       } catch (error) {
-        clearInterval(interval);
-        throw error;
+        const status = await this.request(`/uploads/${uploadId}`).catch(() => null);
+        if (!status || status.status !== 'uploading' || ++retries > UPLOAD_MAX_RETRIES) {
+          throw error;
+        }
+        offset = status.offset;
+        // Another request may still hold the upload (e.g. a chunk resent after a timeout)
+        await new Promise((resolve) => setTimeout(resolve, 1000 * retries));
       }
     }
-    
-    return this.request('/upload', {
+
+    return this.request(`/uploads/${uploadId}/complete`, {
       method: 'POST',
-      body: formData
+      body: JSON.stringify({})
     });
   }
 
   static async processVideo(videoId: string, options: {
     cut_silence?: boolean;
+    silence_min_ms?: number;
     enhance_audio?: boolean;
     generate_thumbnail?: boolean;
     generate_subtitles?: boolean;
     summarize?: boolean;
+    hls?: boolean;
     // Enhancement specific options
     stabilization?: string;
     audio_enhancement_type?: string;
@@ -177,16 +225,36 @@ export class ApiService {
     });
   }
 
+  static async getJobStatus(jobId: string) {
+    return this.request(`/jobs/${jobId}`);
+  }
+
   static async getVideoStatus(videoId: string) {
     return this.request(`/videos/${videoId}`);
   }
 
+  // Short-lived token for one video's media and event URLs, which cannot
+  // carry an Authorization header; the session token is refused there
+  static async getMediaToken(videoId: string): Promise<string> {
+    const response = await this.request(`/videos/${videoId}/media-token`, { method: 'POST' });
+    return response.token;
+  }
+
+  // Server-sent processing progress; EventSource cannot send headers, so
+  // a media token goes in the query string. The server refuses streams
+  // with a 503 when it has too many open; callers then poll getVideoStatus
+  static async videoEvents(videoId: string): Promise<EventSource> {
+    const token = await this.getMediaToken(videoId);
+    return new EventSource(`${API_URL}/videos/${videoId}/events?token=${encodeURIComponent(token)}`);
+  }
+
   static async getVideo(videoId: string) {
     return this.getVideoStatus(videoId);
   }
 
-  static async getUserVideos() {
-    return this.request('/videos');
+  static async getUserVideos(cursor?: string | null, limit = 20) {
+    const page = await this.requestPage(`/videos?limit=${limit}`, cursor);
+    return { videos: page.items, nextCursor: page.nextCursor };
   }
 
   static async deleteVideo(videoId: string) {
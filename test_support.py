@@ -46,9 +46,10 @@ def test_support_system():
     ticket_id = support_service.create_ticket(None, test_data)
     print(f"✅ Ticket created with ID: {ticket_id}")
     
-    # Retrieve all tickets
-    all_tickets = support_service.get_all_tickets()
-    print(f"✅ Total tickets in database: {len(all_tickets)}")
+    # Retrieve the first page of tickets, newest first
+    all_tickets, next_cursor = support_service.get_all_tickets()
+    more = " (more pages available)" if next_cursor else ""
+    print(f"✅ Tickets on the first page: {len(all_tickets)}{more}")
     
     # Show the latest ticket
     if all_tickets: